@@ -603,6 +603,9 @@ class SystemTestsCommon(object):
                     RUN_PHASE, status, comments=("time={:d}".format(int(time_taken)))
                 )
 
+            # Leave a complete TestStatus file for tools that read it directly
+            self._test_status.compact()
+
             config = Config.instance()
 
             if config.verbose_run_phase:
@@ -1,6 +1,8 @@
 """
 Interface to the config_component.xml files.  This class inherits from EntryID.py
 """
+import weakref
+
 from CIME.XML.standard_module_setup import *
 
 from CIME.XML.entry_id import EntryID
@@ -10,7 +12,46 @@ from CIME.utils import get_cime_root
 logger = logging.getLogger(__name__)
 
 
+class _DescriptionIndex(object):
+    """
+    The desc nodes of a version 3 description for one component class,
+    parsed once. Entries are indexed by one of their required components
+    so a compsetname is only compared against entries that can match it.
+    """
+
+    def __init__(self, modifier_mode, optiondesc, entries, forcings):
+        self.modifier_mode = modifier_mode
+        self.optiondesc = optiondesc
+        # (reqset, fullset, opt_parts, text) in file order
+        self.entries = entries
+        # (forcing, text) in file order
+        self.forcings = forcings
+        self.by_token = {}
+        for idx, (reqset, _, _, _) in enumerate(entries):
+            # every required component must appear in a matching compset
+            # field, so any one of them will do as the key
+            self.by_token.setdefault(min(reqset), []).append(idx)
+        # compsetname -> description
+        self.results = {}
+
+    def get_candidates(self, compsetname):
+        tokens = set()
+        for comp in compsetname.split("_"):
+            if ":" in comp:
+                comp = comp.split(":")[1]
+            tokens.update(comp.split("%"))
+
+        candidates = set()
+        for token in tokens:
+            candidates.update(self.by_token.get(token, ()))
+
+        return [self.entries[idx] for idx in sorted(candidates)]
+
+
 class Component(EntryID):
+    # root element -> {comp_class: _DescriptionIndex}
+    _DESCRIPTIONS = weakref.WeakKeyDictionary()
+
     def __init__(self, infile, comp_class):
         """
         initialize a Component obect from the component xml file in infile
@@ -164,61 +205,44 @@ class Component(EntryID):
             comp_class is not None, "comp_class argument required for version3 files"
         )
         comp_class = comp_class.lower()
-        rootnode = self.get_child("description")
-        desc = ""
-        desc_nodes = self.get_children("desc", root=rootnode)
+        index = self._get_description_index(comp_class)
+        desc = index.results.get(compsetname)
+        if desc is not None:
+            return desc
 
-        modifier_mode = self.get(rootnode, "modifier_mode")
-        if modifier_mode is None:
-            modifier_mode = "*"
-        expect(
-            modifier_mode in ("*", "1", "?", "+"),
-            "Invalid modifier_mode {} in file {}".format(modifier_mode, self.filename),
-        )
-        optiondesc = {}
         if comp_class == "forcing":
-            for node in desc_nodes:
-                forcing = self.get(node, "forcing")
-                if forcing is not None and compsetname.startswith(forcing + "_"):
+            desc = ""
+            for forcing, text in index.forcings:
+                if compsetname.startswith(forcing + "_"):
                     expect(
                         len(desc) == 0,
                         "Too many matches on forcing field {} in file {}".format(
                             forcing, self.filename
                         ),
                     )
-                    desc = self.text(node)
+                    desc = text
             if desc is None:
                 desc = compsetname.split("_")[0]
+            index.results[compsetname] = desc
             return desc
 
-        # first pass just make a hash of the option descriptions
-        for node in desc_nodes:
-            option = self.get(node, "option")
-            if option is not None:
-                optiondesc[option] = self.text(node)
-
-        # second pass find a comp_class match
+        # find a comp_class match, the last matching entry wins
         desc = ""
-        for node in desc_nodes:
-            compdesc = self.get(node, comp_class)
-
-            if compdesc is not None:
-                opt_parts = [x.rstrip("]") for x in compdesc.split("[%")]
-                parts = opt_parts.pop(0).split("%")
-                reqset = set(parts)
-                fullset = set(parts + opt_parts)
-
-                match, complist = self._get_description_match(
-                    compsetname, reqset, fullset, modifier_mode
-                )
-                if match:
-                    desc = self.text(node)
-                    for opt in complist:
-                        if opt in optiondesc:
-                            desc += optiondesc[opt]
+        for reqset, fullset, opt_parts, text in index.get_candidates(compsetname):
+            match, complist = self._get_description_match(
+                compsetname, reqset, fullset, index.modifier_mode
+            )
+            if match:
+                desc = text
+                for opt in complist:
+                    if opt in index.optiondesc:
+                        desc += index.optiondesc[opt]
 
         # cpl and esp components may not have a description
         if comp_class not in ["cpl", "esp"]:
+            reqset, opt_parts = set(), []
+            if index.entries:
+                reqset, _, opt_parts, _ = index.entries[-1]
             expect(
                 len(desc) > 0,
                 "No description found for comp_class {} matching compsetname {} in file {}, expected match in {} % {}".format(
@@ -229,8 +253,52 @@ class Component(EntryID):
                     list(opt_parts),
                 ),
             )
+        index.results[compsetname] = desc
         return desc
 
+    def _get_description_index(self, comp_class):
+        indexes = self._DESCRIPTIONS.setdefault(self.root.xml_element, {})
+        index = indexes.get(comp_class)
+        if index is not None:
+            return index
+
+        rootnode = self.get_child("description")
+        desc_nodes = self.get_children("desc", root=rootnode)
+
+        modifier_mode = self.get(rootnode, "modifier_mode")
+        if modifier_mode is None:
+            modifier_mode = "*"
+        expect(
+            modifier_mode in ("*", "1", "?", "+"),
+            "Invalid modifier_mode {} in file {}".format(modifier_mode, self.filename),
+        )
+
+        optiondesc = {}
+        entries = []
+        forcings = []
+        for node in desc_nodes:
+            option = self.get(node, "option")
+            if option is not None:
+                optiondesc[option] = self.text(node)
+
+            if comp_class == "forcing":
+                forcing = self.get(node, "forcing")
+                if forcing is not None:
+                    forcings.append((forcing, self.text(node)))
+                continue
+
+            compdesc = self.get(node, comp_class)
+            if compdesc is not None:
+                opt_parts = [x.rstrip("]") for x in compdesc.split("[%")]
+                parts = opt_parts.pop(0).split("%")
+                entries.append(
+                    (set(parts), set(parts + opt_parts), opt_parts, self.text(node))
+                )
+
+        index = _DescriptionIndex(modifier_mode, optiondesc, entries, forcings)
+        indexes[comp_class] = index
+        return index
+
     def _get_description_match(self, compsetname, reqset, fullset, modifier_mode):
         """
 
@@ -2,6 +2,8 @@
 Common interface to XML files which follow the compsets format,
 """
 
+import weakref
+
 from CIME.XML.standard_module_setup import *
 from CIME.XML.generic_xml import GenericXML
 from CIME.XML.entry_id import EntryID
@@ -12,6 +14,11 @@ logger = logging.getLogger(__name__)
 
 
 class Compsets(GenericXML):
+    # (alias, lname, science_support) of every compset, in file order, and
+    # the same entries by upper case alias and longname. Keyed by the parsed
+    # root element so the index is built once per version of each file.
+    _INDEXES = weakref.WeakKeyDictionary()
+
     def __init__(self, infile=None, files=None):
         if files is None:
             files = Files()
@@ -25,24 +32,41 @@ class Compsets(GenericXML):
         science support is used in cesm to determine if this compset and grid
         is scientifically supported.   science_support is returned as an array of grids for this compset
         """
-        nodes = self.get_children("compset")
-
-        science_support = []
-
-        for node in nodes:
-            alias = self.get_element_text("alias", root=node)
-            lname = self.get_element_text("lname", root=node)
-            # Users may include case for clarity, but comparisons are case insensitive.
-            if alias.upper() == name.upper() or lname.upper() == name.upper():
-                science_support_nodes = self.get_children("science_support", root=node)
-                for snode in science_support_nodes:
-                    science_support.append(self.get(snode, "grid"))
-                logger.debug(
-                    "Found node match with alias: {} and lname: {}".format(alias, lname)
-                )
-                return (lname, alias, science_support)
+        # Users may include case for clarity, but comparisons are case insensitive.
+        _, by_name = self._get_index()
+        match = by_name.get(name.upper())
+        if match is not None:
+            alias, lname, science_support = match
+            logger.debug(
+                "Found node match with alias: {} and lname: {}".format(alias, lname)
+            )
+            return (lname, alias, list(science_support))
         return (None, None, [False])
 
+    def _get_index(self):
+        index = self._INDEXES.get(self.root.xml_element)
+        if index is None:
+            entries = []
+            by_name = {}
+            for node in self.get_children("compset"):
+                alias = self.get_element_text("alias", root=node)
+                lname = self.get_element_text("lname", root=node)
+                science_support = tuple(
+                    self.get(snode, "grid")
+                    for snode in self.get_children("science_support", root=node)
+                )
+                entry = (alias, lname, science_support)
+                entries.append(entry)
+                # the first compset matching a name wins
+                for key in (alias, lname):
+                    if key is not None:
+                        by_name.setdefault(key.upper(), entry)
+
+            index = (entries, by_name)
+            self._INDEXES[self.root.xml_element] = index
+
+        return index
+
     def get_compset_var_settings(self, compset, grid):
         """
         Variables can be set in config_compsets.xml in entry id settings with compset and grid attributes
@@ -94,20 +118,15 @@ class Compsets(GenericXML):
 
     def print_values(self, arg_help=True):
         help_text = self.get_value(name="help")
-        compsets = self.get_children("compset")
+        entries, _ = self._get_index()
         if arg_help:
             logger.info(" {} ".format(help_text))
 
         logger.info("       --------------------------------------")
         logger.info("       Compset Alias: Compset Long Name ")
         logger.info("       --------------------------------------")
-        for compset in compsets:
-            logger.info(
-                "   {:20} : {}".format(
-                    self.text(self.get_child("alias", root=compset)),
-                    self.text(self.get_child("lname", root=compset)),
-                )
-            )
+        for alias, lname, _ in entries:
+            logger.info("   {:20} : {}".format(alias, lname))
 
     def get_compset_longnames(self):
         compset_nodes = self.get_children("compset")
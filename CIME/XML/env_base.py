@@ -1,6 +1,7 @@
 """
 Base class for env files.  This class inherits from EntryID.py
 """
+
 from CIME.XML.standard_module_setup import *
 from CIME.XML.entry_id import EntryID
 from CIME.XML.headers import Headers
@@ -23,6 +24,7 @@ class EnvBase(EntryID):
 
         self._id_map = None
         self._group_map = None
+        self._group_nodes = None
 
         if not os.path.isfile(fullpath):
             headerobj = Headers()
@@ -32,10 +34,20 @@ class EnvBase(EntryID):
             self._setup_cache()
 
     def _setup_cache(self):
+        """
+        Build the entry lookup index and lock the tree structure so the index
+        cannot be invalidated behind our back.
+
+        _id_map maps an entry id to all <entry> elements with that id anywhere
+        in the file (in document order, matching scan_children), _group_map maps
+        a group id to a dict of the entry elements that are direct children of
+        that group and _group_nodes maps a group id to its <group> element.
+        """
         self._id_map = {}  # map id directly to nodes
         self._group_map = {}  # map group name to entry id dict
+        self._group_nodes = {}  # map group name to group node
 
-        group_elems = self.get_children("group")
+        group_elems = EntryID.get_children(self, "group")
         for group_elem in group_elems:
             group_name = self.get(group_elem, "id")
             expect(
@@ -44,7 +56,8 @@ class EnvBase(EntryID):
             )
             group_map = {}
             self._group_map[group_name] = group_map
-            entry_elems = self.get_children("entry", root=group_elem)
+            self._group_nodes[group_name] = group_elem
+            entry_elems = EntryID.get_children(self, "entry", root=group_elem)
             for entry_elem in entry_elems:
                 entry_id = self.get(entry_elem, "id")
                 expect(
@@ -52,10 +65,13 @@ class EnvBase(EntryID):
                     "Repeat entry '{}' in group '{}'".format(entry_id, group_name),
                 )
                 group_map[entry_id] = entry_elem
-                if entry_id in self._id_map:
-                    self._id_map[entry_id].append(entry_elem)
-                else:
-                    self._id_map[entry_id] = [entry_elem]
+
+        for entry_elem in EntryID.scan_children(self, "entry"):
+            entry_id = self.get(entry_elem, "id")
+            if entry_id in self._id_map:
+                self._id_map[entry_id].append(entry_elem)
+            else:
+                self._id_map[entry_id] = [entry_elem]
 
         self.lock()
 
@@ -64,55 +80,100 @@ class EnvBase(EntryID):
         EntryID.change_file(self, newfile, copy=copy)
         self._setup_cache()
 
-    def get_children(self, name=None, attributes=None, root=None):
-        if (
+    def add_elements_by_group(self, srcobj, attributes=None, infile=None):
+        """
+        Add elements from srcobj to self, keeping the entry index coherent.
+        If this object is indexed, it is temporarily unlocked, new entries
+        are added to existing groups and the index is rebuilt afterwards.
+        """
+        indexed = self._id_map is not None
+        if indexed:
+            self.unlock()
+            for group_name, group_elem in self._group_nodes.items():
+                self.groups.setdefault(group_name, group_elem)
+
+        nodelist = EntryID.add_elements_by_group(
+            self, srcobj, attributes=attributes, infile=infile
+        )
+
+        if indexed:
+            self._setup_cache()
+
+        return nodelist
+
+    def _is_id_lookup(self, name, attributes):
+        return (
             self.locked
             and name == "entry"
             and attributes is not None
-            and attributes.keys() == ["id"]
-        ):
-            entry_id = attributes["id"]
-            if root is None or self.name(root) == "file":
-                if entry_id in self._id_map:
-                    return self._id_map[entry_id]
-                else:
-                    return []
-            else:
-                expect(
-                    self.name(root) == "group",
-                    "Unexpected elem '{}' for {}, attrs {}".format(
-                        self.name(root), self.filename, self.attrib(root)
-                    ),
-                )
-                group_id = self.get(root, "id")
-                if (
-                    group_id in self._group_map
-                    and entry_id in self._group_map[group_id]
-                ):
-                    return [self._group_map[group_id][entry_id]]
-                else:
+            and list(attributes.keys()) == ["id"]
+            and attributes["id"] is not None
+        )
+
+    def _get_indexed_group(self, root):
+        """
+        Return the id of root if it is a group element known to the index,
+        None otherwise.
+        """
+        if self.name(root) != "group":
+            return None
+        group_id = self.get(root, "id")
+        group_elem = self._group_nodes.get(group_id)
+        if group_elem is None or group_elem != root:
+            return None
+        return group_id
+
+    def get_entry_nodes(self, vid, subgroup=None):
+        """
+        Return the list of <entry> nodes with id vid, optionally restricted to
+        the group with id subgroup.  This is a dictionary lookup once the file
+        has been read and indexed.
+        """
+        if not self.locked:
+            root = None
+            if subgroup is not None:
+                root = EntryID.get_optional_child(self, "group", {"id": subgroup})
+                if root is None:
                     return []
+            return EntryID.scan_children(self, "entry", {"id": vid}, root=root)
 
-        else:
-            # Non-compliant look up
-            return EntryID.get_children(
-                self, name=name, attributes=attributes, root=root
-            )
+        if subgroup is None:
+            return list(self._id_map.get(vid, []))
 
-    def scan_children(self, nodename, attributes=None, root=None):
-        if (
+        group_map = self._group_map.get(subgroup)
+        if group_map is None or vid not in group_map:
+            return []
+        return [group_map[vid]]
+
+    def get_children(self, name=None, attributes=None, root=None):
+        if self.locked and root is not None:
+            if self._is_id_lookup(name, attributes):
+                group_id = self._get_indexed_group(root)
+                if group_id is not None:
+                    return self.get_entry_nodes(attributes["id"], subgroup=group_id)
+        elif (
             self.locked
-            and nodename == "entry"
+            and name == "group"
             and attributes is not None
-            and attributes.keys() == ["id"]
+            and list(attributes.keys()) == ["id"]
+            and attributes["id"] is not None
         ):
-            return EnvBase.get_children(
-                self, name=nodename, attributes=attributes, root=root
-            )
-        else:
-            return EntryID.scan_children(
-                self, nodename, attributes=attributes, root=root
-            )
+            group_elem = self._group_nodes.get(attributes["id"])
+            return [] if group_elem is None else [group_elem]
+
+        # Non-compliant look up
+        return EntryID.get_children(self, name=name, attributes=attributes, root=root)
+
+    def scan_children(self, nodename, attributes=None, root=None):
+        if self._is_id_lookup(nodename, attributes):
+            if root is None or root == self.root:
+                return self.get_entry_nodes(attributes["id"])
+
+            group_id = self._get_indexed_group(root)
+            if group_id is not None:
+                return self.get_entry_nodes(attributes["id"], subgroup=group_id)
+
+        return EntryID.scan_children(self, nodename, attributes=attributes, root=root)
 
     def set_components(self, components):
         if hasattr(self, "_components"):
@@ -163,6 +224,7 @@ class EnvBase(EntryID):
         and matches
         """
         value = None
+        self.record_dependency(vid)
         vid, comp, iscompvar = self.check_if_comp_var(vid, attribute)
         logger.debug("vid {} comp {} iscompvar {}".format(vid, comp, iscompvar))
         if iscompvar:
@@ -80,6 +80,7 @@ class EnvBatch(EnvBase):
         Must default subgroup to something in order to provide single return value
         """
         value = None
+        self.record_dependency(item)
         node = self.get_optional_child(item, attribute)
         if item in ("BATCH_SYSTEM", "PROJECT_REQUIRED"):
             return super(EnvBatch, self).get_value(item, attribute, resolved)
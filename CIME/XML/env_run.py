@@ -35,6 +35,10 @@ class EnvRun(EnvBase):
         or from the values field if the attribute argument is provided
         and matches.   Special case for pio variables when PIO_ASYNC_INTERFACE is True.
         """
+        if "PIO" in vid:
+            # the answer depends on PIO_ASYNC_INTERFACE through _pio_async_interface
+            self.record_dependency("PIO_ASYNC_INTERFACE")
+
         if any(self._pio_async_interface.values()):
             vid, comp, iscompvar = self.check_if_comp_var(vid, attribute)
             if vid.startswith("PIO") and iscompvar:
@@ -3,18 +3,63 @@ Common interface to XML files, this is an abstract class and is expected to
 be used by other XML interface modules and not directly.
 """
 from CIME.XML.standard_module_setup import *
-from CIME.utils import safe_copy, get_src_root
+from CIME.utils import safe_copy, get_src_root, get_cime_root
 
 import xml.etree.ElementTree as ET
 
 # pylint: disable=import-error
+import shutil
 from shutil import which
 import getpass
+import hashlib
+import itertools
+import json
+import tempfile
+import threading
+import time
+import weakref
+from contextlib import contextmanager
 from copy import deepcopy
 from collections import namedtuple
 
+try:
+    from lxml import etree as lxml_etree
+except ImportError:
+    lxml_etree = None
+
 logger = logging.getLogger(__name__)
 
+_REFERENCE_RE = re.compile(r"\${?(?:(.*)::)?(\w+)}?")
+_ENV_REF_RE = re.compile(r"\$ENV\{(\w+)\}")
+_SHELL_REF_RE = re.compile(r"\$SHELL\{([^}]+)\}")
+_MATH_RE = re.compile(r"\s[+-/*]\s")
+# xi:include hrefs of xml files and xs:include/xs:import locations of schemas
+_INCLUDE_RE = re.compile(rb"""(?:href|schemaLocation)\s*=\s*["']([^"']+)["']""")
+
+ValidationTime = namedtuple("ValidationTime", ["schema", "method", "seconds"])
+
+
+class ValueDependencies(object):
+    """
+    What a value lookup depended on: the variables (entry ids) it read, the
+    environment variables it referenced and whether it ran a $SHELL{} command,
+    in which case the result must never be cached.
+    """
+
+    def __init__(self):
+        self.variables = set()
+        self.env_vars = set()
+        self.cacheable = True
+
+
+class _DependencyRecorders(threading.local):
+    def __init__(self):
+        super(_DependencyRecorders, self).__init__()
+        self.stack = []
+
+
+_RECORDERS = _DependencyRecorders()
+
 
 class _Element(
     object
@@ -61,11 +106,94 @@ class GenericXML(object):
     DISABLE_CACHING = False
     CacheEntry = namedtuple("CacheEntry", ["tree", "root", "modtime"])
 
+    # Opt-in on-disk cache of parsed read-only files, shared across processes.
+    # Enabled by pointing CIME_XML_CACHE_DIR at a (private) directory.
+    PERSISTENT_CACHE_DIR = os.environ.get("CIME_XML_CACHE_DIR")
+    DISABLE_PERSISTENT_CACHING = False
+    PERSISTENT_CACHE_VERSION = 1
+    # Compiled schemas and (file hash, schema hash) pairs of files which
+    # passed validation, shared by every object in the process. Files that
+    # passed are also recorded in PERSISTENT_CACHE_DIR when it is set.
+    # (file, schema) -> signatures of the files which were hashed, so an
+    # unchanged file is not hashed again.
+    DISABLE_VALIDATION_CACHE = False
+    _COMPILED_SCHEMAS = {}
+    _COMPILE_LOCK = threading.Lock()
+    _VALIDATED_FILES = set()
+    _VALIDATED_SIGNATURES = {}
+    # filename -> ValidationTime of its last validation
+    VALIDATION_TIMES = {}
+    # Total bytes written by write() in this process
+    BYTES_WRITTEN = 0
+    _BYTES_WRITTEN_LOCK = threading.Lock()
+
+    # Per-tree index of (tag, attribute) -> elements used by scan_children for
+    # whole-file queries. A structural change made through this API bumps the
+    # generation of its tree, which discards the index of that tree only.
+    DISABLE_SCAN_INDEX = False
+    _SCAN_INDEX = weakref.WeakKeyDictionary()
+    # root element -> scan generation of the tree
+    _SCAN_GENERATIONS = weakref.WeakKeyDictionary()
+    _SCAN_LOCK = threading.Lock()
+    _NAMESPACES = {"xi": "http://www.w3.org/2001/XInclude"}
+
+    # root element -> (tree serial, number of changes made to the tree
+    # through this API), lets callers caching derived values detect
+    # modifications they did not make themselves.
+    _MODIFICATION_COUNTS = weakref.WeakKeyDictionary()
+    _TREE_SERIALS = itertools.count()
+
     @classmethod
     def invalidate(cls, filename):
         if filename in cls._FILEMAP:
             del cls._FILEMAP[filename]
 
+    @staticmethod
+    def _get_content_hash(filename, signatures=None):
+        """
+        sha256 of filename and, recursively, of the files it includes. The
+        signature of each file read is appended to signatures if given.
+        """
+        digest = hashlib.sha256()
+        pending = [os.path.abspath(filename)]
+        seen = set()
+        while pending:
+            path = pending.pop(0)
+            if path in seen or not os.path.isfile(path):
+                continue
+            seen.add(path)
+            with open(path, "rb") as fd:
+                if signatures is not None:
+                    stat = os.fstat(fd.fileno())
+                    signatures.append((path, stat.st_size, stat.st_mtime_ns))
+                content = fd.read()
+            digest.update(path.encode("utf-8"))
+            digest.update(content)
+            for match in _INCLUDE_RE.finditer(content):
+                include = match.group(1).decode("utf-8", "replace")
+                pending.append(os.path.join(os.path.dirname(path), include))
+
+        return digest.hexdigest()
+
+    @classmethod
+    def _get_persistent_cache_path(cls, infile, schema):
+        key = "{}\n{}".format(os.path.abspath(infile), schema)
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(cls.PERSISTENT_CACHE_DIR, "{}.xmlcache".format(digest))
+
+    @staticmethod
+    def _get_file_signature(filename):
+        stat = os.stat(filename)
+        return [os.path.abspath(filename), stat.st_size, stat.st_mtime_ns]
+
+    @classmethod
+    def _get_persistent_cache_header(cls, files):
+        return {
+            "version": cls.PERSISTENT_CACHE_VERSION,
+            "cimeroot": get_cime_root(),
+            "files": [cls._get_file_signature(item) for item in files],
+        }
+
     def __init__(
         self,
         infile=None,
@@ -84,6 +212,7 @@ class GenericXML(object):
         self.read_only = read_only
         self.filename = infile
         self.needsrewrite = False
+        self._included_files = []
         if infile is None:
             return
 
@@ -141,21 +270,113 @@ class GenericXML(object):
                 cached_read = True
 
         if not cached_read:
-            logger.debug("read: {}".format(infile))
-            with open(infile, "r", encoding="utf-8") as fd:
-                self.read_fd(fd)
-            version = str(self.get_version())
-            if type(schema) is dict:
-                self.validate_xml_file(infile, schema[version])
-            elif schema is not None and self.get_version() > 1.0:
-                self.validate_xml_file(infile, schema)
-
-            logger.debug("File version is {}".format(str(self.get_version())))
+            use_persistent_cache = self._use_persistent_cache(infile)
+            if use_persistent_cache and self._read_persistent_cache(infile, schema):
+                logger.debug("read (persistent cache): {}".format(infile))
+            else:
+                logger.debug("read: {}".format(infile))
+                num_included = len(self._included_files)
+                with open(infile, "r", encoding="utf-8") as fd:
+                    self.read_fd(fd)
+                version = str(self.get_version())
+                if type(schema) is dict:
+                    self.validate_xml_file(infile, schema[version])
+                elif schema is not None and self.get_version() > 1.0:
+                    self.validate_xml_file(infile, schema)
+
+                logger.debug("File version is {}".format(str(self.get_version())))
+
+                if use_persistent_cache:
+                    self._write_persistent_cache(
+                        infile, schema, self._included_files[num_included:]
+                    )
 
             self._FILEMAP[infile] = self.CacheEntry(
                 self.tree, self.root, os.path.getmtime(infile)
             )
 
+    def _use_persistent_cache(self, infile):
+        """
+        The persistent cache only holds complete, read-only config files from
+        CIMEROOT or SRCROOT, and is off whenever DISABLE_CACHING is set. Files
+        that are read into an existing tree (includes, Files merging several
+        config files) and case env files are never cached on their own.
+        """
+        return (
+            self.PERSISTENT_CACHE_DIR is not None
+            and not self.DISABLE_PERSISTENT_CACHING
+            and not self.DISABLE_CACHING
+            and self.read_only
+            and self.tree is None
+            and self._is_config_file(infile)
+        )
+
+    @staticmethod
+    def _is_config_file(infile):
+        """
+        True if infile is a static config file in CIMEROOT or SRCROOT
+        """
+        if os.path.basename(infile).startswith("env_"):
+            return False
+
+        infile = os.path.realpath(infile)
+        for root in (get_cime_root(), get_src_root()):
+            root = os.path.realpath(root)
+            if os.path.commonpath([root, infile]) == root:
+                return True
+
+        return False
+
+    def _read_persistent_cache(self, infile, schema):
+        """
+        Load infile from the persistent cache. Returns False if there is no
+        usable entry: missing, unreadable, written by a different CIME or
+        any of the files it was built from has changed size or mtime.
+        """
+        cache_path = self._get_persistent_cache_path(infile, schema)
+        try:
+            with open(cache_path, "rb") as fd:
+                header = json.loads(fd.readline())
+                files = [item[0] for item in header["files"]]
+                if header != self._get_persistent_cache_header(files):
+                    logger.debug("Stale persistent cache entry for {}".format(infile))
+                    return False
+
+                root = ET.fromstring(fd.read())
+        except (OSError, ValueError, KeyError, TypeError, IndexError, ET.ParseError):
+            return False
+
+        self.tree = ET.ElementTree(root)
+        self.root = _Element(root)
+
+        return True
+
+    def _write_persistent_cache(self, infile, schema, included_files):
+        """
+        Store the fully resolved (includes expanded, schema validated) tree.
+        The entry is written to a temporary file and renamed into place so
+        concurrent readers never see a partial entry.
+        """
+        cache_path = self._get_persistent_cache_path(infile, schema)
+        tmp_path = None
+        try:
+            header = self._get_persistent_cache_header([infile] + included_files)
+            cache_dir = os.path.dirname(cache_path)
+            os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+            with tempfile.NamedTemporaryFile(
+                "wb", dir=cache_dir, prefix=".tmp", delete=False
+            ) as fd:
+                tmp_path = fd.name
+                fd.write(json.dumps(header).encode("utf-8") + b"\n")
+                fd.write(ET.tostring(self.root.xml_element))
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            logger.debug(
+                "Could not write persistent cache for {}: {}".format(infile, e)
+            )
+
     def read_fd(self, fd):
         expect(
             self.read_only or not self.filename or not self.needsrewrite,
@@ -189,8 +410,87 @@ class GenericXML(object):
                 )
             )
             logger.debug("Include file {}".format(path))
+            self._included_files.append(path)
             self.read(path)
 
+    def _invalidate_scan_index(self):
+        if self.root is not None:
+            element = self.root.xml_element
+            with self._SCAN_LOCK:
+                self._SCAN_GENERATIONS[element] = (
+                    self._SCAN_GENERATIONS.get(element, 0) + 1
+                )
+
+        self._record_modification()
+
+    def _get_scan_generation(self, element):
+        with self._SCAN_LOCK:
+            return self._SCAN_GENERATIONS.get(element, 0)
+
+    def _get_tree_modifications(self, element):
+        # Must hold _SCAN_LOCK
+        modifications = self._MODIFICATION_COUNTS.get(element)
+        if modifications is None:
+            # The serial tells apart trees that reuse a freed element's id
+            modifications = (next(self._TREE_SERIALS), 0)
+            self._MODIFICATION_COUNTS[element] = modifications
+        return modifications
+
+    def _record_modification(self):
+        if self.root is None:
+            return
+
+        element = self.root.xml_element
+        with self._SCAN_LOCK:
+            serial, count = self._get_tree_modifications(element)
+            self._MODIFICATION_COUNTS[element] = (serial, count + 1)
+
+    def get_modification_count(self):
+        """
+        Return a token which changes whenever the tree of this object is
+        changed through this API or replaced by another tree.
+        """
+        if self.root is None:
+            return None
+
+        with self._SCAN_LOCK:
+            return self._get_tree_modifications(self.root.xml_element)
+
+    @staticmethod
+    @contextmanager
+    def record_dependencies():
+        """
+        Record the dependencies of every value looked up in this thread while
+        the context is active. Yields a ValueDependencies object.
+        """
+        deps = ValueDependencies()
+        _RECORDERS.stack.append(deps)
+        try:
+            yield deps
+        finally:
+            _RECORDERS.stack.pop()
+
+    @staticmethod
+    def record_dependency(vid=None, env_var=None, cacheable=True):
+        for deps in _RECORDERS.stack:
+            if vid is not None:
+                deps.variables.add(vid)
+            if env_var is not None:
+                deps.env_vars.add(env_var)
+            if not cacheable:
+                deps.cacheable = False
+
+    @staticmethod
+    def record_dependencies_from(other):
+        """
+        Add the dependencies in other to every active recorder, used when a
+        previously recorded value is reused inside another lookup.
+        """
+        for deps in _RECORDERS.stack:
+            deps.variables.update(other.variables)
+            deps.env_vars.update(other.env_vars)
+            deps.cacheable = deps.cacheable and other.cacheable
+
     def lock(self):
         """
         A subclass is doing caching, we need to lock the tree structure
@@ -211,6 +511,7 @@ class GenericXML(object):
         self.tree = None
         self.filename = newfile
         self.read(newfile)
+        self._record_modification()
 
     #
     # API for individual node operations
@@ -238,6 +539,7 @@ class GenericXML(object):
                     ),
                 )
             self.needsrewrite = True
+            self._invalidate_scan_index()
             return node.xml_element.set(attrib_name, value)
 
     def pop(self, node, attrib_name):
@@ -255,6 +557,7 @@ class GenericXML(object):
                 ),
             )
         self.needsrewrite = True
+        self._invalidate_scan_index()
         return node.xml_element.attrib.pop(attrib_name)
 
     def attrib(self, node):
@@ -270,6 +573,7 @@ class GenericXML(object):
         )
         if node.xml_element.tag != name:
             self.needsrewrite = True
+            self._invalidate_scan_index()
             node.xml_element.tag = name
 
     def set_text(self, node, text):
@@ -282,6 +586,7 @@ class GenericXML(object):
         if node.xml_element.text != text:
             node.xml_element.text = text
             self.needsrewrite = True
+            self._record_modification()
 
     def name(self, node):
         return node.xml_element.tag
@@ -302,6 +607,7 @@ class GenericXML(object):
             ),
         )
         self.needsrewrite = True
+        self._invalidate_scan_index()
         root = root if root is not None else self.root
         if position is not None:
             root.xml_element.insert(position, node.xml_element)
@@ -321,6 +627,7 @@ class GenericXML(object):
             ),
         )
         self.needsrewrite = True
+        self._invalidate_scan_index()
         root = root if root is not None else self.root
         root.xml_element.remove(node.xml_element)
 
@@ -333,6 +640,7 @@ class GenericXML(object):
         )
         root = root if root is not None else self.root
         self.needsrewrite = True
+        self._invalidate_scan_index()
         if attributes is None:
             node = _Element(ET.SubElement(root.xml_element, name))
         else:
@@ -352,6 +660,7 @@ class GenericXML(object):
         )
         root = root if root is not None else self.root
         self.needsrewrite = True
+        self._invalidate_scan_index()
         et_comment = ET.Comment(text)
         node = _Element(et_comment)
         root.xml_element.append(node.xml_element)
@@ -477,10 +786,11 @@ class GenericXML(object):
 
     def write(self, outfile=None, force_write=False):
         """
-        Write an xml file from data in self
+        Write an xml file from data in self, unless it is unchanged and
+        force_write is not set. Returns the number of bytes written.
         """
         if not (self.needsrewrite or force_write):
-            return
+            return 0
 
         self.validate_timestamp()
 
@@ -495,19 +805,15 @@ class GenericXML(object):
         xmllint = which("xmllint")
 
         if xmllint:
-            if isinstance(outfile, str):
-                run_cmd_no_fail(
-                    "{} --format --output {} -".format(xmllint, outfile),
-                    input_str=xmlstr,
-                )
-            else:
-                outfile.write(
-                    run_cmd_no_fail("{} --format -".format(xmllint), input_str=xmlstr)
-                )
+            xmlstr = (
+                run_cmd_no_fail("{} --format -".format(xmllint), input_str=xmlstr)
+                + "\n"
+            ).encode("utf-8")
 
+        if isinstance(outfile, str):
+            self._write_atomic(outfile, xmlstr)
         else:
-            with open(outfile, "w") as xmlout:
-                xmlout.write(xmlstr)
+            outfile.write(xmlstr.decode("utf-8"))
 
         self._FILEMAP[self.filename] = self.CacheEntry(
             self.tree, self.root, os.path.getmtime(self.filename)
@@ -515,6 +821,36 @@ class GenericXML(object):
 
         self.needsrewrite = False
 
+        with self._BYTES_WRITTEN_LOCK:
+            GenericXML.BYTES_WRITTEN += len(xmlstr)
+
+        return len(xmlstr)
+
+    @staticmethod
+    def _write_atomic(filename, content):
+        """
+        Write content to a temporary file next to filename and rename it into
+        place, so a concurrent reader sees either the old or the new file.
+        """
+        filename = os.path.realpath(filename)
+        tmp_path = "{}.{}.{}.tmp".format(
+            os.path.join(os.path.dirname(filename), "." + os.path.basename(filename)),
+            os.getpid(),
+            threading.get_ident(),
+        )
+        try:
+            # mode 0o666 lets the umask decide permissions like open() would
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+            with os.fdopen(fd, "wb") as xmlout:
+                xmlout.write(content)
+            if os.path.exists(filename):
+                shutil.copymode(filename, tmp_path)
+            os.replace(tmp_path, filename)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
     def scan_child(self, nodename, attributes=None, root=None):
         """
         Get an xml element matching nodename with optional attributes.
@@ -558,49 +894,106 @@ class GenericXML(object):
 
         if root is None:
             root = self.root
-        nodes = []
-
-        namespace = {"xi": "http://www.w3.org/2001/XInclude"}
-
-        xpath = ".//" + (nodename if nodename else "")
 
         if attributes:
             # xml.etree has limited support for xpath and does not allow more than
-            # one attribute in an xpath query so we query seperately for each attribute
-            # and create a result with the intersection of those lists
-
-            for key, value in attributes.items():
-                if value is None:
-                    xpath = ".//{}[@{}]".format(nodename, key)
-                else:
-                    xpath = ".//{}[@{}='{}']".format(nodename, key, value)
-
-                logger.debug("xpath is {}".format(xpath))
-
-                try:
-                    newnodes = root.xml_element.findall(xpath, namespace)
-                except Exception as e:
-                    expect(
-                        False, "Bad xpath search term '{}', error: {}".format(xpath, e)
-                    )
+            # one attribute in an xpath query so we walk the subtree once and
+            # filter on all attributes at the same time
+            tag = self._expand_tag(nodename)
+            attributes = {
+                key: None if value is None else str(value)
+                for key, value in attributes.items()
+            }
+
+            if not self.DISABLE_SCAN_INDEX and root == self.root:
+                candidates = self._get_indexed_candidates(root, tag, attributes)
+            else:
+                candidates = root.xml_element.iter(tag)
 
-                if not nodes:
-                    nodes = newnodes
-                else:
-                    for node in nodes[:]:
-                        if node not in newnodes:
-                            nodes.remove(node)
-                if not nodes:
-                    return []
+            nodes = [
+                node
+                for node in candidates
+                if node is not root.xml_element
+                and self._match_attributes(node, attributes)
+            ]
 
         else:
+            xpath = ".//" + (nodename if nodename else "")
+
             logger.debug("xpath: {}".format(xpath))
-            nodes = root.xml_element.findall(xpath, namespace)
+
+            nodes = root.xml_element.findall(xpath, self._NAMESPACES)
 
         logger.debug("Returning {} nodes ({})".format(len(nodes), nodes))
 
         return [_Element(node) for node in nodes]
 
+    def _expand_tag(self, nodename):
+        """
+        Convert nodename to the tag filter used by Element.iter, expanding
+        namespace prefixes (xi:include) the same way findall does.
+        """
+        if not nodename:
+            return None
+
+        if ":" in nodename:
+            prefix, name = nodename.split(":", 1)
+            expect(
+                prefix in self._NAMESPACES,
+                "Unknown namespace prefix in search term '{}'".format(nodename),
+            )
+            return "{{{}}}{}".format(self._NAMESPACES[prefix], name)
+
+        return nodename
+
+    @staticmethod
+    def _match_attributes(node, attributes):
+        attrib = node.attrib
+        for key, value in attributes.items():
+            if key not in attrib:
+                return False
+            elif value is not None and attrib[key] != value:
+                return False
+
+        return True
+
+    def _get_indexed_candidates(self, root, tag, attributes):
+        """
+        Return the elements under root with tag that carry the most selective
+        of the requested attributes, using (and building on demand) the index
+        for this tree.
+        """
+        element = root.xml_element
+        generation = self._get_scan_generation(element)
+        cached = self._SCAN_INDEX.get(element)
+        if cached is None or cached[0] != generation:
+            cached = (generation, {})
+            self._SCAN_INDEX[element] = cached
+
+        index = cached[1]
+
+        key = next(
+            (key for key, value in attributes.items() if value is not None),
+            next(iter(attributes)),
+        )
+
+        if (tag, key) not in index:
+            with_key = []
+            by_value = {}
+            for node in element.iter(tag):
+                if node is not element and key in node.attrib:
+                    with_key.append(node)
+                    by_value.setdefault(node.attrib[key], []).append(node)
+
+            index[(tag, key)] = (with_key, by_value)
+
+        with_key, by_value = index[(tag, key)]
+
+        if attributes[key] is None:
+            return with_key
+
+        return by_value.get(attributes[key], [])
+
     def get_value(
         self, item, attribute=None, resolved=True, subgroup=None
     ):  # pylint: disable=unused-argument
@@ -650,10 +1043,6 @@ class GenericXML(object):
         True
         """
         logger.debug("raw_value {}".format(raw_value))
-        reference_re = re.compile(r"\${?(?:(.*)::)?(\w+)}?")
-        env_ref_re = re.compile(r"\$ENV\{(\w+)\}")
-        shell_ref_re = re.compile(r"\$SHELL\{([^}]+)\}")
-        math_re = re.compile(r"\s[+-/*]\s")
         item_data = raw_value
 
         if item_data is None:
@@ -662,22 +1051,25 @@ class GenericXML(object):
         if not isinstance(item_data, str):
             return item_data
 
-        for m in env_ref_re.finditer(item_data):
+        for m in _ENV_REF_RE.finditer(item_data):
             logger.debug("look for {} in env".format(item_data))
             env_var = m.groups()[0]
+            self.record_dependency(env_var=env_var)
             env_var_exists = env_var in os.environ
             if not allow_unresolved_envvars:
                 expect(env_var_exists, "Undefined env var '{}'".format(env_var))
             if env_var_exists:
                 item_data = item_data.replace(m.group(), os.environ[env_var])
 
-        for s in shell_ref_re.finditer(item_data):
+        for s in _SHELL_REF_RE.finditer(item_data):
             logger.debug("execute {} in shell".format(item_data))
+            self.record_dependency(cacheable=False)
             shell_cmd = s.groups()[0]
             item_data = item_data.replace(s.group(), run_cmd_no_fail(shell_cmd))
 
-        for m in reference_re.finditer(item_data):
+        for m in _REFERENCE_RE.finditer(item_data):
             _subgroup, var = m.groups()
+            self.record_dependency(var)
 
             logger.debug("find: {} in group {}".format(var, _subgroup))
 
@@ -703,7 +1095,7 @@ class GenericXML(object):
             elif var == "USER":
                 item_data = item_data.replace(m.group(), getpass.getuser())
 
-        if math_re.search(item_data):
+        if _MATH_RE.search(item_data):
             try:
                 tmp = eval(item_data)
             except Exception:
@@ -714,7 +1106,9 @@ class GenericXML(object):
 
     def validate_xml_file(self, filename, schema):
         """
-        validate an XML file against a provided schema file using pylint
+        validate an XML file against a provided schema file, in process with
+        lxml if it is available otherwise with xmllint. A file is not
+        validated again while neither it nor the schema changed.
         """
         expect(
             filename and os.path.isfile(filename),
@@ -723,6 +1117,101 @@ class GenericXML(object):
         expect(
             schema and os.path.isfile(schema), "schema file not found {}".format(schema)
         )
+
+        start = time.time()
+        key = None
+        if not self.DISABLE_VALIDATION_CACHE:
+            files = (os.path.abspath(filename), os.path.abspath(schema))
+            if self._signatures_unchanged(self._VALIDATED_SIGNATURES.get(files)):
+                self._record_validation_time(filename, schema, "cached", start)
+                return
+
+            signatures = []
+            key = (
+                self._get_content_hash(filename, signatures),
+                self._get_content_hash(schema, signatures),
+            )
+            if self._is_validated(key):
+                self._VALIDATED_SIGNATURES[files] = tuple(signatures)
+                self._record_validation_time(filename, schema, "cached", start)
+                return
+
+        logger.debug("Checking file {} against schema {}".format(filename, schema))
+        if lxml_etree is not None:
+            method = "lxml"
+            self._validate_with_lxml(filename, schema, key)
+        else:
+            method = "xmllint"
+            self._validate_with_xmllint(filename, schema)
+
+        if key is not None:
+            self._set_validated(key)
+            self._VALIDATED_SIGNATURES[files] = tuple(signatures)
+
+        self._record_validation_time(filename, schema, method, start)
+
+    @staticmethod
+    def _signatures_unchanged(signatures):
+        if not signatures:
+            return False
+
+        for path, size, mtime_ns in signatures:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                return False
+            if stat.st_size != size or stat.st_mtime_ns != mtime_ns:
+                return False
+
+        return True
+
+    @classmethod
+    def _get_compiled_schema(cls, schema, schema_hash=None):
+        """
+        Compile schema once per process, a changed schema is compiled again.
+        """
+        if schema_hash is None:
+            schema_hash = cls._get_content_hash(schema)
+        key = (os.path.abspath(schema), schema_hash)
+        compiled = cls._COMPILED_SCHEMAS.get(key)
+        if compiled is not None:
+            return compiled
+
+        with cls._COMPILE_LOCK:
+            compiled = cls._COMPILED_SCHEMAS.get(key)
+            if compiled is None:
+                logger.debug("Compiling schema {}".format(schema))
+                try:
+                    compiled = lxml_etree.XMLSchema(lxml_etree.parse(schema))
+                except (
+                    lxml_etree.XMLSyntaxError,
+                    lxml_etree.XMLSchemaParseError,
+                ) as e:
+                    expect(False, "Could not compile schema {}: {}".format(schema, e))
+                cls._COMPILED_SCHEMAS[key] = compiled
+
+        return compiled
+
+    def _validate_with_lxml(self, filename, schema, key=None):
+        compiled = self._get_compiled_schema(schema, None if key is None else key[1])
+        try:
+            doc = lxml_etree.parse(filename)
+            doc.xinclude()
+        except (lxml_etree.XMLSyntaxError, lxml_etree.XIncludeError) as e:
+            expect(False, "Could not parse {}: {}".format(filename, e))
+
+        if not compiled.validate(doc):
+            # same format as the xmllint messages
+            errors = "\n".join(
+                "{}:{}: Schemas validity error : {}".format(
+                    error.filename, error.line, error.message
+                )
+                for error in compiled.error_log
+            )
+            expect(False, "{}\n{} fails to validate".format(errors, filename))
+
+    @staticmethod
+    def _validate_with_xmllint(filename, schema):
         xmllint = which("xmllint")
 
         expect(
@@ -732,11 +1221,52 @@ class GenericXML(object):
             ),
         )
 
-        logger.debug("Checking file {} against schema {}".format(filename, schema))
         run_cmd_no_fail(
             "{} --xinclude --noout --schema {} {}".format(xmllint, schema, filename)
         )
 
+    @classmethod
+    def _get_validated_marker(cls, key):
+        if cls.PERSISTENT_CACHE_DIR is None or cls.DISABLE_PERSISTENT_CACHING:
+            return None
+        digest = hashlib.sha256("\n".join(key).encode("utf-8")).hexdigest()
+        return os.path.join(cls.PERSISTENT_CACHE_DIR, "validated", digest)
+
+    @classmethod
+    def _is_validated(cls, key):
+        if key in cls._VALIDATED_FILES:
+            return True
+
+        marker = cls._get_validated_marker(key)
+        if marker is not None and os.path.isfile(marker):
+            cls._VALIDATED_FILES.add(key)
+            return True
+
+        return False
+
+    @classmethod
+    def _set_validated(cls, key):
+        cls._VALIDATED_FILES.add(key)
+
+        marker = cls._get_validated_marker(key)
+        if marker is not None:
+            try:
+                os.makedirs(os.path.dirname(marker), mode=0o700, exist_ok=True)
+                with open(marker, "w"):
+                    pass
+            except OSError as e:
+                logger.debug("Could not record validation of {}: {}".format(key, e))
+
+    @classmethod
+    def _record_validation_time(cls, filename, schema, method, start):
+        seconds = time.time() - start
+        cls.VALIDATION_TIMES[filename] = ValidationTime(schema, method, seconds)
+        logger.debug(
+            "Validation of {} against {} ({}) took {:.6f} seconds".format(
+                filename, schema, method, seconds
+            )
+        )
+
     def get_raw_record(self, root=None):
         logger.debug("writing file {}".format(self.filename))
         if root is None:
@@ -3,7 +3,10 @@ Common interface to XML files which follow the grids format,
 This is not an abstract class - but inherits from the abstact class GenericXML
 """
 
+import weakref
 from collections import OrderedDict
+from copy import deepcopy
+from itertools import combinations
 from CIME.XML.standard_module_setup import *
 from CIME.XML.files import Files
 from CIME.XML.generic_xml import GenericXML
@@ -30,6 +33,12 @@ grid_prefix = {
 
 
 class Grids(GenericXML):
+    # Lookup tables (the grid catalog) built from a parsed config_grids.xml,
+    # keyed by the root element so they are shared by every Grids object
+    # reading the same version of the file.
+    DISABLE_CATALOG = False
+    _CATALOGS = weakref.WeakKeyDictionary()
+
     def __init__(self, infile=None, files=None, comp_interface=None):
         if files is None:
             files = Files(comp_interface=comp_interface)
@@ -64,12 +73,128 @@ class Grids(GenericXML):
 
         return gridnames
 
+    def _get_catalog_section(self, key, build):
+        """
+        Return section key of the grid catalog, calling build() to create it
+        the first time it is needed.
+        """
+        if self.DISABLE_CATALOG:
+            return build()
+
+        catalog = self._CATALOGS.setdefault(self.root.xml_element, {})
+        if key not in catalog:
+            catalog[key] = build()
+
+        return catalog[key]
+
+    def _get_model_grid_nodes(self, alias=None):
+        """
+        Return the model_grid nodes, in file order, optionally only those
+        for alias.
+        """
+
+        def _build():
+            nodes = self.get_children("model_grid", root=self.get_child("grids"))
+            table = {}
+            for node in nodes:
+                table.setdefault(self.get(node, "alias"), []).append(node)
+            return nodes, table
+
+        nodes, table = self._get_catalog_section("model_grids", _build)
+        if alias is None:
+            return nodes
+        return table.get(alias, [])
+
+    def _get_grid_defaults(self):
+        """
+        Return (name, compset, value) of every model_grid_defaults grid
+        """
+
+        def _build():
+            grid_defaults_node = self.get_child(
+                "model_grid_defaults", root=self.get_child("grids")
+            )
+            return [
+                (self.get(node, "name"), self.get(node, "compset"), self.text(node))
+                for node in self.get_children("grid", root=grid_defaults_node)
+            ]
+
+        return self._get_catalog_section("grid_defaults", _build)
+
+    def _get_domain_table(self, driver=None):
+        """
+        Return a dictionary of domain name to domain nodes for the <domains>
+        block, or the <domains driver=driver> block if driver is given.
+        """
+
+        def _build():
+            if driver is None:
+                domains_root = self.get_child("domains")
+            else:
+                domains_root = self.get_optional_child("domains", {"driver": driver})
+            table = {}
+            if domains_root is not None:
+                for node in self.get_children("domain", root=domains_root):
+                    table.setdefault(self.get(node, "name"), []).append(node)
+            return table
+
+        return self._get_catalog_section(("domains", driver), _build)
+
+    def _get_domain_node(self, name, driver=None):
+        """
+        Return the domain node for grid name or None, with the same handling
+        of multiple matches as get_optional_child.
+        """
+        nodes = self._get_domain_table(driver).get(name, [])
+        if len(nodes) > 1:
+            nodes = [node for node in nodes if len(self.attrib(node)) == 1]
+
+        expect(
+            len(nodes) <= 1,
+            "Multiple matches for name '{}' and attribs '{}' in file {}".format(
+                "domain", {"name": name}, self.filename
+            ),
+        )
+        return nodes[0] if nodes else None
+
+    def _get_gridmap_nodes(self, driver, attributes):
+        """
+        Return the gridmap nodes, for driver, matching both attributes (a
+        dictionary of two grid names, e.g. atm_grid and ocn_grid)
+        """
+
+        def _build():
+            tables = []
+            for root in self.get_children("gridmaps"):
+                table = {}
+                for node in self.get_children("gridmap", root=root):
+                    for pair in combinations(sorted(self.attrib(node).items()), 2):
+                        table.setdefault(pair, []).append(node)
+                tables.append((self.get(root, "driver"), table))
+            return tables
+
+        key = tuple(sorted(attributes.items()))
+        gridmap_nodes = []
+        for gmdriver, table in self._get_catalog_section("gridmaps", _build):
+            if gmdriver is None or gmdriver == driver:
+                gridmap_nodes.extend(table.get(key, []))
+
+        return gridmap_nodes
+
     def get_grid_info(self, name, compset, driver):
         """
         Find the matching grid node
 
         Returns a dictionary containing relevant grid variables: domains, gridmaps, etc.
         """
+        grid_info = self._get_catalog_section("grid_info", dict)
+        key = (name, compset, driver)
+        if key not in grid_info:
+            grid_info[key] = self._get_grid_info(name, compset, driver)
+
+        return deepcopy(grid_info[key])
+
+    def _get_grid_info(self, name, compset, driver):
         gridinfo = {}
         atmnlev = None
         lndnlev = None
@@ -133,7 +258,7 @@ class Grids(GenericXML):
         # input grid name -  if there is an alias match determine if the "compset" and "not_compset"
         # regular expression attributes match the match the input compset
 
-        model_gridnodes = self.get_children("model_grid", root=grids_node)
+        model_gridnodes = self._get_model_grid_nodes(name)
         model_gridnode = None
         foundalias = False
         for node in model_gridnodes:
@@ -201,15 +326,11 @@ class Grids(GenericXML):
             model_grid[comp_gridname] = None
 
         if compset is not None:
-            grid_defaults_node = self.get_child("model_grid_defaults", root=grids_node)
-
-            for grid_node in self.get_children("grid", root=grid_defaults_node):
-                name_attrib = self.get(grid_node, "name")
-                compset_attrib = self.get(grid_node, "compset")
+            for name_attrib, compset_attrib, value in self._get_grid_defaults():
                 compset_match = re.search(compset_attrib, compset)
 
                 if compset_match is not None:
-                    model_grid[name_attrib] = self.text(grid_node)
+                    model_grid[name_attrib] = value
 
         grid_nodes = self.get_children("grid", root=model_gridnode)
 
@@ -278,11 +399,7 @@ class Grids(GenericXML):
         if driver == "nuopc":
             # Obtain the root node for the domain entry that sets the mask
             if domains["MASK_GRID"] != "null":
-                mask_domain_node = self.get_optional_child(
-                    "domain",
-                    attributes={"name": domains["MASK_GRID"]},
-                    root=self.get_child("domains"),
-                )
+                mask_domain_node = self._get_domain_node(domains["MASK_GRID"])
                 # Now obtain the mesh for the mask for the domain node for that component grid
                 mesh_node = self.get_child("mesh", root=mask_domain_node)
                 domains["MASK_MESH"] = self.text(mesh_node)
@@ -302,17 +419,9 @@ class Grids(GenericXML):
         - mask_name: the mask being used in this case
         - driver: the name of the driver being used in this case
         """
-        domain_node = self.get_optional_child(
-            "domain",
-            attributes={"name": grid_name_nonlev},
-            root=self.get_child("domains"),
-        )
+        domain_node = self._get_domain_node(grid_name_nonlev)
         if not domain_node:
-            domain_root = self.get_optional_child("domains", {"driver": driver})
-            if domain_root:
-                domain_node = self.get_optional_child(
-                    "domain", attributes={"name": grid_name_nonlev}, root=domain_root
-                )
+            domain_node = self._get_domain_node(grid_name_nonlev, driver=driver)
         if domain_node:
             # determine xml variable name
             if not "PTS_LAT" in domains:
@@ -512,23 +621,10 @@ class Grids(GenericXML):
         - gridvalue: name of grid for compname
         - other_gridvalue: name of grid for other_compname
         """
-        gridmaps_roots = self.get_children("gridmaps")
-        gridmap_nodes = []
-        for root in gridmaps_roots:
-            gmdriver = self.get(root, "driver")
-            if gmdriver is None or gmdriver == driver:
-                gridname = compname + "_grid"
-                other_gridname = other_compname + "_grid"
-                gridmap_nodes.extend(
-                    self.get_children(
-                        "gridmap",
-                        root=root,
-                        attributes={
-                            gridname: gridvalue,
-                            other_gridname: other_gridvalue,
-                        },
-                    )
-                )
+        gridmap_nodes = self._get_gridmap_nodes(
+            driver,
+            {compname + "_grid": gridvalue, other_compname + "_grid": other_gridvalue},
+        )
 
         # We first create a dictionary of gridmaps just for this pair of grids, then later
         # add these grids to the main gridmaps dict using _add_grid_info. The reason for
@@ -572,16 +668,8 @@ class Grids(GenericXML):
                 ""
             )
         )
-        default_nodes = self.get_children(
-            "model_grid_defaults", root=self.get_child("grids")
-        )
-        for default_node in default_nodes:
-            grid_nodes = self.get_children("grid", root=default_node)
-            for grid_node in grid_nodes:
-                name = self.get(grid_node, "name")
-                compset = self.get(grid_node, "compset")
-                value = self.text(grid_node)
-                logger.info("     {:6s}   {:15s}   {:10s}".format(name, compset, value))
+        for name, compset, value in self._get_grid_defaults():
+            logger.info("     {:6s}   {:15s}   {:10s}".format(name, compset, value))
         logger.info(
             "{:5s}-------------------------------------------------------------".format(
                 ""
@@ -590,11 +678,10 @@ class Grids(GenericXML):
 
         domains = {}
         if long:
-            domain_nodes = self.get_children("domain", root=self.get_child("domains"))
-            for domain_node in domain_nodes:
-                name = self.get(domain_node, "name")
+            for name, domain_nodes in self._get_domain_table().items():
                 if name == "null":
                     continue
+                domain_node = domain_nodes[-1]
                 desc = self.text(self.get_child("desc", root=domain_node))
                 files = ""
                 file_nodes = self.get_children("file", root=domain_node)
@@ -616,8 +703,7 @@ class Grids(GenericXML):
                 )
 
         grids_node = self.get_child("grids")
-        model_grid_nodes = self.get_children("model_grid", root=grids_node)
-        for model_grid_node in model_grid_nodes:
+        for model_grid_node in self._get_model_grid_nodes():
             alias = self.get(model_grid_node, "alias")
             compset = self.get(model_grid_node, "compset")
             not_compset = self.get(model_grid_node, "not_compset")
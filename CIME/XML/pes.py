@@ -2,6 +2,8 @@
 Interface to the config_pes.xml file.  This class inherits from GenericXML.py
 """
 
+import weakref
+
 from CIME.XML.standard_module_setup import *
 from CIME.XML.generic_xml import GenericXML
 from CIME.XML.files import Files
@@ -11,6 +13,11 @@ logger = logging.getLogger(__name__)
 
 
 class Pes(GenericXML):
+    # root element -> (override groups, groups), see _get_index
+    _INDEXES = weakref.WeakKeyDictionary()
+    # root element -> {(grid, compset, machine, pesize_opts, mpilib): layout}
+    _LAYOUTS = weakref.WeakKeyDictionary()
+
     def __init__(self, infile, files=None):
         """
         initialize a files object given input pes specification file
@@ -22,6 +29,26 @@ class Pes(GenericXML):
         GenericXML.__init__(self, infile, schema=schema)
 
     def find_pes_layout(self, grid, compset, machine, pesize_opts="M", mpilib=None):
+        """
+        Return the pes layout for grid, compset and machine as a tuple of
+        (ntasks, nthrds, rootpe, pstrid, excl_stride, other_settings, append, comments).
+        Layouts are computed once per file and set of arguments, callers get
+        their own copies of the dictionaries.
+        """
+        layouts = self._LAYOUTS.setdefault(self.root.xml_element, {})
+        key = (grid, compset, machine, pesize_opts, mpilib)
+        layout = layouts.get(key)
+        if layout is None:
+            layout = self._find_pes_layout(
+                grid, compset, machine, pesize_opts=pesize_opts, mpilib=mpilib
+            )
+            layouts[key] = layout
+        else:
+            logger.debug("Pes setting: reusing layout for {}".format(key))
+
+        return tuple(dict(x) if isinstance(x, dict) else x for x in layout)
+
+    def _find_pes_layout(self, grid, compset, machine, pesize_opts, mpilib):
         opes_ntasks = {}
         opes_nthrds = {}
         opes_rootpe = {}
@@ -30,14 +57,12 @@ class Pes(GenericXML):
         oother_settings = {}
         other_settings = {}
         append = {}
-        o_grid_nodes = []
         comments = None
-        # Get any override nodes
-        overrides = self.get_optional_child("overrides")
+        o_groups, groups = self._get_index()
         ocomments = None
 
-        if overrides is not None:
-            o_grid_nodes = self.get_children("grid", root=overrides)
+        # Get any override nodes
+        if o_groups is not None:
             (
                 opes_ntasks,
                 opes_nthrds,
@@ -47,16 +72,7 @@ class Pes(GenericXML):
                 oother_settings,
                 append,
                 ocomments,
-            ) = self._find_matches(
-                o_grid_nodes, grid, compset, machine, pesize_opts, True
-            )
-        # Get all the nodes
-        grid_nodes = self.get_children("grid")
-        if o_grid_nodes:
-            gn_set = set(grid_nodes)
-            ogn_set = set(o_grid_nodes)
-            gn_set.difference_update(ogn_set)
-            grid_nodes = list(gn_set)
+            ) = self._find_matches(o_groups, grid, compset, machine, pesize_opts, True)
 
         (
             pes_ntasks,
@@ -67,7 +83,7 @@ class Pes(GenericXML):
             other_settings,
             os_append,
             comments,
-        ) = self._find_matches(grid_nodes, grid, compset, machine, pesize_opts, False)
+        ) = self._find_matches(groups, grid, compset, machine, pesize_opts, False)
         pes_ntasks.update(opes_ntasks)
         pes_nthrds.update(opes_nthrds)
         pes_rootpe.update(opes_rootpe)
@@ -111,8 +127,58 @@ class Pes(GenericXML):
             comments,
         )
 
+    def _get_index(self):
+        """
+        Return the (override groups, groups) of the file, override groups is
+        None if there is no overrides node. Each group holds the grid match
+        and compiled regex of one grid node with its mach nodes, and each mach
+        node its match, regex and pes nodes:
+        (grid_match, grid_re, [(mach_match, mach_re, [(pes_node, pesize_match, compset_match, compset_re)])])
+        A regex is None where the match is "any".
+        """
+        index = self._INDEXES.get(self.root.xml_element)
+        if index is None:
+            o_groups = None
+            o_grid_nodes = []
+            overrides = self.get_optional_child("overrides")
+            if overrides is not None:
+                o_grid_nodes = self.get_children("grid", root=overrides)
+                o_groups = self._compile_groups(o_grid_nodes)
+
+            grid_nodes = [x for x in self.get_children("grid") if x not in o_grid_nodes]
+            index = (o_groups, self._compile_groups(grid_nodes))
+            self._INDEXES[self.root.xml_element] = index
+
+        return index
+
+    def _compile_groups(self, grid_nodes):
+        def _compile(match):
+            return None if match == "any" else re.compile(match)
+
+        groups = []
+        for grid_node in grid_nodes:
+            grid_match = self.get(grid_node, "name")
+            mach_groups = []
+            for mach_node in self.get_children("mach", root=grid_node):
+                mach_match = self.get(mach_node, "name")
+                pes = []
+                for pes_node in self.get_children("pes", root=mach_node):
+                    compset_match = self.get(pes_node, "compset")
+                    pes.append(
+                        (
+                            pes_node,
+                            self.get(pes_node, "pesize"),
+                            compset_match,
+                            _compile(compset_match),
+                        )
+                    )
+                mach_groups.append((mach_match, _compile(mach_match), pes))
+            groups.append((grid_match, _compile(grid_match), mach_groups))
+
+        return groups
+
     def _find_matches(
-        self, grid_nodes, grid, compset, machine, pesize_opts, override=False
+        self, groups, grid, compset, machine, pesize_opts, override=False
     ):
         grid_choice = None
         mach_choice = None
@@ -138,27 +204,18 @@ class Pes(GenericXML):
         )
         pe_select = None
         comment = None
-        for grid_node in grid_nodes:
-            grid_match = self.get(grid_node, "name")
-            if grid_match == "any" or re.search(grid_match, grid):
-                mach_nodes = self.get_children("mach", root=grid_node)
-                for mach_node in mach_nodes:
-                    mach_match = self.get(mach_node, "name")
-                    if mach_match == "any" or re.search(mach_match, machine):
-                        pes_nodes = self.get_children("pes", root=mach_node)
-                        for pes_node in pes_nodes:
-                            pesize_match = self.get(pes_node, "pesize")
-                            compset_match = self.get(pes_node, "compset")
+        for grid_match, grid_re, mach_groups in groups:
+            if grid_re is None or grid_re.search(grid):
+                for mach_match, mach_re, pes in mach_groups:
+                    if mach_re is None or mach_re.search(machine):
+                        for pes_node, pesize_match, compset_match, compset_re in pes:
                             if (
                                 pesize_match == "any"
                                 or (
                                     pesize_opts is not None
                                     and pesize_match == pesize_opts
                                 )
-                            ) and (
-                                compset_match == "any"
-                                or re.search(compset_match, compset)
-                            ):
+                            ) and (compset_re is None or compset_re.search(compset)):
                                 points = (
                                     int(grid_match != "any") * 3
                                     + int(mach_match != "any") * 7
@@ -31,9 +31,15 @@ Currently supported options are:
 
 - memleak_tolerance: specifies the relative memory growth expected for this test
 
+- memory: MB of memory create_test --mem-pool assumes each phase of this test
+  needs, either one value for all phases or "PHASE=MB PHASE=MB"
+
 - comment: has no effect, but is written out when printing the test list
 
 - workflow: adds a workflow to the test
+
+- hist_compare_tool: the tool that compares the history files of this test,
+  cprnc or python (see CIME.hist_utils.HIST_COMPARE_TOOLS)
 """
 from CIME.XML.standard_module_setup import *
 
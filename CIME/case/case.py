@@ -6,8 +6,10 @@ All interaction with and between the module files in XML/ takes place
 through the Case module.
 """
 from copy import deepcopy
+from collections import namedtuple
 import sys
 import glob, os, shutil, math, time, hashlib, socket, getpass
+import weakref
 from CIME.XML.standard_module_setup import *
 
 # pylint: disable=import-error,redefined-builtin
@@ -50,6 +52,100 @@ logger = logging.getLogger(__name__)
 
 config = Config.instance()
 
+_CachedValue = namedtuple("_CachedValue", ["value", "deps", "env_values"])
+
+FlushStats = namedtuple("FlushStats", ["files_written", "bytes_written", "seconds"])
+
+
+class _LazyEnvFile(object):
+    """
+    Placeholder for an env file object which is not constructed (and its
+    file not read) until it is loaded through _iter_env_files, _find_env_file
+    or Case.load_all_env_files.
+    """
+
+    def __init__(self, filename, factory):
+        self.filename = filename
+        self._factory = factory
+        self._env_file = None
+
+    @property
+    def loaded(self):
+        return self._env_file is not None
+
+    @property
+    def needsrewrite(self):
+        # A file which has not been read has no unflushed changes
+        return self._env_file is not None and self._env_file.needsrewrite
+
+    def load(self):
+        if self._env_file is None:
+            logger.debug("Loading {}".format(self.filename))
+            self._env_file = self._factory()
+        return self._env_file
+
+    def get_id(self):
+        return os.path.basename(self.filename)
+
+    def __eq__(self, other):
+        if isinstance(other, _LazyEnvFile):
+            return self is other
+        return self._env_file is not None and self._env_file is other
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return id(self)
+
+
+def _iter_env_files(env_files):
+    """
+    Iterate the env file objects of the list env_files in lookup order,
+    loading placeholders as they are reached and replacing them in the list,
+    so a lookup which stops at the first env file defining a variable never
+    reads the files after it.
+    """
+    index = 0
+    while index < len(env_files):
+        env_file = env_files[index]
+        if isinstance(env_file, _LazyEnvFile):
+            env_file = env_file.load()
+            env_files[index] = env_file
+        yield env_file
+        index += 1
+
+
+def _iter_loaded_env_files(env_files):
+    """Iterate the env files in env_files which have already been loaded"""
+    for env_file in env_files:
+        if isinstance(env_file, _LazyEnvFile):
+            if env_file.loaded:
+                yield env_file.load()
+        else:
+            yield env_file
+
+
+def _copy_value(value):
+    """
+    Cached values are copied in and out of the cache so that callers can
+    modify the values they are given.
+    """
+    if isinstance(value, (list, dict, set)):
+        return deepcopy(value)
+    return value
+
+
+def _find_env_file(env_files, basename):
+    """Return the env file named basename, loading only that file"""
+    for index, env_file in enumerate(env_files):
+        if os.path.basename(env_file.filename) == basename:
+            if isinstance(env_file, _LazyEnvFile):
+                env_file = env_file.load()
+                env_files[index] = env_file
+            return env_file
+    return None
+
 
 class Case(object):
     """
@@ -122,9 +218,10 @@ class Case(object):
         self._env_entryid_files = []
         self._env_generic_files = []
         self._files = []
-        self._comp_interface = None
+        self._comp_interface_value = None
         self.gpu_enabled = False
         self._non_local = non_local
+        self._clear_value_cache()
         self.read_xml()
 
         srcroot = self.get_value("SRCROOT")
@@ -169,6 +266,9 @@ class Case(object):
         self._is_env_loaded = False
         self._loaded_envs = None
         self._gitinterface = None
+        # statistics of the last flush and bytes written by all flushes
+        self.last_flush = None
+        self.bytes_written = 0
         # these are user_mods as defined in the compset
         # Command Line user_mods are handled seperately
 
@@ -218,7 +318,7 @@ class Case(object):
         return os.path.join(baseline_root, baseline_name)
 
     def check_if_comp_var(self, vid):
-        for env_file in self._env_entryid_files:
+        for env_file in _iter_env_files(self._env_entryid_files):
             new_vid, new_comp, iscompvar = env_file.check_if_comp_var(vid)
             if iscompvar:
                 return new_vid, new_comp, iscompvar
@@ -322,68 +422,115 @@ class Case(object):
         return False
 
     def read_xml(self):
-        for env_file in self._files:
+        for env_file in _iter_loaded_env_files(self._files):
             expect(
                 not env_file.needsrewrite,
                 "Potential loss of unflushed changes in {}".format(env_file.filename),
             )
 
-        self._env_entryid_files = []
-        self._env_entryid_files.append(
-            EnvCase(self._caseroot, components=None, read_only=self._force_read_only)
+        self._clear_value_cache()
+        # env_case.xml is always needed, the remaining files are only read
+        # when first used.
+        env_case = EnvCase(
+            self._caseroot, components=None, read_only=self._force_read_only
         )
-        components = self._env_entryid_files[0].get_values("COMP_CLASSES")
-        self._env_entryid_files.append(
-            EnvRun(
-                self._caseroot, components=components, read_only=self._force_read_only
-            )
+        components = env_case.get_values("COMP_CLASSES")
+        read_only = self._force_read_only
+
+        self._env_entryid_files = [env_case]
+        self._add_lazy_env_file(
+            self._env_entryid_files,
+            "env_run.xml",
+            lambda: EnvRun(self._caseroot, components=components, read_only=read_only),
         )
-        self._env_entryid_files.append(
-            EnvBuild(
-                self._caseroot, components=components, read_only=self._force_read_only
-            )
+        self._add_lazy_env_file(
+            self._env_entryid_files,
+            "env_build.xml",
+            lambda: EnvBuild(
+                self._caseroot, components=components, read_only=read_only
+            ),
         )
-        self._comp_interface = self._env_entryid_files[-1].get_value("COMP_INTERFACE")
-
-        self._env_entryid_files.append(
-            EnvMachPes(
+        self._add_lazy_env_file(
+            self._env_entryid_files,
+            "env_mach_pes.xml",
+            lambda: EnvMachPes(
                 self._caseroot,
                 components=components,
-                read_only=self._force_read_only,
+                read_only=read_only,
                 comp_interface=self._comp_interface,
-            )
+            ),
         )
-        self._env_entryid_files.append(
-            EnvBatch(self._caseroot, read_only=self._force_read_only)
+        self._add_lazy_env_file(
+            self._env_entryid_files,
+            "env_batch.xml",
+            lambda: EnvBatch(self._caseroot, read_only=read_only),
         )
-        self._env_entryid_files.append(
-            EnvWorkflow(self._caseroot, read_only=self._force_read_only)
+        self._add_lazy_env_file(
+            self._env_entryid_files,
+            "env_workflow.xml",
+            lambda: EnvWorkflow(self._caseroot, read_only=read_only),
         )
         if not self._existing_case or os.path.isfile("env_postprocessing.xml"):
-            self._env_entryid_files.append(
-                EnvPostprocessing(self._caseroot, read_only=self._force_read_only)
+            self._add_lazy_env_file(
+                self._env_entryid_files,
+                "env_postprocessing.xml",
+                lambda: EnvPostprocessing(self._caseroot, read_only=read_only),
             )
 
         if os.path.isfile(os.path.join(self._caseroot, "env_test.xml")):
-            self._env_entryid_files.append(
-                EnvTest(
-                    self._caseroot,
-                    components=components,
-                    read_only=self._force_read_only,
-                )
+            self._add_lazy_env_file(
+                self._env_entryid_files,
+                "env_test.xml",
+                lambda: EnvTest(
+                    self._caseroot, components=components, read_only=read_only
+                ),
             )
         self._env_generic_files = []
-        self._env_generic_files.append(
-            EnvMachSpecific(
+        self._add_lazy_env_file(
+            self._env_generic_files,
+            "env_mach_specific.xml",
+            lambda: EnvMachSpecific(
                 self._caseroot,
-                read_only=self._force_read_only,
+                read_only=read_only,
                 comp_interface=self._comp_interface,
-            )
+            ),
         )
-        self._env_generic_files.append(
-            EnvArchive(self._caseroot, read_only=self._force_read_only)
+        self._add_lazy_env_file(
+            self._env_generic_files,
+            "env_archive.xml",
+            lambda: EnvArchive(self._caseroot, read_only=read_only),
         )
         self._files = self._env_entryid_files + self._env_generic_files
+        # COMP_INTERFACE lives in env_build.xml, only read it when needed
+        self._comp_interface_value = None
+
+    def _add_lazy_env_file(self, env_files, basename, factory):
+        env_files.append(_LazyEnvFile(os.path.join(self._caseroot, basename), factory))
+
+    @property
+    def _comp_interface(self):
+        if self._comp_interface_value is None:
+            env_build = _find_env_file(self._files, "env_build.xml")
+            if env_build is not None:
+                self._comp_interface_value = env_build.get_value("COMP_INTERFACE")
+        return self._comp_interface_value
+
+    @_comp_interface.setter
+    def _comp_interface(self, value):
+        self._comp_interface_value = value
+
+    def load_all_env_files(self):
+        """
+        Read every env file of the case, normally they are only read when
+        first used.
+        """
+        for env_files in (
+            self._files,
+            self._env_entryid_files,
+            self._env_generic_files,
+        ):
+            for _ in _iter_env_files(env_files):
+                pass
 
     def get_case_root(self):
         """Returns the root directory for this case."""
@@ -391,9 +538,9 @@ class Case(object):
 
     def get_env(self, short_name, allow_missing=False):
         full_name = "env_{}.xml".format(short_name)
-        for env_file in self._files:
-            if os.path.basename(env_file.filename) == full_name:
-                return env_file
+        env_file = _find_env_file(self._files, full_name)
+        if env_file is not None:
+            return env_file
         if allow_missing:
             return None
         expect(False, "Could not find object for {} in case".format(full_name))
@@ -403,10 +550,12 @@ class Case(object):
             env_file = self.get_env(short_name)
             env_file.check_timestamp()
         else:
-            for env_file in self._files:
+            # files which have not been read yet cannot be out of date
+            for env_file in _iter_loaded_env_files(self._files):
                 env_file.check_timestamp()
 
     def copy(self, newcasename, newcaseroot, newcimeroot=None, newsrcroot=None):
+        self.load_all_env_files()
         newcase = deepcopy(self)
         for env_file in newcase._files:  # pylint: disable=protected-access
             basename = os.path.basename(env_file.filename)
@@ -444,17 +593,36 @@ class Case(object):
             have_postprocessing = False
         if not have_postprocessing:
             # Remove env_postprocessing.xml from self._files
+            self._clear_value_cache()
             self._files = [
                 file
                 for file in self._files
                 if file.get_id() != "env_postprocessing.xml"
             ]
 
-        for env_file in self._files:
-            env_file.write(force_write=flushall)
+        # env files of a new case must all be written, otherwise files which
+        # have not been read cannot have unflushed changes
+        if flushall or not self._existing_case:
+            self.load_all_env_files()
+
+        start = time.time()
+        files_written = 0
+        bytes_written = 0
+        # only files with changes are written unless flushall
+        for env_file in _iter_loaded_env_files(self._files):
+            nbytes = env_file.write(force_write=flushall)
+            if nbytes:
+                files_written += 1
+                bytes_written += nbytes
+
+        self.last_flush = FlushStats(files_written, bytes_written, time.time() - start)
+        self.bytes_written += bytes_written
+        logger.debug(
+            "flush wrote {} files, {} bytes in {:.6f} seconds".format(*self.last_flush)
+        )
 
     def get_values(self, item, attribute=None, resolved=True, subgroup=None):
-        for env_file in self._files:
+        for env_file in _iter_env_files(self._files):
             # Wait and resolve in self rather than in env_file
             results = env_file.get_values(
                 item, attribute, resolved=False, subgroup=subgroup
@@ -487,6 +655,113 @@ class Case(object):
         # Return empty result
         return []
 
+    def _clear_value_cache(self):
+        self._value_cache = {}
+        self._value_dependents = {}
+        self._dependency_names = {}
+        # [(env file, modification count)] of the env files the cache was
+        # built from, see _is_value_cache_current
+        self._value_cache_counts = []
+        self._track_loaded_env_files()
+
+    def _track_loaded_env_files(self):
+        """
+        Record the modification counts of env files read since the value
+        cache was last validated.
+        """
+        tracked = set(id(x[0]) for x in self._value_cache_counts)
+        for env_file in _iter_loaded_env_files(self._files):
+            if id(env_file) not in tracked:
+                self._value_cache_counts.append(
+                    (env_file, env_file.get_modification_count())
+                )
+
+    def _is_value_cache_current(self):
+        """
+        False if any env file the value cache was built from was modified
+        other than through this object.
+        """
+        return all(
+            env_file.get_modification_count() == count
+            for env_file, count in self._value_cache_counts
+        )
+
+    def _get_dependency_name(self, vid):
+        """
+        Dependencies are tracked by base variable name so that NTASKS_ATM
+        and NTASKS (compclass ATM) invalidate each other.
+        """
+        # Only env files which have been read are consulted, a variable is
+        # always looked up (reading the files it needs) before it gets here.
+        env_files = list(_iter_loaded_env_files(self._env_entryid_files))
+        key = (vid, len(env_files))
+        name = self._dependency_names.get(key)
+        if name is None:
+            name = vid
+            for env_file in env_files:
+                new_vid, _, iscompvar = env_file.check_if_comp_var(vid)
+                if iscompvar:
+                    name = new_vid
+                    break
+            self._dependency_names[key] = name
+        return name
+
+    def _get_cached_value(self, key):
+        """
+        Return the _CachedValue for key or None. The whole cache is dropped
+        if any env file was modified other than through this object.
+        """
+        if not self._is_value_cache_current():
+            logger.debug("Env files modified outside of case, clearing value cache")
+            self._clear_value_cache()
+            return None
+
+        cached = self._value_cache.get(key)
+        if cached is None:
+            return None
+
+        for env_var, env_value in cached.env_values:
+            if os.environ.get(env_var) != env_value:
+                del self._value_cache[key]
+                return None
+
+        GenericXML.record_dependencies_from(cached.deps)
+
+        return cached
+
+    def _cache_value(self, key, value, deps):
+        if not deps.cacheable:
+            logger.debug(
+                "Not caching value of {}, it runs a shell command".format(key[0])
+            )
+            return
+
+        env_values = tuple(
+            (env_var, os.environ.get(env_var)) for env_var in sorted(deps.env_vars)
+        )
+        self._value_cache[key] = _CachedValue(value, deps, env_values)
+
+        names = set(self._get_dependency_name(vid) for vid in deps.variables)
+        names.add(self._get_dependency_name(key[0]))
+        for name in names:
+            self._value_dependents.setdefault(name, set()).add(key)
+
+    def _invalidate_value(self, item, up_to_date):
+        """
+        Drop every cached value that depends on item. up_to_date is whether
+        the cache was current before item was changed, if so the cache stays
+        valid for everything that does not depend on item.
+        """
+        for key in self._value_dependents.pop(self._get_dependency_name(item), ()):
+            self._value_cache.pop(key, None)
+
+        if up_to_date:
+            self._value_cache_counts = [
+                (env_file, env_file.get_modification_count())
+                for env_file, _ in self._value_cache_counts
+            ]
+            self._track_loaded_env_files()
+
     def get_value(self, item, attribute=None, resolved=True, subgroup=None):
         # TODO this needs to be moved into either create_test or create_newcase
         if item == "GPU_ENABLED":
@@ -498,7 +773,27 @@ class Case(object):
                     self.gpu_enabled = True
             return "true" if self.gpu_enabled else "false"
 
-        for env_file in self._files:
+        key = (
+            item,
+            None if attribute is None else tuple(sorted(attribute.items())),
+            resolved,
+            subgroup,
+        )
+
+        cached = self._get_cached_value(key)
+        if cached is not None:
+            return _copy_value(cached.value)
+
+        with GenericXML.record_dependencies() as deps:
+            result = self._get_value(item, attribute, resolved, subgroup)
+
+        self._track_loaded_env_files()
+        self._cache_value(key, _copy_value(result), deps)
+
+        return result
+
+    def _get_value(self, item, attribute=None, resolved=True, subgroup=None):
+        for env_file in _iter_env_files(self._files):
             # Wait and resolve in self rather than in env_file
             result = env_file.get_value(
                 item, attribute, resolved=False, subgroup=subgroup
@@ -532,7 +827,7 @@ class Case(object):
         # Empty result
         result = []
 
-        for env_file in self._env_entryid_files:
+        for env_file in _iter_env_files(self._env_entryid_files):
             # Wait and resolve in self rather than in env_file
             logger.debug(
                 "(get_record_field) Searching in {}".format(env_file.__class__.__name__)
@@ -561,7 +856,7 @@ class Case(object):
                         result.append(env_file.filename)
 
         if not result:
-            for env_file in self._env_generic_files:
+            for env_file in _iter_env_files(self._env_generic_files):
                 roots = env_file.scan_children(variable)
                 for root in roots:
                     if root is not None:
@@ -576,7 +871,7 @@ class Case(object):
 
     def get_type_info(self, item):
         result = None
-        for env_file in self._env_entryid_files:
+        for env_file in _iter_env_files(self._env_entryid_files):
             result = env_file.get_type_info(item)
             if result is not None:
                 return result
@@ -589,7 +884,7 @@ class Case(object):
         num_unresolved = item.count("$") if item else 0
         recurse_limit = 10
         if num_unresolved > 0 and recurse < recurse_limit:
-            for env_file in self._env_entryid_files:
+            for env_file in _iter_env_files(self._env_entryid_files):
                 item = env_file.get_resolved_value(
                     item,
                     allow_unresolved_envvars=allow_unresolved_envvars,
@@ -639,10 +934,12 @@ class Case(object):
             self._caseroot = value
         result = None
 
-        for env_file in self._files:
+        up_to_date = self._is_value_cache_current()
+        for env_file in _iter_env_files(self._files):
             result = env_file.set_value(item, value, subgroup, ignore_type)
             if result is not None:
                 logger.debug("Will rewrite file {} {}".format(env_file.filename, item))
+                self._invalidate_value(item, up_to_date)
                 return (result, env_file.filename) if return_file else result
 
         if len(self._files) == 1:
@@ -667,10 +964,12 @@ class Case(object):
         )
 
         result = None
-        for env_file in self._env_entryid_files:
+        up_to_date = self._is_value_cache_current()
+        for env_file in _iter_env_files(self._env_entryid_files):
             result = env_file.set_valid_values(item, valid_values)
             if result is not None:
                 logger.debug("Will rewrite file {} {}".format(env_file.filename, item))
+                self._invalidate_value(item, up_to_date)
                 return result
 
     def set_lookup_value(self, item, value):
@@ -683,6 +982,7 @@ class Case(object):
         else:
             logger.debug("Setting in lookups: item {}, value {}".format(item, value))
             self.lookups[item] = value
+            self._invalidate_value(item, self._is_value_cache_current())
 
     def clean_up_lookups(self, allow_undefined=False):
         # put anything in the lookups table into existing env objects
@@ -943,16 +1243,32 @@ class Case(object):
     # Note: interstitial digits are included (e.g., in FV3GFS).
     __mod_match_re__ = re.compile(r"([^%]*[^0-9%]+)")
 
+    # files root element -> {drv_config_file: (comp_classes, comp_hash)}
+    _COMPONENT_TABLES = weakref.WeakKeyDictionary()
+
     def valid_compset(self, compset_name, compset_alias, files):
         """Add stub models missing in <compset_name>, return full compset name.
         <files> is used to collect set of all supported components.
         """
+        comp_classes, comp_hash = self._get_component_table(files)
+        return self._valid_compset_impl(
+            compset_name, compset_alias, comp_classes, comp_hash
+        )
+
+    def _get_component_table(self, files):
+        """Return the supported component classes and the hash of model names
+        to component class index, built once per version of <files>.
+        """
         # First, create hash of model names
         # A note about indexing. Relevant component classes start at 1
         # because we ignore CPL for finding model components.
         # Model components would normally start at zero but since we are
         # dealing with a compset, 0 is reserved for the time field
         drv_config_file = files.get_value("CONFIG_CPL_FILE")
+        tables = Case._COMPONENT_TABLES.setdefault(files.root.xml_element, {})
+        if drv_config_file in tables:
+            return tables[drv_config_file]
+
         drv_comp = Component(drv_config_file, "CPL")
         comp_classes = drv_comp.get_valid_model_components()
         comp_hash = {}  # Hash model name to component class index
@@ -976,9 +1292,8 @@ class Case(object):
                 mod_match = Case.__mod_match_re__.match(model.lower()).group(1)
                 comp_hash[mod_match] = comp_ind
 
-        return self._valid_compset_impl(
-            compset_name, compset_alias, comp_classes, comp_hash
-        )
+        tables[drv_config_file] = (comp_classes, comp_hash)
+        return comp_classes, comp_hash
 
     def _set_info_from_primary_component(self, files, pesfile=None):
         """
@@ -1050,7 +1365,7 @@ class Case(object):
         return components
 
     def __iter__(self):
-        for entryid_file in self._env_entryid_files:
+        for entryid_file in _iter_env_files(self._env_entryid_files):
             for key, val in entryid_file:
                 if isinstance(val, str) and "$" in val:
                     yield key, self.get_resolved_value(val)
@@ -1059,7 +1374,7 @@ class Case(object):
 
     def set_comp_classes(self, comp_classes):
         self._component_classes = comp_classes
-        for env_file in self._env_entryid_files:
+        for env_file in _iter_env_files(self._env_entryid_files):
             env_file.set_components(comp_classes)
 
     def _get_component_config_data(self, files):
@@ -1075,12 +1390,12 @@ class Case(object):
         # to deal with. This list follows the same order as compset longnames follow.
 
         # Add the group and elements for the config_files.xml
-        for env_file in self._env_entryid_files:
+        for env_file in _iter_env_files(self._env_entryid_files):
             env_file.add_elements_by_group(files, attlist)
 
         drv_config_file = files.get_value("CONFIG_CPL_FILE")
         drv_comp = Component(drv_config_file, "CPL")
-        for env_file in self._env_entryid_files:
+        for env_file in _iter_env_files(self._env_entryid_files):
             env_file.add_elements_by_group(drv_comp, attributes=attlist)
 
         drv_config_file_model_specific = files.get_value(
@@ -1105,7 +1420,7 @@ class Case(object):
         )
         if len(self._component_description["CPL"]) > 0:
             logger.info("Com forcing is {}".format(self._component_description["CPL"]))
-        for env_file in self._env_entryid_files:
+        for env_file in _iter_env_files(self._env_entryid_files):
             env_file.add_elements_by_group(drv_comp_model_specific, attributes=attlist)
 
         self.clean_up_lookups(allow_undefined=True)
@@ -1168,7 +1483,7 @@ class Case(object):
                     comp_class, self._component_description[comp_class]
                 )
             )
-            for env_file in self._env_entryid_files:
+            for env_file in _iter_env_files(self._env_entryid_files):
                 env_file.add_elements_by_group(compobj, attributes=attlist)
         self.clean_up_lookups(allow_undefined=self._comp_interface == "nuopc")
 
@@ -1635,9 +1950,7 @@ class Case(object):
             # Add cupid related fields to env_mach_pes.xml
             env_mach_pes = self.get_env("mach_pes")
             if env_mach_pes.get_value("CUPID_NTASKS") is None:
-                env_mach_pes.unlock()
                 env_mach_pes.add_elements_by_group(srcobj=postprocessing)
-                env_mach_pes.lock()
         env_batch.set_batch_system(batch, batch_system_type=batch_system_type)
 
         bjobs = workflow.get_workflow_jobs(machine=machine_name, workflowid=workflowid)
@@ -2304,6 +2617,7 @@ directory, NOT in this subdirectory."""
         expect(
             new_env_file is not None, "No match found for file type {}".format(ftype)
         )
+        self._clear_value_cache()
         self._files = [new_env_file]
 
     def update_env(self, new_object, env_file, blow_away=False):
@@ -2317,6 +2631,7 @@ directory, NOT in this subdirectory."""
                 "Potential loss of unflushed changes in {}".format(env_file),
             )
 
+        self._clear_value_cache()
         new_object.filename = old_object.filename
         if old_object in self._env_entryid_files:
             self._env_entryid_files.remove(old_object)
@@ -314,6 +314,21 @@ class Config(ConfigBase):
             False,
             desc="If set to `True` then the TestScheduler will sort tests by runtime.",
         )
+        self._set_attribute(
+            "critical_path_scheduling",
+            False,
+            desc="If set to `True` then the TestScheduler will record the time of each phase to BASELINE_ROOT and launch phases by longest remaining critical path, using the times recorded by previous runs.",
+        )
+        self._set_attribute(
+            "max_hist_compare_workers",
+            0,
+            desc="The maximum number of cprnc history file comparisons a test runs at once. If set to `0` then the cores available are used, as long as there is memory available for the largest files compared.",
+        )
+        self._set_attribute(
+            "hist_compare_tool",
+            "cprnc",
+            desc="The tool that compares history files, either `cprnc` or `python`. The `python` tool compares the files in-process with numpy and netCDF4 instead of running the cprnc executable, one file at a time. A test selects a tool with the `hist_compare_tool` testlist option.",
+        )
         self._set_attribute(
             "calculate_mode_build_cost",
             False,
@@ -7,6 +7,7 @@ from __future__ import print_function
 from CIME.XML.standard_module_setup import *
 from CIME.XML.expected_fails_file import ExpectedFailsFile
 from CIME.test_status import TestStatus, SHAREDLIB_BUILD_PHASE, TEST_PEND_STATUS
+from CIME import status_index
 import os
 import sys
 from collections import defaultdict
@@ -21,6 +22,7 @@ def cs_status(
     check_memory=False,
     expected_fails_filepath=None,
     force_rebuild=False,
+    use_index=False,
     out=sys.stdout,
 ):
     """Print the test statuses of all tests in test_paths. The default
@@ -42,6 +44,10 @@ def cs_status(
     If expected_fails_filepath is provided, it should be a string giving
     the full path to a file listing expected failures for this test
     suite. Expected failures are then labeled as such in the output.
+
+    If use_index is True, statuses are read through the status index of each
+    test root, which only re-parses the TestStatus files that changed since
+    the last report.
     """
     expect(not (summary and fails_only), "Cannot have both summary and fails_only")
     expect(
@@ -54,14 +60,29 @@ def cs_status(
     xfails = _get_xfails(expected_fails_filepath)
     test_id_output = defaultdict(str)
     test_id_counts = defaultdict(int)
-    for test_path in test_paths:
-        test_dir = os.path.dirname(test_path)
-        ts = TestStatus(test_dir=test_dir)
-
-        if force_rebuild:
-            with ts:
+    if force_rebuild:
+        for test_path in test_paths:
+            with TestStatus(test_dir=os.path.dirname(test_path)) as ts:
                 ts.set_status(SHAREDLIB_BUILD_PHASE, TEST_PEND_STATUS)
 
+    if use_index:
+        indexed = status_index.get_test_statuses(test_paths)
+        # A path that is not indexed gives the usual error for a missing file
+        test_statuses = (
+            indexed[os.path.abspath(x)]
+            if os.path.abspath(x) in indexed
+            else TestStatus(test_dir=os.path.dirname(x))
+            for x in test_paths
+        )
+        if count_fails_phase_list:
+            non_pass_counts = status_index.count_non_passes(
+                test_paths, count_fails_phase_list
+            )
+    else:
+        test_statuses = (TestStatus(test_dir=os.path.dirname(x)) for x in test_paths)
+
+    for test_path, ts in zip(test_paths, test_statuses):
+        test_dir = os.path.dirname(test_path)
         test_id = os.path.basename(test_dir).split(".")[-1]
         if summary:
             output = _overall_output(
@@ -83,7 +104,7 @@ def cs_status(
                 skip_phase_list=count_fails_phase_list,
                 xfails=xfails.get(ts.get_name()),
             )
-            if count_fails_phase_list:
+            if count_fails_phase_list and not use_index:
                 ts.increment_non_pass_counts(non_pass_counts)
 
         test_id_output[test_id] += output
@@ -6,11 +6,19 @@ import logging
 import os
 import re
 import filecmp
+import hashlib
+import json
 import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from CIME.XML.standard_module_setup import *
 from CIME.config import Config
-from CIME.test_status import TEST_NO_BASELINES_COMMENT, TEST_STATUS_FILENAME
+from CIME.test_status import (
+    TEST_NO_BASELINES_COMMENT,
+    TEST_STATUS_FILENAME,
+    TestStatus,
+)
 from CIME.utils import (
     get_current_commit,
     get_timestamp,
@@ -23,6 +31,9 @@ from CIME.core.exceptions import CIMEError
 logger = logging.getLogger(__name__)
 
 BLESS_LOG_NAME = "bless_log"
+# Content hashes of the baseline hist files, written by generate_baseline
+HASH_MANIFEST_NAME = "hist_hashes.json"
+_HASH_BLOCK_SIZE = 1024 * 1024
 
 # ------------------------------------------------------------------------
 # Strings used in the comments generated by cprnc
@@ -40,6 +51,7 @@ FIELDLISTS_DIFFER = "had a different field list from"
 DIFF_COMMENT = "did NOT match"
 FAILED_OPEN = "Failed to open file"
 IDENTICAL = "the two files seem to be IDENTICAL"
+HASH_IDENTICAL = "hash-identical"
 # COMPARISON_COMMENT_OPTIONS should include all of the above: these are any of the special
 # comment strings that describe the reason for a comparison failure
 COMPARISON_COMMENT_OPTIONS = set(
@@ -50,6 +62,11 @@ COMPARISON_FAILURE_COMMENT_OPTIONS = COMPARISON_COMMENT_OPTIONS - set(
     [NO_COMPARE, FIELDLISTS_DIFFER]
 )
 
+# The tools _compare_hists can compare hist files with, see _get_compare_tool
+CPRNC_TOOL = "cprnc"
+PYTHON_TOOL = "python"
+HIST_COMPARE_TOOLS = (CPRNC_TOOL, PYTHON_TOOL)
+
 NO_HIST_TESTS = ["IRT", "PFS", "TSC"]
 ALL_HIST_TESTS = ["MVK", "MVKO", "PGN", "TSC"]
 
@@ -284,6 +301,237 @@ def _hists_match(model, hists1, hists2, suffix1="", suffix2=""):
     return one_not_two, two_not_one, match_ups
 
 
+def _get_available_memory():
+    """
+    Return the memory available for new processes in bytes, or None if unknown
+    """
+    try:
+        with open("/proc/meminfo", "r") as fd:
+            for line in fd:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError) as e:
+        logger.debug(
+            "Available memory unknown, not limiting comparisons by it: {}".format(e)
+        )
+        return None
+
+    logger.debug("No MemAvailable in /proc/meminfo, not limiting comparisons by it")
+
+    return None
+
+
+def _get_compare_workers(file_pairs, max_workers=None):
+    """
+    Return how many of the cprnc comparisons of file_pairs to run at once. If
+    max_workers is not given it is the max_hist_compare_workers setting, or if
+    that is 0, the available cores limited by the available memory for the
+    largest pair.
+    """
+    if max_workers is None:
+        max_workers = Config.instance().max_hist_compare_workers
+
+    if max_workers <= 0:
+        try:
+            max_workers = len(os.sched_getaffinity(0))
+        except AttributeError:
+            max_workers = os.cpu_count() or 1
+
+        mem_avail = _get_available_memory()
+        if mem_avail is not None and file_pairs:
+            # cprnc reads both files of a pair
+            largest = max(
+                sum(os.path.getsize(x) for x in pair if os.path.exists(x))
+                for pair in file_pairs
+            )
+            if largest > 0:
+                max_workers = min(max_workers, mem_avail // largest)
+
+    return max(1, min(max_workers, len(file_pairs)))
+
+
+def _get_compare_tool(case):
+    """
+    Return the tool that compares the hist files of case, the
+    HIST_COMPARE_TOOL test parameter (the hist_compare_tool testlist option)
+    if set, otherwise the hist_compare_tool setting.
+    """
+    compare_tool = None
+    if case.get_value("TEST"):
+        compare_tool = case.get_env("test").get_test_parameter("HIST_COMPARE_TOOL")
+
+    if not compare_tool:
+        compare_tool = Config.instance().hist_compare_tool
+
+    expect(
+        compare_tool in HIST_COMPARE_TOOLS,
+        "Unknown hist compare tool '{}', expected one of {}".format(
+            compare_tool, ", ".join(HIST_COMPARE_TOOLS)
+        ),
+    )
+
+    return compare_tool
+
+
+def _cprnc_no_raise(*args, compare_tool=CPRNC_TOOL, **kwargs):
+    """
+    Run cprnc, or compare_netcdf if compare_tool is PYTHON_TOOL, errors are
+    returned in the comment instead of raised.
+
+    Returns (success, cprnc_log_file, cprnc_comment) like cprnc
+    """
+    start_time = time.time()
+    success = False
+    cprnc_log_file = None
+    compare_func = compare_netcdf if compare_tool == PYTHON_TOOL else cprnc
+
+    try:
+        success, cprnc_log_file, cprnc_comment = compare_func(*args, **kwargs)
+    except CIMEError as e:
+        cprnc_comment = str(e)
+    except Exception as e:
+        cprnc_comment = f"Unknown CRPRC error: {e!s}"
+
+    logger.info(
+        "{} compared {} and {} in {:.2f} seconds".format(
+            compare_tool, args[1], args[2], time.time() - start_time
+        )
+    )
+
+    return success, cprnc_log_file, cprnc_comment
+
+
+def _get_file_hash(filename):
+    """
+    Return the sha256 hex digest of the contents of filename, read in blocks
+    so large hist files are never held in memory.
+    """
+    sha = hashlib.sha256()
+    with open(filename, "rb") as fd:
+        for block in iter(lambda: fd.read(_HASH_BLOCK_SIZE), b""):
+            sha.update(block)
+
+    return sha.hexdigest()
+
+
+def _get_manifest_entry(filename):
+    """
+    Return the hash manifest entry of filename, or None if it cannot be read
+    """
+    try:
+        stat = os.stat(filename)
+        sha = _get_file_hash(filename)
+    except OSError as e:
+        logger.warning("Could not hash {}: {}".format(filename, e))
+        return None
+
+    return {"sha256": sha, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _write_hash_manifest(baseline_dir, baselines):
+    """
+    Write the content hashes of baselines, paths of files in baseline_dir, to
+    the hash manifest of baseline_dir. The size and mtime of each file are
+    recorded so a file changed after the manifest was written is not trusted.
+    """
+    entries = []
+    if baselines:
+        with ThreadPoolExecutor() as executor:
+            entries = list(executor.map(_get_manifest_entry, baselines))
+
+    manifest = {
+        os.path.relpath(baseline, baseline_dir): entry
+        for baseline, entry in zip(baselines, entries)
+        if entry is not None
+    }
+
+    manifest_path = os.path.join(baseline_dir, HASH_MANIFEST_NAME)
+    with open(manifest_path + ".tmp", "w", encoding="utf-8") as fd:
+        json.dump(manifest, fd, indent=2, sort_keys=True)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+
+def _read_hash_manifest(baseline_dir):
+    """
+    Return a dictionary of path relative to baseline_dir -> (size, sha256) of
+    the baseline files in the hash manifest of baseline_dir that are unchanged
+    since it was written. Returns an empty dictionary if there is no usable
+    manifest, the comparison then falls back to cprnc for every file.
+    """
+    manifest_path = os.path.join(baseline_dir, HASH_MANIFEST_NAME)
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as fd:
+            manifest = json.load(fd)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning("Ignoring hash manifest {}: {}".format(manifest_path, e))
+        return {}
+
+    hashes = {}
+    for relpath, entry in manifest.items():
+        try:
+            stat = os.stat(os.path.join(baseline_dir, relpath))
+            if (stat.st_size, stat.st_mtime_ns) == (entry["size"], entry["mtime_ns"]):
+                hashes[relpath] = (entry["size"], entry["sha256"])
+        except (OSError, KeyError, TypeError):
+            pass
+
+    return hashes
+
+
+def _compare_no_raise(
+    expected_hash, model, file1, file2, case, rundir, outfile_suffix="", **kwargs
+):
+    """
+    Compare two hist files, skipping cprnc if file1 has the expected_hash
+    (size, sha256) of file2. A skipped comparison still gets a short output
+    file, in the spirit of the cprnc output.
+
+    Returns (success, cprnc_log_file, cprnc_comment) like cprnc, with
+    HASH_IDENTICAL as the comment if cprnc was skipped.
+    """
+    if expected_hash is not None:
+        start_time = time.time()
+        size, sha = expected_hash
+        try:
+            hash_identical = (
+                os.path.getsize(file1) == size and _get_file_hash(file1) == sha
+            )
+        except OSError:
+            hash_identical = False
+
+        if hash_identical:
+            logger.info(
+                "{} and {} are {} in {:.2f} seconds".format(
+                    file1, file2, HASH_IDENTICAL, time.time() - start_time
+                )
+            )
+
+            output_filename = None
+            if outfile_suffix is not None:
+                output_filename = _get_cprnc_output_filename(
+                    model, file1, file2, rundir, outfile_suffix
+                )
+                try:
+                    with open(output_filename, "w", encoding="utf-8") as fd:
+                        fd.write(
+                            "file 1={}\nfile 2={}\n\n sha256 {} of the baseline hash manifest\n\n"
+                            "  diff_test: the two files seem to be IDENTICAL (sha256 match)\n".format(
+                                file1, file2, sha
+                            )
+                        )
+                except OSError as e:
+                    logger.warning("Could not write {}: {}".format(output_filename, e))
+                    output_filename = None
+
+            return True, output_filename, HASH_IDENTICAL
+
+    return _cprnc_no_raise(
+        model, file1, file2, case, rundir, outfile_suffix=outfile_suffix, **kwargs
+    )
+
+
 def _compare_hists(
     case,
     from_dir1,
@@ -292,9 +540,20 @@ def _compare_hists(
     suffix2="",
     outfile_suffix="",
     ignore_fieldlist_diffs=False,
+    max_workers=None,
+    hashes2=None,
+    compare_tool=None,
 ):
     """
-    Compares two sets of history files
+    Compares two sets of history files. The cprnc comparisons run concurrently,
+    at most max_workers at a time, see _get_compare_workers.
+
+    hashes2 is an optional dictionary of path relative to from_dir2 -> (size,
+    sha256), see _read_hash_manifest. Files whose contents have the hash of
+    their counterpart are reported as matching without running cprnc.
+
+    compare_tool is one of HIST_COMPARE_TOOLS, by default the tool selected for
+    the case, see _get_compare_tool.
 
     Returns (success (True if all matched), comments, num_compared)
     """
@@ -309,6 +568,11 @@ def _compare_hists(
     comments = "Comparing hists for case '{}' dir1='{}', suffix1='{}',  dir2='{}' suffix2='{}'\n".format(
         casename, from_dir1, suffix1, from_dir2, suffix2
     )
+    # The comments in the order they are reported, with the index of a cprnc
+    # comparison in place of its result, so the order does not depend on which
+    # comparison finishes first
+    report = []
+    compares = []  # [(model, hist1, hist2, multiinst_driver_compare)]
     multiinst_driver_compare = False
     archive = case.get_env("archive")
     ref_case = case.get_value("RUN_REFCASE")
@@ -321,7 +585,7 @@ def _compare_hists(
             continue
         if model == "cpl" and suffix2 == "multiinst":
             multiinst_driver_compare = True
-        comments += "  comparing model '{}'\n".format(model)
+        report.append("  comparing model '{}'\n".format(model))
         hists1 = archive.get_latest_hist_files(
             casename, model, from_dir1, suffix=suffix1, ref_case=ref_case
         )
@@ -330,7 +594,7 @@ def _compare_hists(
         )
 
         if len(hists1) == 0 and len(hists2) == 0:
-            comments += "    no hist files found for model {}\n".format(model)
+            report.append("    no hist files found for model {}\n".format(model))
             continue
 
         one_not_two, two_not_one, match_ups = _hists_match(
@@ -339,16 +603,20 @@ def _compare_hists(
         for item in one_not_two:
             if "initial" in item:
                 continue
-            comments += "    File '{}' {} in '{}' with suffix '{}'\n".format(
-                item, NO_COMPARE, from_dir2, suffix2
+            report.append(
+                "    File '{}' {} in '{}' with suffix '{}'\n".format(
+                    item, NO_COMPARE, from_dir2, suffix2
+                )
             )
             all_success = False
 
         for item in two_not_one:
             if "initial" in item:
                 continue
-            comments += "    File '{}' {} in '{}' with suffix '{}'\n".format(
-                item, NO_ORIGINAL, from_dir1, suffix1
+            report.append(
+                "    File '{}' {} in '{}' with suffix '{}'\n".format(
+                    item, NO_ORIGINAL, from_dir1, suffix1
+                )
             )
             all_success = False
 
@@ -359,52 +627,107 @@ def _compare_hists(
                 logger.info("Ignoring non-netcdf file {}".format(hist1))
                 continue
 
-            success = False
-            cprnc_log_file = None
+            report.append(len(compares))
+            compares.append((model, hist1, hist2, multiinst_driver_compare))
+
+    if hashes2 is None:
+        hashes2 = {}
 
-            try:
-                success, cprnc_log_file, cprnc_comment = cprnc(
+    if compare_tool is None:
+        compare_tool = _get_compare_tool(case)
+
+    results = []
+    if compares:
+        if compare_tool == PYTHON_TOOL:
+            # The netCDF library is not thread-safe, compare_netcdf runs in
+            # this process so the files are compared one at a time
+            num_workers = 1
+        else:
+            num_workers = _get_compare_workers(
+                [
+                    (os.path.join(from_dir1, x[1]), os.path.join(from_dir2, x[2]))
+                    for x in compares
+                ],
+                max_workers=max_workers,
+            )
+        logger.info(
+            "Running {} {} comparisons, {} at a time".format(
+                len(compares), compare_tool, num_workers
+            )
+        )
+        compare_kwargs = {"compare_tool": compare_tool}
+        if compare_tool == CPRNC_TOOL:
+            # Looked up once, the case is not read from the worker threads
+            compare_kwargs["cprnc_exe"] = case.get_value("CCSM_CPRNC")
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            futures = [
+                executor.submit(
+                    _compare_no_raise,
+                    hashes2.get(
+                        os.path.relpath(os.path.join(from_dir2, hist2), from_dir2)
+                    ),
                     model,
                     os.path.join(from_dir1, hist1),
                     os.path.join(from_dir2, hist2),
                     case,
                     from_dir1,
-                    multiinst_driver_compare=multiinst_driver_compare,
+                    multiinst_driver_compare=multiinst,
                     outfile_suffix=outfile_suffix,
                     ignore_fieldlist_diffs=ignore_fieldlist_diffs,
+                    **compare_kwargs,
                 )
-            except CIMEError as e:
-                cprnc_comment = str(e)
-            except Exception as e:
-                cprnc_comment = f"Unknown CRPRC error: {e!s}"
+                for model, hist1, hist2, multiinst in compares
+            ]
+            for future in as_completed(futures):
+                success, cprnc_log_file, _ = future.result()
+                if not success and not cprnc_log_file:
+                    # The comparison stops at a file that could not be
+                    # compared, the comparisons not started are not needed
+                    for x in futures:
+                        x.cancel()
+                    break
+
+            results = [None if x.cancelled() else x.result() for x in futures]
+
+    for item in report:
+        if not isinstance(item, int):
+            comments += item
+            continue
 
-            if success:
-                comments += "    {} matched {}\n".format(hist1, hist2)
-            else:
-                if not cprnc_log_file:
-                    comments += cprnc_comment
-                    all_success = False
-                    return all_success, comments, 0
-                elif cprnc_comment == CPRNC_FIELDLISTS_DIFFER:
-                    comments += "    {} {} {}\n".format(hist1, FIELDLISTS_DIFFER, hist2)
-                else:
-                    comments += "    {} {} {}\n".format(hist1, DIFF_COMMENT, hist2)
-                comments += "    cat " + cprnc_log_file + "\n"
-                expected_log_file = os.path.join(
-                    casedir, os.path.basename(cprnc_log_file)
-                )
-                if not (
-                    os.path.exists(expected_log_file)
-                    and filecmp.cmp(cprnc_log_file, expected_log_file)
-                ):
-                    try:
-                        safe_copy(cprnc_log_file, casedir)
-                    except (OSError, IOError) as _:
-                        logger.warning(
-                            "Could not copy {} to {}".format(cprnc_log_file, casedir)
-                        )
+        if results[item] is None:
+            # Cancelled after a file that could not be compared
+            continue
+
+        _, hist1, hist2, _ = compares[item]
+        success, cprnc_log_file, cprnc_comment = results[item]
 
+        if success and cprnc_comment == HASH_IDENTICAL:
+            comments += "    {} matched {} ({})\n".format(hist1, hist2, HASH_IDENTICAL)
+        elif success:
+            comments += "    {} matched {}\n".format(hist1, hist2)
+        else:
+            if not cprnc_log_file:
+                comments += cprnc_comment
                 all_success = False
+                return all_success, comments, 0
+            elif cprnc_comment == CPRNC_FIELDLISTS_DIFFER:
+                comments += "    {} {} {}\n".format(hist1, FIELDLISTS_DIFFER, hist2)
+            else:
+                comments += "    {} {} {}\n".format(hist1, DIFF_COMMENT, hist2)
+            comments += "    cat " + cprnc_log_file + "\n"
+            expected_log_file = os.path.join(casedir, os.path.basename(cprnc_log_file))
+            if not (
+                os.path.exists(expected_log_file)
+                and filecmp.cmp(cprnc_log_file, expected_log_file)
+            ):
+                try:
+                    safe_copy(cprnc_log_file, casedir)
+                except (OSError, IOError) as _:
+                    logger.warning(
+                        "Could not copy {} to {}".format(cprnc_log_file, casedir)
+                    )
+
+            all_success = False
 
     # Some tests don't save history files.
     if num_compared == 0 and testcase not in NO_HIST_TESTS:
@@ -446,6 +769,37 @@ def compare_test(case, suffix1, suffix2, ignore_fieldlist_diffs=False):
     )
 
 
+def _get_cprnc_output_filename(model, file1, file2, rundir, outfile_suffix):
+    """
+    Return the path of the output of comparing file1 and file2
+
+    >>> _get_cprnc_output_filename("cam", "/a/case.cam.h0.nc", "/b/case.cam.h0.nc", "/run", "")
+    '/run/case.cam.h0.nc.cprnc.out'
+    >>> _get_cprnc_output_filename("cam", "/a/case.cam_0001.h0.0001.nc", "/b/case.cam.h0.0001.nc", "/run", "base")
+    '/run/case.cam_0001.h0.0001.nc_0001.cprnc.out.base'
+    """
+    basename = os.path.basename(file1)
+    multiinst_regex = re.compile(r".*%s[^_]*(_[0-9]{4})[.]h.?[.][^.]+?[.]nc" % model)
+    mstr = ""
+    mstr1 = ""
+    mstr2 = ""
+    #  If one is a multiinstance file but the other is not add an instance string
+    m1 = multiinst_regex.match(file1)
+    m2 = multiinst_regex.match(file2)
+    if m1 is not None:
+        mstr1 = m1.group(1)
+    if m2 is not None:
+        mstr2 = m2.group(1)
+    if mstr1 != mstr2:
+        mstr = mstr1 + mstr2
+
+    output_filename = os.path.join(rundir, "{}{}.cprnc.out".format(basename, mstr))
+    if outfile_suffix:
+        output_filename += ".{}".format(outfile_suffix)
+
+    return output_filename
+
+
 def cprnc(
     model,
     file1,
@@ -486,24 +840,9 @@ def cprnc(
         f"cprnc {cprnc_exe} does not exist or is not executable",
     )
 
-    basename = os.path.basename(file1)
-    multiinst_regex = re.compile(r".*%s[^_]*(_[0-9]{4})[.]h.?[.][^.]+?[.]nc" % model)
-    mstr = ""
-    mstr1 = ""
-    mstr2 = ""
-    #  If one is a multiinstance file but the other is not add an instance string
-    m1 = multiinst_regex.match(file1)
-    m2 = multiinst_regex.match(file2)
-    if m1 is not None:
-        mstr1 = m1.group(1)
-    if m2 is not None:
-        mstr2 = m2.group(1)
-    if mstr1 != mstr2:
-        mstr = mstr1 + mstr2
-
-    output_filename = os.path.join(rundir, "{}{}.cprnc.out".format(basename, mstr))
-    if outfile_suffix:
-        output_filename += ".{}".format(outfile_suffix)
+    output_filename = _get_cprnc_output_filename(
+        model, file1, file2, rundir, outfile_suffix
+    )
 
     if outfile_suffix is None:
         cpr_stat, out, _ = run_cmd(
@@ -561,6 +900,69 @@ def cprnc(
     return (files_match, output_filename, comment)
 
 
+def compare_netcdf(
+    model,
+    file1,
+    file2,
+    case,
+    rundir,
+    multiinst_driver_compare=False,
+    outfile_suffix="",
+    ignore_fieldlist_diffs=False,
+):
+    """Compare two individual netcdf files in-process with CIME.netcdf_compare,
+    an alternative to cprnc that needs numpy and netCDF4 instead of a cprnc
+    executable. Takes the same arguments as cprnc.
+
+    The report is written where cprnc writes its output.
+
+    Returns:
+        Tuple bool, str, str: (files_match, output_filename, comment) like cprnc
+    """
+    try:
+        from CIME import netcdf_compare
+    except ImportError as e:
+        expect(
+            False,
+            "The {} hist compare tool needs numpy and netCDF4: {}".format(
+                PYTHON_TOOL, e
+            ),
+        )
+
+    try:
+        result = netcdf_compare.compare_files(file1, file2)
+    except OSError as e:
+        raise CIMEError("{}: {}".format(FAILED_OPEN, e))
+
+    comment = ""
+    if multiinst_driver_compare:
+        # The multiinstance cpl hist file has different dimensions, only check
+        # that the fields that could be compared have no differences
+        files_match = result.num_differing == 0
+    elif result.identical:
+        files_match = True
+    elif (
+        result.num_differing == 0
+        and result.num_not_compared == 0
+        and result.fieldlists_differ
+    ):
+        files_match = ignore_fieldlist_diffs
+        if not files_match:
+            comment = CPRNC_FIELDLISTS_DIFFER
+    else:
+        files_match = False
+
+    output_filename = None
+    if outfile_suffix is not None:
+        output_filename = _get_cprnc_output_filename(
+            model, file1, file2, rundir, outfile_suffix
+        )
+        with open(output_filename, "w", encoding="utf-8") as fd:
+            fd.write(result.summary())
+
+    return (files_match, output_filename, comment)
+
+
 def compare_baseline(case, baseline_dir=None, outfile_suffix=""):
     """Compare the current test output to a baseline result
 
@@ -588,7 +990,11 @@ def compare_baseline(case, baseline_dir=None, outfile_suffix=""):
             )
 
     success, comments, _ = _compare_hists(
-        case, rundir, basecmp_dir, outfile_suffix=outfile_suffix
+        case,
+        rundir,
+        basecmp_dir,
+        outfile_suffix=outfile_suffix,
+        hashes2=_read_hash_manifest(basecmp_dir),
     )
     if Config.instance().create_bless_log:
         bless_log = os.path.join(basecmp_dir, BLESS_LOG_NAME)
@@ -611,6 +1017,7 @@ def generate_teststatus(testdir, baseline_dir):
             if not os.path.isdir(baseline_dir):
                 os.makedirs(baseline_dir)
 
+            TestStatus(test_dir=testdir).compact()
             safe_copy(
                 os.path.join(testdir, TEST_STATUS_FILENAME),
                 baseline_dir,
@@ -669,6 +1076,7 @@ def _generate_baseline_impl(case, baseline_dir=None, allow_baseline_overwrite=Fa
 
     comments = "Generating baselines into '{}'\n".format(basegen_dir)
     num_gen = 0
+    baselines = []
     for model in _iter_model_file_substrs(case):
 
         comments += "  generating for model '{}'\n".format(model)
@@ -694,10 +1102,22 @@ def _generate_baseline_impl(case, baseline_dir=None, allow_baseline_overwrite=Fa
                 os.remove(baseline)
 
             safe_copy(os.path.join(rundir, hist), baseline, preserve_meta=False)
+            baselines.append(baseline)
             comments += "    generating baseline '{}' from file {}\n".format(
                 baseline, hist
             )
 
+    # lets compare_baseline skip cprnc for bit-for-bit hist files, the
+    # baselines are complete without it
+    try:
+        _write_hash_manifest(basegen_dir, baselines)
+    except OSError as e:
+        logger.warning(
+            "Could not write the hash manifest of {}, every hist file will be compared in full: {}".format(
+                basegen_dir, e
+            )
+        )
+
     # copy latest cpl log to baseline
     # drop the date so that the name is generic
     if case.get_value("COMP_INTERFACE") == "nuopc":
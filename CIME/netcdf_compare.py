@@ -0,0 +1,260 @@
+"""
+An in-process alternative to cprnc for comparing two netCDF history files,
+built on NumPy and netCDF4.
+
+Variables are read in slabs along their first dimension so memory use is
+bounded by chunk_size elements per file, regardless of the size of the
+history files. Like cprnc, variables whose dimensions differ between the files
+are not compared, and variables that are in only one of the files make the
+field lists differ. Character variables, such as the date_written and
+time_written stamps of history files, are not compared either, since they
+differ between bit-for-bit runs.
+"""
+
+from CIME.XML.standard_module_setup import *
+
+import math
+
+import numpy as np
+import netCDF4
+
+logger = logging.getLogger(__name__)
+
+# Number of elements of a variable read from each file at once
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+class FieldDiff(object):
+    """
+    The differences of one variable that is in both files
+    """
+
+    def __init__(self, name, dims1, dims2, is_char=False):
+        self.name = name
+        self.dims1 = dims1
+        self.dims2 = dims2
+        self.is_char = is_char
+        # Compared means the dimensions of the variable match, character
+        # variables are never compared
+        self.compared = dims1 == dims2 and not is_char
+        self.num_compared = 0
+        self.num_diffs = 0
+        self.max_abs_diff = 0.0
+        self.max_rel_diff = 0.0
+        self._sum_sq_diff = 0.0
+
+    @property
+    def rms_diff(self):
+        if self.num_compared == 0:
+            return 0.0
+
+        return math.sqrt(self._sum_sq_diff / self.num_compared)
+
+    @property
+    def differs(self):
+        return self.num_diffs > 0
+
+    def update(self, data1, data2):
+        """
+        Accumulate the differences of two slabs of the variable
+        """
+        data1 = np.asarray(data1)
+        data2 = np.asarray(data2)
+        self.num_compared += data1.size
+
+        if not (
+            np.issubdtype(data1.dtype, np.number)
+            and np.issubdtype(data2.dtype, np.number)
+        ):
+            self.num_diffs += int(np.count_nonzero(data1 != data2))
+            return
+
+        data1 = data1.astype(np.float64, copy=False)
+        data2 = data2.astype(np.float64, copy=False)
+
+        # NaN in the same place in both files is not a difference
+        both_nan = np.isnan(data1) & np.isnan(data2)
+        diffs = (data1 != data2) & ~both_nan
+        num_diffs = int(np.count_nonzero(diffs))
+        if num_diffs == 0:
+            return
+
+        self.num_diffs += num_diffs
+
+        with np.errstate(invalid="ignore", divide="ignore", over="ignore"):
+            abs_diff = np.abs(data1[diffs] - data2[diffs])
+            scale = np.maximum(np.abs(data1[diffs]), np.abs(data2[diffs]))
+            rel_diff = np.where(scale > 0, abs_diff / scale, 0.0)
+
+        # A NaN in one file only is an infinite difference
+        abs_diff = np.where(np.isnan(abs_diff), np.inf, abs_diff)
+        rel_diff = np.where(np.isnan(rel_diff), np.inf, rel_diff)
+
+        self.max_abs_diff = max(self.max_abs_diff, float(abs_diff.max()))
+        self.max_rel_diff = max(self.max_rel_diff, float(rel_diff.max()))
+        with np.errstate(over="ignore"):
+            self._sum_sq_diff += float(np.sum(abs_diff * abs_diff))
+
+    def __str__(self):
+        if self.is_char:
+            return "{} not compared, character variable".format(self.name)
+
+        if not self.compared:
+            return "{} not compared, dimensions {} and {} differ".format(
+                self.name, self.dims1, self.dims2
+            )
+
+        return "{} compared {} diffs {} max_abs_diff {:.6e} max_rel_diff {:.6e} rms_diff {:.6e}".format(
+            self.name,
+            self.num_compared,
+            self.num_diffs,
+            self.max_abs_diff,
+            self.max_rel_diff,
+            self.rms_diff,
+        )
+
+
+class CompareResult(object):
+    """
+    The result of comparing two netCDF files
+    """
+
+    def __init__(self, file1, file2):
+        self.file1 = file1
+        self.file2 = file2
+        self.fields = []
+        self.only_in_file1 = []
+        self.only_in_file2 = []
+
+    @property
+    def num_differing(self):
+        """
+        Number of compared variables that had differences
+        """
+        return len([x for x in self.fields if x.differs])
+
+    @property
+    def num_not_compared(self):
+        """
+        Number of variables not compared because their dimensions differ
+        """
+        return len([x for x in self.fields if not x.compared and not x.is_char])
+
+    @property
+    def fieldlists_differ(self):
+        return bool(self.only_in_file1 or self.only_in_file2)
+
+    @property
+    def identical(self):
+        """
+        True if the files have the same variables with the same values, like
+        cprnc finding the two files IDENTICAL
+        """
+        return (
+            self.num_differing == 0
+            and self.num_not_compared == 0
+            and not self.fieldlists_differ
+        )
+
+    def summary(self):
+        """
+        Return a text report of the comparison, in the spirit of the cprnc
+        output
+        """
+        lines = ["file 1={}".format(self.file1), "file 2={}".format(self.file2), ""]
+        lines.extend(str(x) for x in self.fields)
+        for name in self.only_in_file1:
+            lines.append("{} is only in file 1".format(name))
+        for name in self.only_in_file2:
+            lines.append("{} is only in file 2".format(name))
+
+        lines.append("")
+        lines.append(
+            " {} variables compared, {} had non-zero differences, {} were not compared".format(
+                len([x for x in self.fields if x.compared]),
+                self.num_differing,
+                self.num_not_compared,
+            )
+        )
+        if self.identical:
+            lines.append("  diff_test: the two files seem to be IDENTICAL")
+        elif (
+            self.num_differing == 0
+            and self.num_not_compared == 0
+            and self.fieldlists_differ
+        ):
+            lines.append("  diff_test: the two files DIFFER only in their field lists")
+        else:
+            lines.append("  diff_test: the two files seem to be DIFFERENT")
+
+        return "\n".join(lines) + "\n"
+
+
+def _is_char(var):
+    """
+    True for character variables, arrays of chars or strings
+    """
+    return var.dtype == str or np.dtype(var.dtype).kind in "SU"
+
+
+def _iter_slabs(var1, var2, chunk_size):
+    """
+    Yield matching slabs of var1 and var2, split along the first dimension
+    """
+    if var1.ndim == 0:
+        yield var1.getValue(), var2.getValue()
+        return
+
+    row_size = int(np.prod(var1.shape[1:], dtype=np.int64))
+    rows = max(1, chunk_size // max(1, row_size))
+    for start in range(0, var1.shape[0], rows):
+        stop = min(start + rows, var1.shape[0])
+        yield var1[start:stop], var2[start:stop]
+
+
+def compare_files(file1, file2, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Compare the variables of two netCDF files.
+
+    Returns a CompareResult
+    """
+    result = CompareResult(file1, file2)
+
+    with netCDF4.Dataset(file1, "r") as nc1, netCDF4.Dataset(file2, "r") as nc2:
+        names1 = list(nc1.variables)
+        names2 = set(nc2.variables)
+
+        result.only_in_file1 = [x for x in names1 if x not in names2]
+        result.only_in_file2 = sorted(names2 - set(names1))
+
+        for name in names1:
+            if name not in names2:
+                continue
+
+            var1 = nc1.variables[name]
+            var2 = nc2.variables[name]
+            # Compare the values as stored, like cprnc
+            var1.set_auto_maskandscale(False)
+            var2.set_auto_maskandscale(False)
+
+            field = FieldDiff(
+                name,
+                tuple(zip(var1.dimensions, var1.shape)),
+                tuple(zip(var2.dimensions, var2.shape)),
+                is_char=_is_char(var1) or _is_char(var2),
+            )
+            result.fields.append(field)
+
+            if not field.compared:
+                continue
+
+            for data1, data2 in _iter_slabs(var1, var2, chunk_size):
+                field.update(data1, data2)
+
+    logger.debug(
+        "Compared {} and {}, {} of {} variables differ".format(
+            file1, file2, result.num_differing, len(result.fields)
+        )
+    )
+
+    return result
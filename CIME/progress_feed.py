@@ -0,0 +1,74 @@
+"""
+Machine readable progress of a create_test run, for dashboards and tools that
+want to follow a run without reading every TestStatus file.
+"""
+
+from CIME.XML.standard_module_setup import *
+import json
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def get_progress_path(test_root, test_id):
+    """
+    Return the path of the progress feed of test_id
+
+    >>> get_progress_path("/tmp/tests", "20240101_000000")
+    '/tmp/tests/create_test.20240101_000000.progress.json'
+    """
+    return os.path.join(test_root, "create_test.{}.progress.json".format(test_id))
+
+
+class ProgressFeed(object):
+    """
+    A JSON file that is replaced atomically on every write, so readers always
+    see a complete document. Writes are throttled to one per min_interval
+    seconds, an update that was throttled is pending until the next write.
+    """
+
+    def __init__(self, path, min_interval=1.0):
+        self._path = path
+        self.min_interval = min_interval
+        self.pending = False
+        self._last_write = None
+
+    def update(self, get_progress, force=False):
+        """
+        Write the dictionary returned by get_progress, unless the last write was
+        less than min_interval seconds ago and force is False. get_progress is
+        only called if there is a write.
+
+        Returns True if the file was written.
+        """
+        now = time.time()
+        if (
+            not force
+            and self._last_write is not None
+            and now - self._last_write < self.min_interval
+        ):
+            self.pending = True
+            return False
+
+        progress = get_progress()
+        progress["updated"] = now
+
+        tmp_path = "{}.tmp".format(self._path)
+        try:
+            with open(tmp_path, "w") as fd:
+                json.dump(progress, fd)
+
+            os.replace(tmp_path, self._path)
+        except OSError:
+            # We NEVER want a failure here to kill the run
+            logger.warning(
+                "Failed to write progress to {}: {}".format(
+                    self._path, sys.exc_info()[1]
+                )
+            )
+
+        self._last_write = now
+        self.pending = False
+
+        return True
@@ -19,6 +19,8 @@ logger = logging.getLogger(__name__)
 
 _WALLTIME_BASELINE_NAME = "walltimes"
 _WALLTIME_FILE_NAME = "walltimes"
+_PHASE_TIMES_FILE_NAME = "phase-times"
+_PHASE_MEMORY_FILE_NAME = "phase-memory"
 _GLOBAL_MINUMUM_TIME = 900
 _GLOBAL_WIGGLE = 1000
 _WALLTIME_TOLERANCE = ((600, 2.0), (1800, 1.5), (9999999999, 1.25))
@@ -71,6 +73,96 @@ def save_test_time(baseline_root, test, time_seconds, commit):
             logger.warning("Failed to store test time: {}".format(sys.exc_info()[1]))
 
 
+def parse_phase_values(text):
+    """
+    Parse a "PHASE=value PHASE=value" string into a dictionary of phase -> int
+
+    >>> parse_phase_values("XML=3 MODEL_BUILD=120")
+    {'XML': 3, 'MODEL_BUILD': 120}
+    """
+    phase_values = {}
+    for item in text.split():
+        phase, value = item.split("=")
+        phase_values[phase] = int(value)
+
+    return phase_values
+
+
+def _read_phase_values(baseline_root, test, file_name, what):
+    phase_values = {}
+    if baseline_root is not None:
+        try:
+            the_path = os.path.join(
+                baseline_root, _WALLTIME_BASELINE_NAME, test, file_name
+            )
+            if os.path.exists(the_path):
+                with open(the_path, "r") as fd:
+                    for line in fd:
+                        phase_values.update(parse_phase_values(line))
+
+        except Exception:
+            # We NEVER want a failure here to kill the run
+            logger.warning("Failed to read {}: {}".format(what, sys.exc_info()[1]))
+
+    return phase_values
+
+
+def _save_phase_values(baseline_root, test, phase_values, file_name, what):
+    if baseline_root is not None and phase_values:
+        try:
+            with SharedArea():
+                the_dir = os.path.join(baseline_root, _WALLTIME_BASELINE_NAME, test)
+                if not os.path.exists(the_dir):
+                    os.makedirs(the_dir)
+
+                the_path = os.path.join(the_dir, file_name)
+                with open(the_path, "a") as fd:
+                    fd.write(
+                        "{}\n".format(
+                            " ".join(
+                                "{}={:d}".format(phase, int(value))
+                                for phase, value in phase_values.items()
+                            )
+                        )
+                    )
+
+        except Exception:
+            # We NEVER want a failure here to kill the run
+            logger.warning("Failed to store {}: {}".format(what, sys.exc_info()[1]))
+
+
+def get_test_phase_times_based_on_past(baseline_root, test):
+    """
+    Returns a dictionary of phase -> seconds for the phases of test recorded by
+    previous runs, the most recent time of each phase wins.
+    """
+    return _read_phase_values(
+        baseline_root, test, _PHASE_TIMES_FILE_NAME, "phase times"
+    )
+
+
+def save_test_phase_times(baseline_root, test, phase_times):
+    _save_phase_values(
+        baseline_root, test, phase_times, _PHASE_TIMES_FILE_NAME, "phase times"
+    )
+
+
+def get_test_phase_memory_based_on_past(baseline_root, test):
+    """
+    Returns a dictionary of phase -> MB used by the largest process of the phases
+    of test recorded by previous runs, the most recent value of each phase wins.
+    """
+    return _read_phase_values(
+        baseline_root, test, _PHASE_MEMORY_FILE_NAME, "phase memory"
+    )
+
+
+def save_test_phase_memory(baseline_root, test, phase_memory):
+    _save_phase_values(
+        baseline_root, test, phase_memory, _PHASE_MEMORY_FILE_NAME, "phase memory"
+    )
+
+
 _SUCCESS_BASELINE_NAME = "success-history"
 _SUCCESS_FILE_NAME = "last-transitions"
 
@@ -0,0 +1,134 @@
+"""
+Journal of the scheduling decisions of a create_test run, so that an interrupted
+run can be resumed with create_test --resume
+"""
+
+from CIME.XML.standard_module_setup import *
+import json
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def get_journal_path(test_root, test_id):
+    """
+    Return the path of the scheduler journal of test_id
+
+    >>> get_journal_path("/tmp/tests", "20240101_000000")
+    '/tmp/tests/create_test.20240101_000000.journal'
+    """
+    return os.path.join(test_root, "create_test.{}.journal".format(test_id))
+
+
+class SchedulerJournal(object):
+    """
+    An append-only file of JSON records, one per line. The first record of a run
+    describes the schedule (tests, build groups and phases), the following
+    records the start and end of each phase of each test.
+
+    Every record is flushed to disk before returning so that the journal
+    survives the create_test process, or the node, going down.
+    """
+
+    def __init__(self, path):
+        self._path = path
+        self._lock = threading.Lock()
+        self._fd = None
+
+    def open(self, tests, build_groups, phases, resume=False):
+        """
+        Open the journal for writing. A new run replaces any existing journal, a
+        resumed run appends to it.
+        """
+        self._fd = open(self._path, "a" if resume else "w")
+        self._write(
+            {
+                "type": "resume" if resume else "schedule",
+                "tests": list(tests),
+                "build_groups": [list(x) for x in build_groups],
+                "phases": list(phases),
+            }
+        )
+
+    def close(self):
+        if self._fd is not None:
+            self._fd.close()
+            self._fd = None
+
+    def record_start(self, test, phase):
+        self._write({"type": "start", "test": test, "phase": phase})
+
+    def record_end(self, test, phase, status, exeroot=None):
+        record = {"type": "end", "test": test, "phase": phase, "status": status}
+        if exeroot is not None:
+            record["exeroot"] = exeroot
+
+        self._write(record)
+
+    def _write(self, record):
+        with self._lock:
+            self._fd.write(json.dumps(record) + "\n")
+            self._fd.flush()
+            os.fsync(self._fd.fileno())
+
+    def load(self):
+        """
+        Return the state recorded in the journal as a dictionary with keys:
+            tests: the list of tests of the run
+            build_groups: the list of build groups (tuples of tests)
+            phases: the list of phases of the run
+            ends: test -> {phase -> status} of the phases that finished
+            in_flight: test -> phase that started but did not finish
+            exeroots: test -> EXEROOT of build group leaders
+
+        Returns None if there is no journal.
+        """
+        if not os.path.exists(self._path):
+            return None
+
+        state = None
+        with open(self._path, "r") as fd:
+            for line in fd:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # The last record may be incomplete if we went down writing it
+                    logger.warning(
+                        "Ignoring corrupt record in {}: {}".format(self._path, line)
+                    )
+                    continue
+
+                if record["type"] == "schedule":
+                    state = {
+                        "tests": record["tests"],
+                        "build_groups": [tuple(x) for x in record["build_groups"]],
+                        "phases": record["phases"],
+                        "ends": {},
+                        "in_flight": {},
+                        "exeroots": {},
+                    }
+                    continue
+
+                expect(
+                    state is not None,
+                    "Scheduler journal {} does not start with a schedule".format(
+                        self._path
+                    ),
+                )
+
+                if record["type"] == "start":
+                    state["in_flight"][record["test"]] = record["phase"]
+
+                elif record["type"] == "end":
+                    test = record["test"]
+                    state["ends"].setdefault(test, {})[record["phase"]] = record[
+                        "status"
+                    ]
+                    if state["in_flight"].get(test) == record["phase"]:
+                        del state["in_flight"][test]
+
+                    if "exeroot" in record:
+                        state["exeroots"][test] = record["exeroot"]
+
+        return state
@@ -28,7 +28,7 @@ https://github.com/ESMCI/cime
 """
 from CIME.Tools.standard_script_setup import *
 from CIME import get_tests
-from CIME.test_scheduler import TestScheduler, RUN_PHASE
+from CIME.test_scheduler import TestScheduler, RUN_PHASE, PHASE_BACKENDS
 from CIME import utils
 from CIME.utils import (
     expect,
@@ -86,6 +86,31 @@ def parse_command_line(args, description):
         "\nlatest PEND state or re-run the first failed state. Requires test-id",
     )
 
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Resume an interrupted create_test run from the scheduler journal it "
+        "\nkept under the test root. Phases that finished are not run again, "
+        "\ninterrupted phases are re-run. Requires test-id",
+    )
+
+    parser.add_argument(
+        "--distributed",
+        action="store_true",
+        help="Queue the shell phases (create_newcase, setup, builds and no-batch runs) "
+        "\nfor create_test_worker processes instead of running them here. Start a "
+        "\nworker on each node with create_test_worker <test-root>/create_test.<test-id>.work. "
+        "\n--proc-pool should be the total procs of all workers",
+    )
+
+    parser.add_argument(
+        "--local-workers",
+        type=int,
+        default=0,
+        help="Implies --distributed and starts this many workers on this node, "
+        "\nsharing the procs of --proc-pool",
+    )
+
     default = get_default_setting(config, "SAVE_TIMING", False, check_main=False)
 
     parser.add_argument(
@@ -531,6 +556,24 @@ def parse_command_line(args, description):
         "Slower, but potentially more reliable.",
     )
 
+    parser.add_argument(
+        "--phase-backend",
+        choices=PHASE_BACKENDS,
+        default="thread",
+        help="How create_test runs the phases of the tests. 'process' runs the "
+        "\npython-heavy phases (XML) in a pool of worker processes so they can use "
+        "\nmultiple cores, other phases always run in threads.",
+    )
+
+    parser.add_argument(
+        "--mem-pool",
+        type=int,
+        help="The number of MB of memory create_test is allowed to use at one time. "
+        "\nPhases are only started if both their procs and their estimated memory fit, "
+        "\nestimates come from previous runs or the 'memory' option of a test. "
+        "\nBy default, memory is not accounted for.",
+    )
+
     CIME.utils.add_mail_type_args(parser)
 
     args = CIME.utils.parse_args_and_handle_standard_logging_options(args, parser)
@@ -597,6 +640,14 @@ def parse_command_line(args, description):
     if args.use_existing:
         expect(args.test_id is not None, "Must provide test-id of pre-existing cases")
 
+    if args.resume:
+        expect(args.test_id is not None, "Must provide test-id of the run to resume")
+
+    expect(
+        args.local_workers >= 0,
+        "Invalid value for local_workers: %d" % args.local_workers,
+    )
+
     if args.no_setup:
         args.no_build = True
 
@@ -830,6 +881,11 @@ def parse_command_line(args, description):
         args.ninja,
         args.gmake,
         args.driver,
+        args.phase_backend,
+        args.mem_pool,
+        args.resume,
+        args.distributed,
+        args.local_workers,
     )
 
 
@@ -996,6 +1052,11 @@ def create_test(
     ninja,
     gmake,
     driver,
+    phase_backend="thread",
+    mem_pool=None,
+    resume=False,
+    distributed=False,
+    local_workers=0,
 ):
     ###############################################################################
     impl = TestScheduler(
@@ -1042,6 +1103,11 @@ def create_test(
         ninja=ninja,
         gmake=gmake,
         driver=driver,
+        phase_backend=phase_backend,
+        mem_pool=mem_pool,
+        resume=resume,
+        distributed=distributed,
+        local_workers=local_workers,
     )
 
     success = impl.run_tests(
@@ -1151,12 +1217,18 @@ def _main_func(description=None):
         ninja,
         gmake,
         driver,
+        phase_backend,
+        mem_pool,
+        resume,
+        distributed,
+        local_workers,
     ) = parse_command_line(sys.argv, description)
 
     success = False
     run_count = 0
     while not success and run_count <= retry:
         use_existing = use_existing if run_count == 0 else True
+        resume = resume if run_count == 0 else False
         allow_baseline_overwrite = allow_baseline_overwrite if run_count == 0 else True
         success = create_test(
             test_names,
@@ -1209,6 +1281,11 @@ def _main_func(description=None):
             ninja,
             gmake,
             driver,
+            phase_backend,
+            mem_pool,
+            resume,
+            distributed,
+            local_workers,
         )
         run_count += 1
 
@@ -0,0 +1,389 @@
+"""
+An SQLite index of the TestStatus files of a test root, so that tools that
+report on many tests (cs.status, wait_for_tests, dashboards) only read the
+TestStatus files that changed since the last report.
+
+The index lives in the test root and is shared by everyone reporting on it. A
+TestStatus file is re-parsed when the inode, size or mtime of it or of its
+journal changed. Someone who cannot write the index works on a private copy of
+it in memory.
+"""
+
+from CIME.XML.standard_module_setup import *
+from CIME.test_status import (
+    TestStatus,
+    TEST_STATUS_FILENAME,
+    TEST_STATUS_JOURNAL_FILENAME,
+    TEST_PASS_STATUS,
+)
+import os
+import sqlite3
+import urllib.parse
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+STATUS_INDEX_FILENAME = "cs.status.db"
+
+# Bump when the schema changes, older indexes are rebuilt
+_SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tests (
+    test_path TEXT PRIMARY KEY,
+    test_name TEXT,
+    test_id TEXT,
+    signature TEXT,
+    overall_status TEXT,
+    overall_phase TEXT
+);
+CREATE TABLE IF NOT EXISTS phases (
+    test_path TEXT,
+    seq INTEGER,
+    phase TEXT,
+    status TEXT,
+    comments TEXT,
+    PRIMARY KEY (test_path, seq)
+);
+CREATE INDEX IF NOT EXISTS phases_by_status ON phases (phase, status);
+"""
+
+# Seconds to wait for another process that is refreshing the index
+_LOCK_TIMEOUT = 60
+
+
+def get_status_index_path(test_root):
+    """
+    Return the path of the status index of test_root
+
+    >>> get_status_index_path("/tmp/tests")
+    '/tmp/tests/cs.status.db'
+    """
+    return os.path.join(test_root, STATUS_INDEX_FILENAME)
+
+
+def get_test_root(test_path):
+    """
+    Return the test root of a TestStatus path
+
+    >>> get_test_root("/tmp/tests/ERS.f19_g16.A.docker_gnu.20240101_000000/TestStatus")
+    '/tmp/tests'
+    """
+    return os.path.dirname(os.path.dirname(os.path.abspath(test_path)))
+
+
+def _get_signature(test_dir):
+    signature = []
+    for filename in [TEST_STATUS_FILENAME, TEST_STATUS_JOURNAL_FILENAME]:
+        try:
+            stat = os.stat(os.path.join(test_dir, filename))
+        except OSError:
+            signature.append("-")
+        else:
+            signature.append(
+                "{:d}:{:d}:{:d}".format(stat.st_ino, stat.st_size, stat.st_mtime_ns)
+            )
+
+    return " ".join(signature)
+
+
+class StatusIndex(object):
+    """
+    The status index of one test root. test_paths are paths to TestStatus
+    files, like the arguments of cs.status.
+    """
+
+    def __init__(self, test_root):
+        self._path = get_status_index_path(test_root)
+        try:
+            if self._is_writable():
+                self._conn = self._connect(self._path)
+            else:
+                logger.debug(
+                    "Cannot write status index {}, using a copy".format(self._path)
+                )
+                self._conn = self._copy_to_memory()
+        except sqlite3.Error as e:
+            # We NEVER want a missing index to stop a report
+            logger.warning(
+                "Cannot use status index {}, using a temporary one: {}".format(
+                    self._path, e
+                )
+            )
+            self._conn = self._init_schema(sqlite3.connect(":memory:"))
+
+    def _is_writable(self):
+        """
+        SQLite needs to write the index and, for its journal, the test root
+        """
+        if not os.access(os.path.dirname(self._path), os.W_OK):
+            return False
+
+        return not os.path.exists(self._path) or os.access(self._path, os.W_OK)
+
+    def _copy_to_memory(self):
+        """
+        Return a connection to an in-memory copy of the index, so that the
+        TestStatus files unchanged since the last refresh are not re-parsed
+        """
+        conn = sqlite3.connect(":memory:")
+        if os.path.isfile(self._path):
+            uri = "file:{}?mode=ro".format(
+                urllib.parse.quote(os.path.abspath(self._path))
+            )
+            try:
+                source = sqlite3.connect(uri, uri=True, timeout=_LOCK_TIMEOUT)
+                try:
+                    source.backup(conn)
+                finally:
+                    source.close()
+            except sqlite3.Error as e:
+                logger.debug("Cannot copy status index {}: {}".format(self._path, e))
+
+        return self._init_schema(conn)
+
+    @classmethod
+    def _connect(cls, path):
+        return cls._init_schema(sqlite3.connect(path, timeout=_LOCK_TIMEOUT))
+
+    @staticmethod
+    def _init_schema(conn):
+        if conn.execute("PRAGMA user_version").fetchone()[0] != _SCHEMA_VERSION:
+            with conn:
+                conn.execute("DROP TABLE IF EXISTS tests")
+                conn.execute("DROP TABLE IF EXISTS phases")
+                conn.execute("PRAGMA user_version = {:d}".format(_SCHEMA_VERSION))
+
+        with conn:
+            conn.executescript(_SCHEMA)
+
+        return conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self):
+        self._conn.close()
+
+    def refresh(self, test_paths):
+        """
+        Re-parse the TestStatus files of test_paths that changed since the last
+        refresh, and drop those that no longer exist.
+
+        Returns the number of TestStatus files that were parsed.
+        """
+        test_paths = [os.path.abspath(x) for x in test_paths]
+        known = dict(self._conn.execute("SELECT test_path, signature FROM tests"))
+
+        changed = []
+        missing = []
+        for test_path in test_paths:
+            test_dir = os.path.dirname(test_path)
+            signature = _get_signature(test_dir)
+            if signature == "- -":
+                missing.append(test_path)
+            elif known.get(test_path) != signature:
+                changed.append((test_path, signature, TestStatus(test_dir=test_dir)))
+
+        try:
+            self._update(missing, changed)
+        except sqlite3.OperationalError as e:
+            # For example a read-only file system
+            logger.warning(
+                "Cannot update status index {}, using a copy: {}".format(self._path, e)
+            )
+            self._conn.close()
+            self._conn = self._copy_to_memory()
+            self._update(missing, changed)
+
+        logger.debug(
+            "Parsed {} of {} TestStatus files for {}".format(
+                len(changed), len(test_paths), self._path
+            )
+        )
+
+        return len(changed)
+
+    def _update(self, missing, changed):
+        with self._conn:
+            for test_path in missing:
+                self._delete(test_path)
+
+            for test_path, signature, ts in changed:
+                self._delete(test_path)
+                overall_status, overall_phase = ts.get_overall_test_status()
+                self._conn.execute(
+                    "INSERT INTO tests VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        test_path,
+                        ts.get_name(),
+                        os.path.basename(os.path.dirname(test_path)).split(".")[-1],
+                        signature,
+                        overall_status,
+                        overall_phase,
+                    ),
+                )
+                self._conn.executemany(
+                    "INSERT INTO phases VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (
+                            test_path,
+                            seq,
+                            phase,
+                            ts.get_status(phase),
+                            ts.get_comment(phase),
+                        )
+                        for seq, (phase, _) in enumerate(ts)
+                    ],
+                )
+
+    def _delete(self, test_path):
+        self._conn.execute("DELETE FROM tests WHERE test_path = ?", (test_path,))
+        self._conn.execute("DELETE FROM phases WHERE test_path = ?", (test_path,))
+
+    def get_test_statuses(self, test_paths):
+        """
+        Return an ordered dictionary of test_path -> read-only TestStatus built
+        from the index, for the test_paths that are in the index.
+        """
+        test_paths = [os.path.abspath(x) for x in test_paths]
+        names = {}
+        phases = {}
+        for test_path, test_name in self._select(
+            "SELECT test_path, test_name FROM tests", test_paths
+        ):
+            names[test_path] = test_name
+            phases[test_path] = []
+
+        for test_path, phase, status, comments in self._select(
+            "SELECT test_path, phase, status, comments FROM phases", test_paths, "seq"
+        ):
+            phases[test_path].append((phase, status, comments))
+
+        return OrderedDict(
+            (
+                x,
+                TestStatus(
+                    test_dir=os.path.dirname(x),
+                    test_name=names[x],
+                    phase_statuses=phases[x],
+                ),
+            )
+            for x in test_paths
+            if x in names
+        )
+
+    def find_tests(self, phase, status, test_paths=None):
+        """
+        Return the names of the tests whose phase has status, for example all
+        FAILs in MODEL_BUILD
+        """
+        return [
+            x[0]
+            for x in self._select(
+                "SELECT DISTINCT tests.test_name FROM tests JOIN phases USING (test_path) "
+                "WHERE phases.phase = ? AND phases.status = ?",
+                test_paths,
+                "tests.test_name",
+                params=(phase, status),
+            )
+        ]
+
+    def count_non_passes(self, phases, test_paths=None):
+        """
+        Return a dictionary of phase -> number of tests that did not pass phase,
+        like TestStatus.increment_non_pass_counts over all tests.
+        """
+        non_pass_counts = dict.fromkeys(phases, 0)
+        for phase, count in self._select(
+            "SELECT phase, COUNT(*) FROM phases WHERE status != ? AND phase IN ({})".format(
+                ", ".join("?" * len(phases))
+            ),
+            test_paths,
+            group_by="phase",
+            params=(TEST_PASS_STATUS,) + tuple(phases),
+        ):
+            non_pass_counts[phase] = count
+
+        return non_pass_counts
+
+    def _select(self, query, test_paths, order_by=None, group_by=None, params=()):
+        """
+        Run query, restricted to test_paths if not None
+        """
+        params = tuple(params)
+        if test_paths is not None:
+            self._conn.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS selected (test_path TEXT PRIMARY KEY)"
+            )
+            self._conn.execute("DELETE FROM selected")
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO selected VALUES (?)",
+                [(os.path.abspath(x),) for x in test_paths],
+            )
+            query += "{} test_path IN (SELECT test_path FROM selected)".format(
+                " AND" if " WHERE " in query else " WHERE"
+            )
+
+        if group_by is not None:
+            query += " GROUP BY {}".format(group_by)
+
+        if order_by is not None:
+            query += " ORDER BY {}".format(order_by)
+
+        return self._conn.execute(query, params).fetchall()
+
+
+def _group_by_test_root(test_paths):
+    test_roots = OrderedDict()
+    for test_path in test_paths:
+        test_roots.setdefault(get_test_root(test_path), []).append(test_path)
+
+    return test_roots
+
+
+def refresh(test_paths):
+    """
+    Refresh the status indexes of the test roots of test_paths
+    """
+    for test_root, root_test_paths in _group_by_test_root(test_paths).items():
+        with StatusIndex(test_root) as index:
+            index.refresh(root_test_paths)
+
+
+def get_test_statuses(test_paths):
+    """
+    Refresh the status indexes of the test roots of test_paths, then return an
+    ordered dictionary of absolute test_path -> read-only TestStatus for the
+    test_paths that have a TestStatus file.
+    """
+    test_statuses = {}
+    for test_root, root_test_paths in _group_by_test_root(test_paths).items():
+        with StatusIndex(test_root) as index:
+            index.refresh(root_test_paths)
+            test_statuses.update(index.get_test_statuses(root_test_paths))
+
+    return OrderedDict(
+        (os.path.abspath(x), test_statuses[os.path.abspath(x)])
+        for x in test_paths
+        if os.path.abspath(x) in test_statuses
+    )
+
+
+def count_non_passes(test_paths, phases):
+    """
+    Return a dictionary of phase -> number of tests of test_paths that did not
+    pass phase, counted by the status indexes of their test roots after
+    refreshing them.
+    """
+    non_pass_counts = dict.fromkeys(phases, 0)
+    for test_root, root_test_paths in _group_by_test_root(test_paths).items():
+        with StatusIndex(test_root) as index:
+            index.refresh(root_test_paths)
+            for phase, count in index.count_non_passes(phases, root_test_paths).items():
+                non_pass_counts[phase] += count
+
+    return non_pass_counts
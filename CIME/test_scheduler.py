@@ -9,8 +9,10 @@ they can be run outside the context of TestScheduler.
 """
 
 import os
-import traceback, stat, threading, time, glob
+import traceback, stat, threading, time, glob, queue
+import functools, heapq, multiprocessing, shlex, shutil, tempfile
 from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 
 from CIME.XML.standard_module_setup import *
 from CIME.get_tests import get_recommended_test_time, get_build_groups, is_perf_test
@@ -41,8 +43,18 @@ from CIME.XML.component import Component
 from CIME.XML.tests import Tests
 from CIME.case import Case
 from CIME.wait_for_tests import wait_for_tests
-from CIME.provenance import get_recommended_test_time_based_on_past
+from CIME.provenance import (
+    get_recommended_test_time_based_on_past,
+    get_test_phase_times_based_on_past,
+    save_test_phase_times,
+    get_test_phase_memory_based_on_past,
+    save_test_phase_memory,
+    parse_phase_values,
+)
 from CIME.locked_files import lock_file
+from CIME.scheduler_journal import SchedulerJournal, get_journal_path
+from CIME.test_workers import WorkQueue, get_work_dir
+from CIME.progress_feed import ProgressFeed, get_progress_path
 from CIME.cs_status_creator import create_cs_status
 from CIME.hist_utils import generate_teststatus
 from CIME.build import post_build
@@ -62,6 +74,27 @@ PHASES = [
     RUN_PHASE,
 ]  # Order matters
 
+# Phases that a build group follower can only run after its leader did
+BUILD_GROUP_DEP_PHASES = [XML_PHASE, SHAREDLIB_BUILD_PHASE, MODEL_BUILD_PHASE]
+
+# Ways of running the phases, "process" runs PROCESS_POOL_PHASES in a pool of
+# worker processes instead of threads of this process
+PHASE_BACKENDS = ("thread", "process")
+
+# Phases that are mostly python run in this interpreter, all other phases
+# spend their time in subprocesses
+PROCESS_POOL_PHASES = [XML_PHASE]
+
+# Seconds assumed for a phase that has no recorded time
+_DEFAULT_PHASE_TIMES = {
+    CREATE_NEWCASE_PHASE: 30,
+    XML_PHASE: 30,
+    SETUP_PHASE: 60,
+    SHAREDLIB_BUILD_PHASE: 600,
+    MODEL_BUILD_PHASE: 900,
+    RUN_PHASE: 1800,
+}
+
 
 ###############################################################################
 def _translate_test_names_for_new_pecount(test_names, force_procs, force_threads):
@@ -168,6 +201,147 @@ def _order_tests_by_runtime(tests, baseline_root):
     )
 
 
+# MB per proc assumed for a phase that has no recorded memory use
+_DEFAULT_PHASE_MEMORY = {
+    CREATE_NEWCASE_PHASE: 200,
+    XML_PHASE: 200,
+    SETUP_PHASE: 200,
+    SHAREDLIB_BUILD_PHASE: 1000,
+    MODEL_BUILD_PHASE: 1000,
+    RUN_PHASE: 2000,
+}
+
+# MB assumed for a phase that only submits work to the batch system
+_BATCH_PHASE_MEMORY = 200
+
+# Environment variables that create_test sets or that select the model and
+# machine, shipped with each command run on a worker since workers do not
+# see changes to the environment of create_test
+_WORKER_ENV_VARS = (
+    "CIME_MODEL",
+    "CIME_MACHINE",
+    "CIMEROOT",
+    "SRCROOT",
+    "PROJECT",
+    "CHARGE_ACCOUNT",
+    "FROM_CREATE_TEST",
+    "TESTBUILDFAIL_PASS",
+    "TESTRUNFAIL_PASS",
+    "TESTRUNDIFF_ALTERNATE",
+)
+
+# Runs a shell command and writes the max RSS of its largest process to a file
+_MAXRSS_WRAPPER = (
+    "import resource, subprocess, sys; "
+    "rc = subprocess.call(sys.argv[2], shell=True); "
+    "open(sys.argv[1], 'w').write(str(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)); "
+    "sys.exit(rc)"
+)
+
+# The TestScheduler of a process pool worker, inherited from the parent by fork
+_POOL_SCHEDULER = None
+
+
+###############################################################################
+def _init_pool_worker(scheduler):
+    ###############################################################################
+    global _POOL_SCHEDULER
+    _POOL_SCHEDULER = scheduler
+
+
+###############################################################################
+def _run_phase_in_pool_worker(test, phase, shared_state):
+    ###############################################################################
+    scheduler = _POOL_SCHEDULER
+    scheduler._set_shared_state(shared_state)
+    phase_method = getattr(scheduler, "_{}_phase".format(phase.lower()))
+    success, errors = scheduler._run_catch_exceptions(test, phase, phase_method)
+    return success, errors, scheduler._get_shared_state()
+
+
+###############################################################################
+class SharedConfig(object):
+    ###############################################################################
+    """
+    Configuration used by the _xml_phase of all tests of a TestScheduler, so
+    that it is parsed once per create_test instead of once per test: the Files
+    of each driver, the Component of the driver and config_tests. The
+    machines, grids, compsets and pes are read by create_newcase, which runs
+    in its own process for each test, and are not shared.
+
+    Objects are loaded on first use and only used under the lock, since phases
+    run in threads and Files.get_value caches what it resolves in the object.
+    They never leave this class, what is added to a case is copied from them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._files = {}  # driver -> Files
+        self._driver_components = {}  # (driver, UFS_DRIVER) -> Component
+        self._tests = None
+
+    def load(self, driver):
+        """
+        Parse the configuration of driver ahead of the phases that use it.
+        """
+        with self._lock:
+            self._get_files(driver)
+
+    def add_env_test_elements(self, envtest, driver):
+        """
+        Add the env_test.xml entries of Files and of the Component of the
+        coupler/driver, which lists the component classes it knows how to deal
+        with, to envtest.
+        """
+        with self._lock:
+            files = self._get_files(driver)
+            envtest.add_elements_by_group(files, {}, "env_test.xml")
+            envtest.add_elements_by_group(
+                self._get_driver_component(driver), {}, "env_test.xml"
+            )
+
+    def _get_files(self, driver):
+        if driver not in self._files:
+            self._files[driver] = Files(comp_interface=driver)
+
+        return self._files[driver]
+
+    def _get_driver_component(self, driver):
+        files = self._get_files(driver)
+        ufs_driver = os.environ.get("UFS_DRIVER")
+        key = (driver, ufs_driver)
+        if key not in self._driver_components:
+            attribute = None
+            if ufs_driver:
+                attribute = {"component": ufs_driver}
+
+            drv_config_file = files.get_value("CONFIG_CPL_FILE", attribute=attribute)
+
+            if driver == "nuopc" and not os.path.exists(drv_config_file):
+                drv_config_file = files.get_value(
+                    "CONFIG_CPL_FILE", {"component": "cpl"}
+                )
+            expect(
+                os.path.exists(drv_config_file),
+                "File {} not found, cime driver {}".format(drv_config_file, driver),
+            )
+
+            self._driver_components[key] = Component(drv_config_file, "CPL")
+
+        return self._driver_components[key]
+
+    def copy_test_node(self, test_case):
+        """
+        Return a copy of the config_tests node of test_case that can be added to
+        and modified in a case.
+        """
+        with self._lock:
+            if self._tests is None:
+                self._tests = Tests()
+
+            return self._tests.copy(self._tests.get_test_node(test_case))
+
+
 ###############################################################################
 class TestScheduler(object):
     ###############################################################################
@@ -218,8 +392,25 @@ class TestScheduler(object):
         ninja=False,
         gmake=False,
         driver=None,
+        phase_backend="thread",
+        mem_pool=None,
+        resume=False,
+        distributed=False,
+        local_workers=0,
     ):
         ###########################################################################
+        expect(
+            phase_backend in PHASE_BACKENDS,
+            "Invalid phase backend '{}', expected one of {}".format(
+                phase_backend, ", ".join(PHASE_BACKENDS)
+            ),
+        )
+        self._phase_backend = phase_backend
+        self._process_pool = None
+        # Shell phases are run by workers if distributed
+        self._distributed = distributed or local_workers > 0
+        self._local_workers = local_workers
+        self._work_queue = None
         self._cime_root = get_cime_root()
         self._cime_model = get_model()
         self._cime_driver = driver if driver is not None else get_cime_default_driver()
@@ -250,6 +441,10 @@ class TestScheduler(object):
 
         self._config = Config.instance()
 
+        # Parsed once and shared by all tests, preload what every test uses
+        self._shared_config = SharedConfig()
+        self._shared_config.load(self._cime_driver)
+
         self._compiler = (
             self._machobj.get_default_compiler() if compiler is None else compiler
         )
@@ -417,6 +612,24 @@ class TestScheduler(object):
 
         self._procs_avail = self._proc_pool
 
+        # Memory accounting in MB, only done if a memory pool is given
+        self._mem_pool = None if mem_pool is None else int(mem_pool)
+        if self._mem_pool is not None:
+            logger.info(
+                "create_test will use up to {} MB of memory simultaneously".format(
+                    self._mem_pool
+                )
+            )
+
+        self._mem_avail = self._mem_pool
+        self._procs_in_flight = {}  # test -> procs
+        self._mem_in_flight = {}  # test -> MB
+        self._peak_usage = (0, 0)  # (procs, MB)
+
+        # test -> {phase -> MB} used by the largest process of phases in this run
+        self._phase_memory = {}
+        self._past_phase_memory = {}
+
         # Setup phases
         self._phases = list(PHASES)
         if self._no_setup:
@@ -427,7 +640,44 @@ class TestScheduler(object):
         if self._no_run:
             self._phases.remove(RUN_PHASE)
 
-        if use_existing:
+        # Setup build groups
+        if single_exe:
+            self._build_groups = [tuple(self._tests.keys())]
+        elif self._config.share_exes:
+            # Any test that's in a shared-enabled suite with other tests should share exes
+            self._build_groups = get_build_groups(self._tests)
+        else:
+            self._build_groups = [(item,) for item in self._tests]
+
+        # Build group to exeroot map
+        self._build_group_exeroots = {}
+        for build_group in self._build_groups:
+            self._build_group_exeroots[build_group] = None
+
+        logger.debug("Build groups are:")
+        for build_group in self._build_groups:
+            for test_name in build_group:
+                logger.debug(
+                    "{}{}".format(
+                        "  " if test_name == build_group[0] else "    ", test_name
+                    )
+                )
+
+        # Opened by run_tests
+        self._journal = None
+        self._progress_feed = None
+
+        # test -> {start, end, phase_start, phase_end} times for the progress feed
+        self._test_times = {}
+        # Tests ready to run their next phase but waiting for jobs, procs or
+        # memory, and tests waiting for their build group leader
+        self._queue_depth = 0
+        self._num_waiting = 0
+        self._resume = resume
+
+        if resume:
+            self._resume_from_journal()
+        elif use_existing:
             for test in self._tests:
                 with TestStatus(self._get_test_dir(test)) as ts:
                     if force_rebuild:
@@ -476,33 +726,105 @@ class TestScheduler(object):
                     "Creating test directory {}".format(self._get_test_dir(test))
                 )
 
-        # Setup build groups
-        if single_exe:
-            self._build_groups = [tuple(self._tests.keys())]
-        elif self._config.share_exes:
-            # Any test that's in a shared-enabled suite with other tests should share exes
-            self._build_groups = get_build_groups(self._tests)
-        else:
-            self._build_groups = [(item,) for item in self._tests]
+        # test -> {phase -> seconds} for phases that passed in this run
+        self._phase_times = {}
 
-        # Build group to exeroot map
+        self._chksum = chksum
+        # By the end of this constructor, this program should never hard abort,
+        # instead, errors will be placed in the TestStatus files for the various
+        # tests cases
+
+    ###########################################################################
+    def _resume_from_journal(self):
+        ###########################################################################
+        """
+        Reconstruct the schedule of an interrupted run from its journal. Phases
+        that finished are not run again, phases that were interrupted are.
+
+        The journal is checked against the TestStatus of each test, which the
+        phases themselves write: a phase that passed or failed there has that
+        result whatever the journal says, a phase still PEND there keeps the
+        journal's state since the next core phase is PEND once one passes.
+        """
+        journal_path = get_journal_path(self._test_root, self._test_id)
+        state = SchedulerJournal(journal_path).load()
+        expect(
+            state is not None,
+            "Cannot resume, no scheduler journal found at {}".format(journal_path),
+        )
+        expect(
+            sorted(state["tests"]) == sorted(self._tests),
+            "Cannot resume, tests do not match the tests in {}".format(journal_path),
+        )
+
+        logger.info("Resuming from scheduler journal {}".format(journal_path))
+
+        self._build_groups = state["build_groups"]
         self._build_group_exeroots = {}
         for build_group in self._build_groups:
-            self._build_group_exeroots[build_group] = None
+            self._build_group_exeroots[build_group] = state["exeroots"].get(
+                build_group[0]
+            )
 
-        logger.debug("Build groups are:")
-        for build_group in self._build_groups:
-            for test_name in build_group:
-                logger.debug(
-                    "{}{}".format(
-                        "  " if test_name == build_group[0] else "    ", test_name
+        for test in self._tests:
+            ends = state["ends"].get(test, {})
+            test_dir = self._get_test_dir(test)
+            ts = None
+            if os.path.exists(os.path.join(test_dir, TEST_STATUS_FILENAME)):
+                # Also picks up the TestStatus journal
+                ts = TestStatus(test_dir=test_dir)
+
+            if CREATE_NEWCASE_PHASE not in ends and (
+                ts is None or ts.get_status(CREATE_NEWCASE_PHASE) != TEST_PASS_STATUS
+            ):
+                # Start over, create_newcase cannot use a partially created case
+                if os.path.exists(test_dir):
+                    logger.info(
+                        "Removing partially created test directory {}".format(test_dir)
+                    )
+                    shutil.rmtree(test_dir)
+
+                continue
+
+            for phase in self._phases[1:]:
+                status = ends.get(phase)
+                ts_status = None if ts is None else ts.get_status(phase)
+                if ts_status in [TEST_PASS_STATUS, TEST_FAIL_STATUS]:
+                    if ts_status != status:
+                        logger.info(
+                            "{} for test {} is {} in TestStatus, {} in the scheduler journal, using {}".format(
+                                phase, test, ts_status, status, ts_status
+                            )
+                        )
+
+                    status = ts_status
+
+                if status is None:
+                    break
+
+                self._update_test_status(test, phase, TEST_PEND_STATUS)
+                if status != TEST_PEND_STATUS:
+                    self._update_test_status(test, phase, status)
+
+                if status != TEST_PASS_STATUS:
+                    break
+
+            in_flight_phase = state["in_flight"].get(test)
+            if in_flight_phase is not None and self._phases.index(
+                self._get_test_phase(test)
+            ) < self._phases.index(in_flight_phase):
+                logger.info(
+                    "{} for test {} was interrupted and will be re-run".format(
+                        in_flight_phase, test
                     )
                 )
 
-        self._chksum = chksum
-        # By the end of this constructor, this program should never hard abort,
-        # instead, errors will be placed in the TestStatus files for the various
-        # tests cases
+            if not self._work_remains(test):
+                self._completed_tests += 1
+
+            logger.info(
+                "Resuming test {} after {} {}".format(test, *self._get_test_data(test))
+            )
 
     ###########################################################################
     def get_testnames(self):
@@ -611,11 +933,15 @@ class TestScheduler(object):
     ###########################################################################
     def _shell_cmd_for_phase(self, test, cmd, phase, from_dir=None):
         ###########################################################################
-        env = os.environ.copy()
-        env["PYTHONPATH"] = f"{get_cime_root()}:{get_tools_path()}"
+        env = {"PYTHONPATH": f"{get_cime_root()}:{get_tools_path()}"}
 
         while True:
-            rc, output, errput = run_cmd(cmd, from_dir=from_dir, env=env)
+            if self._mem_pool is None:
+                rc, output, errput = self._run_cmd(test, cmd, from_dir, env)
+            else:
+                rc, output, errput = self._run_cmd_measure_memory(
+                    test, cmd, phase, from_dir, env
+                )
             if rc != 0:
                 self._log_output(
                     test,
@@ -642,6 +968,64 @@ class TestScheduler(object):
                 )
                 return True, errput
 
+    ###########################################################################
+    def _run_cmd(self, test, cmd, from_dir, env):
+        ###########################################################################
+        """
+        Run cmd here or, if distributed, on a worker. env are the environment
+        variables to set on top of the current environment, workers also get
+        the current values of _WORKER_ENV_VARS.
+        """
+        if self._work_queue is None:
+            full_env = os.environ.copy()
+            full_env.update(env)
+            return run_cmd(cmd, from_dir=from_dir, env=full_env)
+
+        worker_env = {x: os.environ[x] for x in _WORKER_ENV_VARS if x in os.environ}
+        worker_env.update(env)
+
+        return self._work_queue.run_cmd(
+            cmd,
+            os.getcwd() if from_dir is None else from_dir,
+            worker_env,
+            self._procs_in_flight.get(test, 1),
+        )
+
+    ###########################################################################
+    def _run_cmd_measure_memory(self, test, cmd, phase, from_dir, env):
+        ###########################################################################
+        """
+        run_cmd that also records the memory used by the largest process of cmd
+        """
+        # Workers must be able to see the file
+        fd, maxrss_file = tempfile.mkstemp(
+            prefix="maxrss.", dir=None if self._work_queue is None else self._test_root
+        )
+        os.close(fd)
+        try:
+            wrapped_cmd = "{} -c {} {} {}".format(
+                sys.executable,
+                shlex.quote(_MAXRSS_WRAPPER),
+                shlex.quote(maxrss_file),
+                shlex.quote(cmd),
+            )
+            rc, output, errput = self._run_cmd(test, wrapped_cmd, from_dir, env)
+
+            with open(maxrss_file, "r") as fd:
+                maxrss = fd.read().strip()
+
+            # The memory of a batch submission says nothing about the phase
+            if maxrss and not self._is_batch_phase(phase):
+                # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+                scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+                self._phase_memory.setdefault(test, {})[phase] = max(
+                    1, int(maxrss) // scale
+                )
+        finally:
+            os.remove(maxrss_file)
+
+        return rc, output, errput
+
     ###########################################################################
     def _create_newcase_phase(self, test):
         ###########################################################################
@@ -799,25 +1183,7 @@ class TestScheduler(object):
 
         # Determine list of component classes that this coupler/driver knows how
         # to deal with. This list follows the same order as compset longnames follow.
-        files = Files(comp_interface=driver)
-        ufs_driver = os.environ.get("UFS_DRIVER")
-        attribute = None
-        if ufs_driver:
-            attribute = {"component": ufs_driver}
-
-        drv_config_file = files.get_value("CONFIG_CPL_FILE", attribute=attribute)
-
-        if driver == "nuopc" and not os.path.exists(drv_config_file):
-            drv_config_file = files.get_value("CONFIG_CPL_FILE", {"component": "cpl"})
-        expect(
-            os.path.exists(drv_config_file),
-            "File {} not found, cime driver {}".format(drv_config_file, driver),
-        )
-
-        drv_comp = Component(drv_config_file, "CPL")
-
-        envtest.add_elements_by_group(files, {}, "env_test.xml")
-        envtest.add_elements_by_group(drv_comp, {}, "env_test.xml")
+        self._shared_config.add_env_test_elements(envtest, driver)
         envtest.set_value("TESTCASE", test_case)
         envtest.set_value("TEST_TESTID", self._test_id)
         envtest.set_value("CASEBASEID", test)
@@ -876,9 +1242,17 @@ class TestScheduler(object):
         )
 
         # Add the test instructions from config_test to env_test in the case
-        config_test = Tests()
-        testnode = config_test.get_test_node(test_case)
-        envtest.add_test(testnode)
+        envtest.add_test(self._shared_config.copy_test_node(test_case))
+
+        if (
+            test in self._test_data
+            and "options" in self._test_data[test]
+            and "hist_compare_tool" in self._test_data[test]["options"]
+        ):
+            envtest.set_test_parameter(
+                "HIST_COMPARE_TOOL",
+                self._test_data[test]["options"]["hist_compare_tool"],
+            )
 
         if compiler == "nag":
             envtest.set_value("FORCE_BUILD_SMP", "FALSE")
@@ -1197,12 +1571,7 @@ class TestScheduler(object):
         is_first_test, first_test, _ = self._get_build_group(test)
 
         if not is_first_test:
-            build_group_dep_phases = [
-                XML_PHASE,
-                SHAREDLIB_BUILD_PHASE,
-                MODEL_BUILD_PHASE,
-            ]
-            if phase in build_group_dep_phases:
+            if phase in BUILD_GROUP_DEP_PHASES:
                 if self._get_test_status(first_test, phase=phase) == TEST_PEND_STATUS:
                     return None  # None indicates job is ineligible to run
                 else:
@@ -1229,22 +1598,124 @@ class TestScheduler(object):
         else:
             return 1
 
+    ###########################################################################
+    def _is_batch_phase(self, phase):
+        ###########################################################################
+        """
+        Return True if phase only submits its work to the batch system
+        """
+        return (phase == RUN_PHASE and not self._no_batch) or (
+            phase in [SHAREDLIB_BUILD_PHASE, MODEL_BUILD_PHASE] and self._batched_build
+        )
+
+    ###########################################################################
+    def _get_mem_needed(self, test, phase, procs_needed):
+        ###########################################################################
+        """
+        Return the MB of memory needed to run phase of test with procs_needed.
+
+        The "memory" option of a test overrides the estimate, either as MB for
+        all phases or as "PHASE=MB PHASE=MB" for some phases. Otherwise the memory
+        used per proc by previous runs is used, or a default per proc.
+        """
+        if self._mem_pool is None:
+            return 0
+
+        options = self._test_data.get(test, {}).get("options", {})
+        if "memory" in options:
+            memory = str(options["memory"])
+            try:
+                if "=" not in memory:
+                    return int(memory)
+
+                memory = parse_phase_values(memory)
+            except ValueError:
+                expect(
+                    False,
+                    "Invalid memory option '{}' for test {}, expected MB or PHASE=MB PHASE=MB".format(
+                        memory, test
+                    ),
+                )
+
+            if phase in memory:
+                return memory[phase]
+
+        if self._is_batch_phase(phase):
+            return _BATCH_PHASE_MEMORY
+
+        if test not in self._past_phase_memory:
+            self._past_phase_memory[test] = get_test_phase_memory_based_on_past(
+                self._baseline_root, test
+            )
+
+        past_phase_memory = self._past_phase_memory[test]
+        per_proc = past_phase_memory.get(phase, _DEFAULT_PHASE_MEMORY[phase])
+
+        return per_proc * procs_needed
+
+    ###########################################################################
+    def _get_blocking_test(self, test):
+        ###########################################################################
+        """
+        Return the build group leader that must finish its current phase before
+        the next phase of test can run, None if test is not blocked by its leader.
+        """
+        is_first_test, first_test, _ = self._get_build_group(test)
+        if is_first_test:
+            return None
+
+        test_phase = self._get_test_phase(test)
+        next_phase = self._phases[self._phases.index(test_phase) + 1]
+        if (
+            next_phase in BUILD_GROUP_DEP_PHASES
+            and self._get_test_status(first_test, phase=next_phase) == TEST_PEND_STATUS
+        ):
+            return first_test
+
+        return None
+
     ###########################################################################
     def _wait_for_something_to_finish(self, threads_in_flight):
         ###########################################################################
+        """
+        Block until at least one thread in flight has finished, return the
+        list of tests whose phase finished.
+        """
         expect(len(threads_in_flight) <= self._parallel_jobs, "Oversubscribed?")
-        finished_tests = []
-        while not finished_tests:
-            for test, thread_info in threads_in_flight.items():
-                if not thread_info[0].is_alive():
-                    finished_tests.append((test, thread_info[1]))
+        if self._progress_feed is not None and self._progress_feed.pending:
+            # Do not leave a throttled progress update unwritten while blocked
+            try:
+                finished_test = self._completion_queue.get(
+                    timeout=self._progress_feed.min_interval
+                )
+            except queue.Empty:
+                self._update_progress(force=True)
+                finished_test = self._completion_queue.get()
+        else:
+            finished_test = self._completion_queue.get()
 
-            if not finished_tests:
-                time.sleep(0.2)
+        finished_tests = [finished_test]
+        while True:
+            try:
+                finished_tests.append(self._completion_queue.get_nowait())
+            except queue.Empty:
+                break
 
-        for finished_test, procs_needed in finished_tests:
+        for finished_test in finished_tests:
+            thread, procs_needed, _ = threads_in_flight.pop(finished_test)
+            thread.join()
             self._procs_avail += procs_needed
-            del threads_in_flight[finished_test]
+            self._procs_in_flight.pop(finished_test)
+            if self._mem_pool is not None:
+                self._mem_avail += self._mem_in_flight.pop(finished_test)
+
+            now = time.time()
+            times = self._test_times[finished_test]
+            times["phase_end"] = now
+            if not self._work_remains(finished_test):
+                times["end"] = now
+
+        return finished_tests
 
     ###########################################################################
     def _update_test_status_file(self, test, test_phase, status):
@@ -1257,9 +1728,19 @@ class TestScheduler(object):
         with TestStatus(test_dir=test_dir, test_name=test) as ts:
             ts.set_status(test_phase, status)
 
+    ###########################################################################
+    def _compact_test_status(self, test):
+        ###########################################################################
+        test_dir = self._get_test_dir(test)
+        if os.path.exists(os.path.join(test_dir, TEST_STATUS_FILENAME)):
+            TestStatus(test_dir=test_dir).compact()
+
     ###########################################################################
     def _consumer(self, test, test_phase, phase_method):
         ###########################################################################
+        if self._journal is not None:
+            self._journal.record_start(test, test_phase)
+
         before_time = time.time()
         success, errors = self._run_catch_exceptions(test, test_phase, phase_method)
         elapsed_time = time.time() - before_time
@@ -1276,6 +1757,9 @@ class TestScheduler(object):
         if status != TEST_PEND_STATUS:
             self._update_test_status(test, test_phase, status)
 
+        if status == TEST_PASS_STATUS:
+            self._phase_times.setdefault(test, {})[test_phase] = elapsed_time
+
         if not self._work_remains(test):
             self._completed_tests += 1
             total = len(self._tests)
@@ -1312,6 +1796,18 @@ class TestScheduler(object):
                 caseroot=self._get_test_dir(test),
             )
 
+        if self._journal is not None:
+            exeroot = None
+            if test_phase == XML_PHASE and is_first_test and success:
+                exeroot = self._build_group_exeroots[self._get_build_group(test)[2]]
+
+            self._journal.record_end(test, test_phase, status, exeroot=exeroot)
+
+        # Do not keep tools that read TestStatus directly waiting for the
+        # other tests once we are done with this one
+        if not self._work_remains(test):
+            self._compact_test_status(test)
+
         # On batch systems, we want to immediately submit to the queue, because
         # it's very cheap to submit and will get us a better spot in line
         if (
@@ -1331,10 +1827,88 @@ class TestScheduler(object):
             self._consumer(test, RUN_PHASE, self._run_phase)
 
     ###########################################################################
-    def _producer_indv_test_launch(self, test, threads_in_flight):
+    def _get_shared_state(self):
+        ###########################################################################
+        """
+        The scheduler state that phases read or update, phases run in the
+        process pool get a copy of it and return their updated copy.
+        """
+        return {
+            "tests": dict(self._tests),
+            "output_root": self._output_root,
+            "build_group_exeroots": dict(self._build_group_exeroots),
+            "model_build_cost": self._model_build_cost,
+        }
+
+    ###########################################################################
+    def _set_shared_state(self, shared_state):
+        ###########################################################################
+        self._tests = OrderedDict(shared_state["tests"])
+        self._output_root = shared_state["output_root"]
+        self._build_group_exeroots = shared_state["build_group_exeroots"]
+        self._model_build_cost = shared_state["model_build_cost"]
+
+    ###########################################################################
+    def _merge_shared_state(self, shared_state):
+        ###########################################################################
+        if self._output_root is None:
+            self._output_root = shared_state["output_root"]
+
+        for build_group, exeroot in shared_state["build_group_exeroots"].items():
+            if self._build_group_exeroots.get(build_group) is None:
+                self._build_group_exeroots[build_group] = exeroot
+
+        self._model_build_cost = min(
+            self._model_build_cost, shared_state["model_build_cost"]
+        )
+
+    ###########################################################################
+    def _start_process_pool(self):
+        ###########################################################################
+        # Workers are forked so they start with everything this process has
+        # imported and loaded, no pickling of the scheduler is needed.
+        pool = ProcessPoolExecutor(
+            max_workers=max(1, min(self._parallel_jobs, os.cpu_count() or 1)),
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=_init_pool_worker,
+            initargs=(self,),
+        )
+
+        # Forking is only safe while this process has a single thread, the
+        # first submit forks all of the workers so do it before any phase starts
+        pool.submit(int).result()
+
+        return pool
+
+    ###########################################################################
+    def _run_phase_in_process_pool(self, test, phase):
+        ###########################################################################
+        future = self._process_pool.submit(
+            _run_phase_in_pool_worker, test, phase, self._get_shared_state()
+        )
+        success, errors, shared_state = future.result()
+        self._merge_shared_state(shared_state)
+
+        return success, errors
+
+    ###########################################################################
+    def _consumer_thread(self, test, test_phase, phase_method):
+        ###########################################################################
+        try:
+            self._consumer(test, test_phase, phase_method)
+        finally:
+            # Wake up the producer
+            self._completion_queue.put(test)
+
+    ###########################################################################
+    def _producer_indv_test_launch(self, test, threads_in_flight, blocked=None):
         ###########################################################################
         """
         Launch the next phase of test if possible. Return True if launched
+
+        If the phase is not launched and blocked is given, blocked[test] is set
+        to the (procs, memory) the phase is waiting for, or None if it has to
+        wait for another phase to finish.
         """
         test_phase, test_status = self._get_test_data(test)
         expect(test_status != TEST_PEND_STATUS, test)
@@ -1343,6 +1917,8 @@ class TestScheduler(object):
 
         if procs_needed is None:
             # This test cannot run now so skip
+            if blocked is not None:
+                blocked[test] = None
             return False
 
         elif procs_needed > self._proc_pool:
@@ -1365,19 +1941,47 @@ class TestScheduler(object):
             # We did run the phase in some sense in that we instantly failed it
             return True
 
-        elif procs_needed <= self._procs_avail:
+        mem_needed = self._get_mem_needed(test, next_phase, procs_needed)
+        if self._mem_pool is not None and mem_needed > self._mem_pool:
+            logger.warning(
+                f"Test {test} phase {next_phase} may need more memory ({mem_needed} MB) than entire pool ({self._mem_pool} MB), it will run by itself"
+            )
+            mem_needed = self._mem_pool
+
+        if procs_needed <= self._procs_avail and (
+            self._mem_pool is None or mem_needed <= self._mem_avail
+        ):
             # We can run this test!
             self._procs_avail -= procs_needed
+            self._procs_in_flight[test] = procs_needed
+
+            now = time.time()
+            times = self._test_times.setdefault(test, {"start": now, "end": None})
+            times["phase_start"] = now
+            times["phase_end"] = None
 
             # Necessary to print this way when multiple threads printing
-            logger.info(
-                f"Starting {next_phase} for test {test} with {procs_needed} procs"
-            )
+            if self._mem_pool is None:
+                logger.info(
+                    f"Starting {next_phase} for test {test} with {procs_needed} procs"
+                )
+            else:
+                self._mem_avail -= mem_needed
+                self._mem_in_flight[test] = mem_needed
+                logger.info(
+                    f"Starting {next_phase} for test {test} with {procs_needed} procs and {mem_needed} MB"
+                )
+
+            self._update_peak_usage()
 
             self._update_test_status(test, next_phase, TEST_PEND_STATUS)
             phase_method = getattr(self, f"_{next_phase.lower()}_phase")
+            if self._process_pool is not None and next_phase in PROCESS_POOL_PHASES:
+                phase_method = functools.partial(
+                    self._run_phase_in_process_pool, phase=next_phase
+                )
             new_thread = threading.Thread(
-                target=self._consumer,
+                target=self._consumer_thread,
                 args=(test, next_phase, phase_method),
             )
             threads_in_flight[test] = (new_thread, procs_needed, next_phase)
@@ -1394,44 +1998,257 @@ class TestScheduler(object):
             return True
 
         else:
-            # There aren't enough free procs to run this phase, so skip
+            # There aren't enough free procs or memory to run this phase, so skip
+            if blocked is not None:
+                blocked[test] = (procs_needed, mem_needed)
             return False
 
+    ###########################################################################
+    def _update_peak_usage(self):
+        ###########################################################################
+        procs_in_use = self._proc_pool - self._procs_avail
+        mem_in_use = 0 if self._mem_pool is None else self._mem_pool - self._mem_avail
+        self._peak_usage = (
+            max(self._peak_usage[0], procs_in_use),
+            max(self._peak_usage[1], mem_in_use),
+        )
+
+    ###########################################################################
+    def _get_phase_time_est(self, test, phase, past_phase_times):
+        ###########################################################################
+        if phase in past_phase_times:
+            return past_phase_times[phase]
+
+        if phase in BUILD_GROUP_DEP_PHASES[1:] and not self._get_build_group(test)[0]:
+            # Followers reuse the build of their leader
+            return 1
+
+        if phase == RUN_PHASE:
+            recommended_time = _get_time_est(
+                test, self._baseline_root, as_int=True, use_cache=True, raw=True
+            )
+            if recommended_time < 9999999999:
+                return recommended_time
+
+        return _DEFAULT_PHASE_TIMES[phase]
+
+    ###########################################################################
+    def _get_critical_paths(self):
+        ###########################################################################
+        """
+        Model the phases of all tests as a DAG, each phase depends on the prior
+        phase of its test and, for followers, on the same phase of their build
+        group leader. Returns (test, phase) -> seconds of the longest path from
+        the start of that phase to the end of the suite.
+        """
+        phases = self._phases[1:]
+        phase_times = {}
+        for test in self._tests:
+            past_phase_times = get_test_phase_times_based_on_past(
+                self._baseline_root, test
+            )
+            for phase in phases:
+                phase_times[(test, phase)] = self._get_phase_time_est(
+                    test, phase, past_phase_times
+                )
+
+        followers = {}
+        for build_group in self._build_groups:
+            followers[build_group[0]] = build_group[1:]
+
+        # Followers depend on their leader, so within a phase visit them first
+        tests = sorted(self._tests, key=lambda x: self._get_build_group(x)[0])
+
+        critical_paths = {}
+        for idx in reversed(range(len(phases))):
+            phase = phases[idx]
+            for test in tests:
+                successors = []
+                if idx + 1 < len(phases):
+                    successors.append((test, phases[idx + 1]))
+
+                if phase in BUILD_GROUP_DEP_PHASES:
+                    successors.extend((x, phase) for x in followers.get(test, ()))
+
+                critical_paths[(test, phase)] = phase_times[(test, phase)] + max(
+                    [critical_paths[x] for x in successors], default=0
+                )
+
+        return critical_paths
+
     ###########################################################################
     def _producer(self):
+        ###########################################################################
+        if self._phase_backend == "process":
+            self._process_pool = self._start_process_pool()
+
+        if self._distributed:
+            work_dir = get_work_dir(self._test_root, self._test_id)
+            self._work_queue = WorkQueue(work_dir)
+            logger.info("Shell phases will be run by workers of {}".format(work_dir))
+            if self._local_workers > 0:
+                self._work_queue.start_local_workers(
+                    self._local_workers, self._proc_pool
+                )
+
+        try:
+            self._producer_loop()
+        finally:
+            if self._process_pool is not None:
+                self._process_pool.shutdown()
+                self._process_pool = None
+
+            if self._work_queue is not None:
+                self._work_queue.shutdown()
+                self._work_queue = None
+
+    ###########################################################################
+    def _producer_loop(self):
         ###########################################################################
         threads_in_flight = {}  # test-name -> (thread, procs, phase)
-        while True:
-            work_to_do = False
-            num_threads_launched_this_iteration = 0
-            for test in self._tests:
+        self._completion_queue = queue.Queue()
+
+        # Tests are launched in the order of self._tests, or by longest
+        # remaining critical path if enabled
+        test_order = {test: idx for idx, test in enumerate(self._tests)}
+        critical_paths = (
+            self._get_critical_paths()
+            if self._config.critical_path_scheduling
+            else None
+        )
+
+        def _launch_order(test):
+            if critical_paths is None:
+                return test_order[test]
+
+            test_phase = self._get_test_phase(test)
+            next_phase = self._phases[self._phases.index(test_phase) + 1]
+            return -critical_paths[(test, next_phase)], test_order[test]
+
+        # Tests that are not in flight and may be able to launch their next
+        # phase, as a heap by launch order. Only tests whose state changed are
+        # pushed back in.
+        ready = []
+
+        def _push(test):
+            heapq.heappush(ready, (_launch_order(test), test))
+
+        for test in self._tests:
+            if self._work_remains(test):
+                _push(test)
+
+        # Tests that could not launch their next phase -> the (procs, memory)
+        # it needs, or None if it waits for a phase in flight. They are only
+        # tried again once a finished phase gives back enough.
+        parked = {}
+
+        # build group leader -> tests waiting for it to finish its current phase
+        waiting = {}
+
+        while ready or parked or threads_in_flight:
+            # If we have no workers available, stop launching so we can wait
+            while ready and len(threads_in_flight) < self._parallel_jobs:
+                _, test = heapq.heappop(ready)
                 logger.debug("test_name: " + test)
 
-                if self._work_remains(test):
-                    work_to_do = True
+                blocking_test = self._get_blocking_test(test)
+                if blocking_test is not None:
+                    waiting.setdefault(blocking_test, set()).add(test)
 
-                    # If we have no workers available, immediately break out of loop so we can wait
-                    if len(threads_in_flight) == self._parallel_jobs:
-                        break
+                else:
+                    self._producer_indv_test_launch(test, threads_in_flight, parked)
 
-                    # Check if this test is already running a phase. If so, we can't
-                    # launch a new phase now.
-                    if test not in threads_in_flight:
-                        launched = self._producer_indv_test_launch(
-                            test, threads_in_flight
-                        )
-                        if launched:
-                            num_threads_launched_this_iteration += 1
+            self._queue_depth = len(ready) + len(parked)
+            self._num_waiting = sum(len(x) for x in waiting.values())
+            self._update_progress()
 
-            if not work_to_do:
+            if not threads_in_flight:
+                stuck = [x for _, x in ready] + list(parked)
+                expect(
+                    not stuck,
+                    "No test can make progress: {}".format(
+                        ", ".join(sorted(stuck, key=test_order.get))
+                    ),
+                )
                 break
 
-            if num_threads_launched_this_iteration == 0:
-                # No free resources, wait for something in flight to finish
-                self._wait_for_something_to_finish(threads_in_flight)
+            # No free resources, wait for something in flight to finish
+            for test in self._wait_for_something_to_finish(threads_in_flight):
+                if self._work_remains(test):
+                    _push(test)
+
+                for waiting_test in waiting.pop(test, ()):
+                    _push(waiting_test)
+
+            # The finished phases gave back their procs and memory
+            for parked_test, needed in list(parked.items()):
+                if needed is None or (
+                    needed[0] <= self._procs_avail
+                    and (self._mem_pool is None or needed[1] <= self._mem_avail)
+                ):
+                    del parked[parked_test]
+                    _push(parked_test)
+
+        expect(
+            not waiting,
+            "Tests left waiting on their build group: {}".format(
+                ", ".join(sorted(waiting))
+            ),
+        )
+
+    ###########################################################################
+    def _get_progress(self):
+        ###########################################################################
+        """
+        Return the progress of the run as a dictionary for the progress feed
+        """
+        procs_in_use = self._proc_pool - self._procs_avail
+        progress = {
+            "test_id": self._test_id,
+            "total": len(self._tests),
+            "completed": self._completed_tests,
+            "running": len(self._procs_in_flight),
+            "queue_depth": self._queue_depth,
+            "waiting_on_build_group": self._num_waiting,
+            "parallel_jobs": self._parallel_jobs,
+            "proc_pool": self._proc_pool,
+            "procs_in_use": procs_in_use,
+            "proc_utilization": float(procs_in_use) / self._proc_pool,
+            "mem_pool": self._mem_pool,
+            "mem_in_use": (
+                None if self._mem_pool is None else self._mem_pool - self._mem_avail
+            ),
+            "tests": {},
+        }
+
+        for test in self._tests:
+            phase, status = self._get_test_data(test)
+            info = {
+                "phase": phase,
+                "status": status,
+                "procs": self._procs_in_flight.get(test, 0),
+                "mem": self._mem_in_flight.get(test, 0),
+            }
+            info.update(
+                self._test_times.get(
+                    test,
+                    {
+                        "start": None,
+                        "end": None,
+                        "phase_start": None,
+                        "phase_end": None,
+                    },
+                )
+            )
+            progress["tests"][test] = info
+
+        return progress
 
-        for unfinished_thread, _, _ in threads_in_flight.values():
-            unfinished_thread.join()
+    ###########################################################################
+    def _update_progress(self, force=False):
+        ###########################################################################
+        if self._progress_feed is not None:
+            self._progress_feed.update(self._get_progress, force=force)
 
     ###########################################################################
     def _setup_cs_files(self):
@@ -1439,7 +2256,11 @@ class TestScheduler(object):
         try:
             template_path = get_template_path()
 
-            create_cs_status(test_root=self._test_root, test_id=self._test_id)
+            create_cs_status(
+                test_root=self._test_root,
+                test_id=self._test_id,
+                extra_args="--use-index",
+            )
 
             template_file = os.path.join(template_path, "cs.submit.template")
             template = open(template_file, "r").read()
@@ -1505,14 +2326,57 @@ class TestScheduler(object):
         # Setup cs files
         self._setup_cs_files()
 
+        # Journal the schedule so that an interrupted run can be resumed
+        self._journal = SchedulerJournal(
+            get_journal_path(self._test_root, self._test_id)
+        )
+        self._journal.open(
+            self._tests, self._build_groups, self._phases, resume=self._resume
+        )
+
+        progress_path = get_progress_path(self._test_root, self._test_id)
+        logger.info("Progress of tests is written to {}".format(progress_path))
+        self._progress_feed = ProgressFeed(progress_path)
+
         GenericXML.DISABLE_CACHING = True
+        TestStatus.BATCH_JOURNAL = True
         self._producer()
         GenericXML.DISABLE_CACHING = False
+        TestStatus.BATCH_JOURNAL = False
+
+        self._journal.close()
+        self._update_progress(force=True)
+
+        # Leave complete TestStatus files for tools that read them directly,
+        # run jobs compact their own when they finish
+        for test in self._tests:
+            self._compact_test_status(test)
 
         expect(threading.active_count() == 1, "Leftover threads?")
 
         config = Config.instance()
 
+        # Remember phase times to improve the critical paths of later runs
+        if config.critical_path_scheduling:
+            for test, phase_times in self._phase_times.items():
+                save_test_phase_times(self._baseline_root, test, phase_times)
+
+        peak_procs, peak_mem = self._peak_usage
+        if self._mem_pool is None:
+            logger.info(
+                "Peak usage was {} of {} procs".format(peak_procs, self._proc_pool)
+            )
+        else:
+            logger.info(
+                "Peak usage was {} of {} procs and {} of {} MB".format(
+                    peak_procs, self._proc_pool, peak_mem, self._mem_pool
+                )
+            )
+
+            # Remember phase memory to improve the estimates of later runs
+            for test, phase_memory in self._phase_memory.items():
+                save_test_phase_memory(self._baseline_root, test, phase_memory)
+
         # Copy TestStatus files to baselines for tests that have already failed.
         if config.baseline_store_teststatus:
             for test in self._tests:
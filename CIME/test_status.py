@@ -23,14 +23,43 @@ core state to PEND.
 2) If the user repeats a core state, that invalidates all subsequent state. For
 example, if a user rebuilds their case, then any of the post-run states like the
 RUN state are no longer valid.
+3) TestStatus is authoritative, tools like testreporter read it directly, so
+every flush writes it. Only while TestStatus.BATCH_JOURNAL is set, which the
+test scheduler does while it runs tests, are status changes appended to a
+journal next to the TestStatus file, under a file lock, instead of rewriting
+the file. The journal is then compacted into the TestStatus file, which keeps
+its format, when it gets long and when the scheduler is done with a test.
+Readers that use this class always see both, and can tail the journal with
+refresh. Compaction empties the journal but does not remove it, since other
+writers may be waiting on its lock. A journal that cannot be written, or a
+file system without locks, falls back to rewriting TestStatus or to working
+unlocked.
 
 """
 
 from CIME.XML.standard_module_setup import *
-import os, itertools
+import os, errno, itertools, threading, fcntl, contextlib
 from CIME import expected_fails
 
 TEST_STATUS_FILENAME = "TestStatus"
+TEST_STATUS_JOURNAL_FILENAME = "TestStatus.journal"
+
+# A flush compacts the journal into the TestStatus file once the journal holds
+# this many records
+JOURNAL_COMPACT_RECORDS = 10
+
+# The first line of a journal identifies the TestStatus file it applies to, so
+# a journal left behind by a tool that rewrote TestStatus directly is ignored
+_JOURNAL_HEADER = "# TestStatus"
+
+# fcntl locks are held by processes, these serialize the threads of a process
+# working on the same journal, {journal path -> lock}
+_JOURNAL_THREAD_LOCKS = {}
+_JOURNAL_THREAD_LOCKS_LOCK = threading.Lock()
+
+# lockf errors of file systems that do not support locks, warned about once
+_NO_LOCK_ERRNOS = (errno.ENOLCK, errno.ENOSYS, errno.EOPNOTSUPP)
+_no_lock_warned = False
 
 # The statuses that a phase can be in
 TEST_PEND_STATUS = "PEND"
@@ -101,6 +130,57 @@ CORE_PHASES = [
 ]
 
 
+def _get_signature(filename):
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+def _lock_file(fd, operation):
+    """
+    fcntl.lockf fd, continue without the lock on file systems that do not
+    support locks
+    """
+    global _no_lock_warned
+    try:
+        fcntl.lockf(fd, operation)
+    except OSError as e:
+        if e.errno not in _NO_LOCK_ERRNOS:
+            raise
+
+        if not _no_lock_warned:
+            logging.warning(
+                "Could not lock {}, continuing without locks: {}".format(fd.name, e)
+            )
+            _no_lock_warned = True
+
+
+def _get_journal_thread_lock(journal_filename):
+    """
+    Return the lock that serializes the threads working on journal_filename
+
+    >>> lock = _get_journal_thread_lock("/a/TestStatus.journal")
+    >>> lock is _get_journal_thread_lock("/a/../a/TestStatus.journal")
+    True
+    >>> lock is _get_journal_thread_lock("/b/TestStatus.journal")
+    False
+    """
+    path = os.path.abspath(journal_filename)
+    with _JOURNAL_THREAD_LOCKS_LOCK:
+        return _JOURNAL_THREAD_LOCKS.setdefault(path, threading.Lock())
+
+
+def _get_journal_header(signature):
+    """
+    >>> _get_journal_header((1, 2, 3))
+    '# TestStatus 1 2 3'
+    """
+    return "{} {}".format(_JOURNAL_HEADER, " ".join(str(x) for x in signature))
+
+
 def _test_helper1(file_contents):
     ts = TestStatus(test_dir="/", test_name="ERS.foo.A")
     ts._parse_test_status(file_contents)  # pylint: disable=protected-access
@@ -140,7 +220,11 @@ def _test_helper2(
 
 
 class TestStatus(object):
-    def __init__(self, test_dir=None, test_name=None, no_io=False):
+    # Append status changes to the journal instead of writing TestStatus on
+    # every flush, set by the test scheduler while it runs tests
+    BATCH_JOURNAL = False
+
+    def __init__(self, test_dir=None, test_name=None, no_io=False, phase_statuses=None):
         """
         Create a TestStatus object
 
@@ -148,17 +232,39 @@ class TestStatus(object):
 
         no_io is intended only for testing, and should be kept False in
         production code
+
+        phase_statuses, a list of (phase, status, comments), is used instead of
+        reading the TestStatus file by tools that keep their own copy of the
+        statuses, the object is then read-only.
         """
         test_dir = os.getcwd() if test_dir is None else test_dir
         self._filename = os.path.join(test_dir, TEST_STATUS_FILENAME)
+        self._journal_filename = os.path.join(test_dir, TEST_STATUS_JOURNAL_FILENAME)
         self._phase_statuses = {}  # {name -> (status, comments)}
         self._test_name = test_name
         self._ok_to_modify = False
         self._no_io = no_io
 
-        if os.path.exists(self._filename):
-            self._parse_test_status_file()
-            if not os.access(self._filename, os.W_OK):
+        # The signature of the TestStatus file the journal applies to, how far
+        # we have read the journal, the statuses as of that point and the
+        # changes made since that are not in the journal yet
+        self._base_signature = None
+        self._journal_offset = 0
+        self._journal_records = 0
+        self._journal_stale = False
+        self._journal_writable = True
+        self._synced_statuses = {}
+        self._pending = []  # [(phase, status, comments)]
+
+        if phase_statuses is not None:
+            self._no_io = True
+            for phase, status, comments in phase_statuses:
+                self._phase_statuses[phase] = (status, comments)
+
+        elif os.path.exists(self._filename) or os.path.exists(self._journal_filename):
+            self.refresh()
+            # A journal that cannot be written is compacted into TestStatus
+            if not self._can_write_test_status():
                 self._no_io = True
         else:
             expect(
@@ -242,6 +348,14 @@ class TestStatus(object):
                     ),
                 )
 
+        self._pending.append((phase, status, comments))
+        self._apply_status(phase, status, comments)
+
+    def _apply_status(self, phase, status, comments):
+        """
+        Change the status of phase, and the phases that depend on it, without
+        any checks. Used by set_status and to replay the journal.
+        """
         reran_phase = (
             phase in self._phase_statuses
             and self._phase_statuses[phase][0] != TEST_PEND_STATUS
@@ -339,9 +453,202 @@ class TestStatus(object):
                     non_pass_counts[phase] += 1
 
     def flush(self):
-        if self._phase_statuses and not self._no_io:
-            with open(self._filename, "w") as fd:
-                fd.write(self.phase_statuses_dump())
+        """
+        Write the changes made since the last flush to the TestStatus file.
+        With BATCH_JOURNAL they are appended to the journal instead, which is
+        compacted into the TestStatus file when it gets long, or right away if
+        there is no TestStatus file yet.
+        """
+        if self._no_io or not self._pending:
+            return
+
+        with self._lock_journal(exclusive=True) as fd:
+            self._sync(fd)
+            if (
+                not TestStatus.BATCH_JOURNAL
+                or self._base_signature is None
+                or not self._journal_writable
+                or self._journal_stale
+                or self._journal_records + len(self._pending) >= JOURNAL_COMPACT_RECORDS
+            ):
+                self._compact(fd)
+            else:
+                self._append(fd)
+
+    def refresh(self):
+        """
+        Pick up the changes other writers made to the TestStatus file and its
+        journal. Only the journal records written since the last refresh are
+        read, unless the journal was compacted in the meantime.
+        """
+        with self._lock_journal(exclusive=False) as fd:
+            self._sync(fd)
+
+    def compact(self):
+        """
+        Compact the journal into the TestStatus file, so that tools reading
+        TestStatus directly see the latest statuses.
+        """
+        if self._no_io:
+            return
+
+        with self._lock_journal(exclusive=True) as fd:
+            self._sync(fd)
+            if self._journal_records or self._journal_stale or self._pending:
+                self._compact(fd)
+
+    def _can_write_test_status(self):
+        if os.path.exists(self._filename):
+            return os.access(self._filename, os.W_OK)
+
+        return os.access(os.path.dirname(self._filename), os.W_OK)
+
+    @contextlib.contextmanager
+    def _lock_journal(self, exclusive):
+        """
+        Lock the journal, exclusive to write it. Yields the open journal, or
+        None if there is no journal to read. A writer that cannot write the
+        journal gets it read only, or None, and must compact.
+        """
+        with _get_journal_thread_lock(self._journal_filename):
+            fd = None
+            self._journal_writable = exclusive
+            try:
+                fd = open(self._journal_filename, "ab+" if exclusive else "rb")
+            except OSError as e:
+                if exclusive:
+                    if not self._can_write_test_status():
+                        raise
+
+                    logging.debug(
+                        "Cannot write journal {}, writing TestStatus instead: {}".format(
+                            self._journal_filename, e
+                        )
+                    )
+                    self._journal_writable = False
+                    try:
+                        fd = open(self._journal_filename, "rb")
+                    except OSError:
+                        pass
+
+            if fd is None:
+                yield None
+            else:
+                try:
+                    _lock_file(
+                        fd,
+                        fcntl.LOCK_EX if self._journal_writable else fcntl.LOCK_SH,
+                    )
+                    yield fd
+                finally:
+                    # Closing the file releases the lock
+                    fd.close()
+
+    def _sync(self, fd):
+        """
+        Bring the synced statuses up to date with the TestStatus file and the
+        journal fd, then apply the pending changes on top of them.
+        """
+        signature = _get_signature(self._filename)
+        journal_size = 0 if fd is None else os.fstat(fd.fileno()).st_size
+        if signature != self._base_signature or journal_size < self._journal_offset:
+            # TestStatus was compacted or rewritten, start over
+            self._base_signature = signature
+            self._journal_offset = 0
+            self._journal_records = 0
+            self._journal_stale = False
+            self._phase_statuses = {}
+            if signature is not None:
+                with open(self._filename, "r") as ts_fd:
+                    self._parse_test_status(ts_fd.read())
+        else:
+            self._phase_statuses = dict(self._synced_statuses)
+
+        if journal_size > self._journal_offset and not self._journal_stale:
+            fd.seek(self._journal_offset)
+            data = fd.read(journal_size - self._journal_offset)
+            # Only complete records, writers hold the lock so this is paranoia
+            data = data[: data.rfind(b"\n") + 1]
+            lines = data.decode().splitlines()
+            if self._journal_offset == 0 and lines:
+                header = lines.pop(0)
+                if signature is None or header != _get_journal_header(signature):
+                    logging.debug(
+                        "Ignoring journal {} of another TestStatus file".format(
+                            self._journal_filename
+                        )
+                    )
+                    self._journal_stale = True
+                    lines = []
+
+            self._journal_offset += len(data)
+            for line in lines:
+                tokens = line.split()
+                if len(tokens) < 3:
+                    logging.warning(
+                        "In TestStatus journal for test '{}', line '{}' not in expected format".format(
+                            self._test_name, line
+                        )
+                    )
+                    continue
+
+                status, curr_test_name, phase = tokens[:3]
+                if self._test_name is None:
+                    self._test_name = curr_test_name
+
+                self._apply_status(phase, status, " ".join(tokens[3:]))
+                self._journal_records += 1
+
+        self._synced_statuses = dict(self._phase_statuses)
+        for phase, status, comments in self._pending:
+            self._apply_status(phase, status, comments)
+
+    def _append(self, fd):
+        data = (
+            ""
+            if self._journal_offset
+            else _get_journal_header(self._base_signature) + "\n"
+        )
+        for phase, status, comments in self._pending:
+            data += (
+                "{} {} {} {}".format(status, self._test_name, phase, comments).rstrip()
+                + "\n"
+            )
+
+        data = data.encode()
+        fd.write(data)
+        fd.flush()
+
+        self._journal_offset += len(data)
+        self._journal_records += len(self._pending)
+        self._synced_statuses = dict(self._phase_statuses)
+        self._pending = []
+
+    def _compact(self, fd):
+        # Write then rename so readers never see a partial TestStatus file,
+        # unless only TestStatus itself can be written
+        tmp_filename = "{}.tmp".format(self._filename)
+        try:
+            with open(tmp_filename, "w") as ts_fd:
+                ts_fd.write(self.phase_statuses_dump())
+        except OSError:
+            with open(self._filename, "w") as ts_fd:
+                ts_fd.write(self.phase_statuses_dump())
+        else:
+            os.replace(tmp_filename, self._filename)
+
+        # The journal is emptied rather than removed, a writer waiting on its
+        # lock holds it open and would append to a removed file. A journal we
+        # cannot write is left as is, it does not match the new TestStatus.
+        if self._journal_writable:
+            fd.truncate(0)
+
+        self._base_signature = _get_signature(self._filename)
+        self._journal_offset = 0
+        self._journal_records = 0
+        self._journal_stale = False
+        self._synced_statuses = dict(self._phase_statuses)
+        self._pending = []
 
     def _parse_test_status(self, file_contents):
         """
@@ -399,10 +706,6 @@ class TestStatus(object):
                     )
                 )
 
-    def _parse_test_status_file(self):
-        with open(self._filename, "r") as fd:
-            self._parse_test_status(fd.read())
-
     def _get_overall_status_based_on_phases(
         self,
         phases,
@@ -0,0 +1,238 @@
+"""
+Distributes the shell phases of create_test to worker processes through a
+directory under the test root, so that a create_test run can use the nodes of
+a cluster allocation for builds and no-batch runs.
+
+The protocol only needs a file system shared by the coordinator and the
+workers:
+    queue/<job>.json    jobs waiting for a worker, written by the coordinator
+    running/<job>.json  jobs claimed by a worker (claiming is an atomic rename)
+    done/<job>.json     results of jobs, written by the worker
+    workers/<name>      heartbeat of each worker
+    stop                written by the coordinator when there is no more work
+"""
+
+from CIME.XML.standard_module_setup import *
+from CIME.utils import run_cmd, get_tools_path
+import itertools
+import json
+import os
+import socket
+import subprocess
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_QUEUE_DIR = "queue"
+_RUNNING_DIR = "running"
+_DONE_DIR = "done"
+_WORKERS_DIR = "workers"
+_STOP_FILE = "stop"
+
+# Seconds after which the coordinator warns about a job no worker has claimed
+_UNCLAIMED_WARNING = 60
+
+
+def get_work_dir(test_root, test_id):
+    """
+    Return the directory used to hand out the jobs of test_id to workers
+
+    >>> get_work_dir("/tmp/tests", "20240101_000000")
+    '/tmp/tests/create_test.20240101_000000.work'
+    """
+    return os.path.join(test_root, "create_test.{}.work".format(test_id))
+
+
+def _write_json(path, data):
+    # Write then rename so readers never see a partial file
+    tmp_path = "{}.tmp".format(path)
+    with open(tmp_path, "w") as fd:
+        json.dump(data, fd)
+
+    os.rename(tmp_path, path)
+
+
+def _read_json(path):
+    with open(path, "r") as fd:
+        return json.load(fd)
+
+
+class WorkQueue(object):
+    """
+    The coordinator side of the protocol, run_cmd blocks the calling thread until
+    a worker has run the command.
+    """
+
+    def __init__(self, work_dir, poll_interval=1.0):
+        self._work_dir = work_dir
+        self._poll_interval = poll_interval
+        self._job_ids = itertools.count()
+        self._local_workers = []
+
+        for name in [_QUEUE_DIR, _RUNNING_DIR, _DONE_DIR, _WORKERS_DIR]:
+            os.makedirs(os.path.join(work_dir, name), exist_ok=True)
+
+        # Job names are reused by each run of the same test id
+        for name in [_QUEUE_DIR, _RUNNING_DIR, _DONE_DIR]:
+            for item in os.listdir(os.path.join(work_dir, name)):
+                os.remove(os.path.join(work_dir, name, item))
+
+        stop_file = os.path.join(work_dir, _STOP_FILE)
+        if os.path.exists(stop_file):
+            os.remove(stop_file)
+
+    def start_local_workers(self, num_workers, procs):
+        """
+        Start num_workers workers on this node that share procs between them
+        """
+        procs_per_worker = max(1, procs // num_workers)
+        worker_tool = os.path.join(get_tools_path(), "create_test_worker")
+        for idx in range(num_workers):
+            self._local_workers.append(
+                subprocess.Popen(
+                    [
+                        sys.executable,
+                        worker_tool,
+                        self._work_dir,
+                        "--procs",
+                        str(procs_per_worker),
+                        "--name",
+                        "{}.{}".format(socket.gethostname(), idx),
+                        "--poll-interval",
+                        str(self._poll_interval),
+                    ]
+                )
+            )
+
+        logger.info(
+            "Started {} local workers with {} procs each".format(
+                num_workers, procs_per_worker
+            )
+        )
+
+    def run_cmd(self, cmd, from_dir, env, procs):
+        """
+        Run cmd with procs in from_dir on a worker, env are the environment
+        variables that differ from the worker's environment.
+
+        Returns (rc, output, errput) like CIME.utils.run_cmd.
+        """
+        job = "{:06d}.json".format(next(self._job_ids))
+        _write_json(
+            os.path.join(self._work_dir, _QUEUE_DIR, job),
+            {"cmd": cmd, "from_dir": from_dir, "env": env, "procs": procs},
+        )
+
+        result_path = os.path.join(self._work_dir, _DONE_DIR, job)
+        queued_path = os.path.join(self._work_dir, _QUEUE_DIR, job)
+        queued_time = time.time()
+        warned = False
+        while not os.path.exists(result_path):
+            if (
+                not warned
+                and time.time() - queued_time > _UNCLAIMED_WARNING
+                and os.path.exists(queued_path)
+            ):
+                logger.warning(
+                    "No worker has claimed '{}' yet, are create_test_worker processes running for {}?".format(
+                        cmd, self._work_dir
+                    )
+                )
+                warned = True
+
+            time.sleep(self._poll_interval)
+
+        result = _read_json(result_path)
+        logger.debug("'{}' ran on worker {}".format(cmd, result["worker"]))
+
+        return result["rc"], result["output"], result["errput"]
+
+    def shutdown(self):
+        """
+        Tell workers there is no more work and wait for the local workers
+        """
+        with open(os.path.join(self._work_dir, _STOP_FILE), "w") as fd:
+            fd.write("")
+
+        for worker in self._local_workers:
+            worker.wait()
+
+        self._local_workers = []
+
+
+def run_worker(work_dir, procs, name=None, poll_interval=1.0):
+    """
+    The worker side of the protocol. Runs jobs from work_dir, as many at a time
+    as fit in procs, until the coordinator writes the stop file.
+    """
+    name = "{}.{}".format(socket.gethostname(), os.getpid()) if name is None else name
+    queue_dir = os.path.join(work_dir, _QUEUE_DIR)
+    running_dir = os.path.join(work_dir, _RUNNING_DIR)
+    done_dir = os.path.join(work_dir, _DONE_DIR)
+    heartbeat = os.path.join(work_dir, _WORKERS_DIR, name)
+
+    running = {}  # job -> (thread, procs)
+
+    def _run_job(job, running_path):
+        job_data = _read_json(running_path)
+        env = os.environ.copy()
+        env.update(job_data["env"])
+        try:
+            rc, output, errput = run_cmd(
+                job_data["cmd"], from_dir=job_data["from_dir"], env=env
+            )
+        except Exception as e:
+            rc, output, errput = 1, "", str(e)
+
+        _write_json(
+            os.path.join(done_dir, job),
+            {"rc": rc, "output": output, "errput": errput, "worker": name},
+        )
+        os.remove(running_path)
+
+    logger.info(
+        "Worker {} running jobs from {} with {} procs".format(name, work_dir, procs)
+    )
+
+    while True:
+        with open(heartbeat, "w") as fd:
+            fd.write(str(time.time()))
+
+        for job in [x for x, (thread, _) in running.items() if not thread.is_alive()]:
+            running.pop(job)[0].join()
+
+        procs_avail = procs - sum(x[1] for x in running.values())
+        queued_jobs = sorted(x for x in os.listdir(queue_dir) if x.endswith(".json"))
+        for job in queued_jobs:
+            queued_path = os.path.join(queue_dir, job)
+            try:
+                job_procs = _read_json(queued_path)["procs"]
+            except (OSError, ValueError):
+                # Claimed by another worker
+                continue
+
+            # A job larger than this worker runs by itself
+            if job_procs > procs_avail and running:
+                continue
+
+            running_path = os.path.join(running_dir, "{}.{}".format(name, job))
+            try:
+                os.rename(queued_path, running_path)
+            except OSError:
+                # Claimed by another worker
+                continue
+
+            thread = threading.Thread(target=_run_job, args=(job, running_path))
+            thread.start()
+            running[job] = (thread, job_procs)
+            procs_avail -= job_procs
+
+        if not running and not queued_jobs:
+            if os.path.exists(os.path.join(work_dir, _STOP_FILE)):
+                break
+
+        time.sleep(poll_interval)
+
+    os.remove(heartbeat)
+    logger.info("Worker {} done".format(name))
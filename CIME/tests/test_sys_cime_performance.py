@@ -1,8 +1,24 @@
 #!/usr/bin/env python3
 
+import io
+import os
+import tempfile
+import threading
 import time
+from unittest import mock
 
+from CIME import test_status
+from CIME import wait_for_tests
+from CIME.case.case import Case
+from CIME.cs_status import cs_status
+from CIME.test_scheduler import SharedConfig
 from CIME.tests import base
+from CIME.tests import utils as test_utils
+from CIME.utils import get_cime_default_driver
+from CIME.XML.component import Component
+from CIME.XML.files import Files
+from CIME.XML.generic_xml import GenericXML
+from CIME.XML.tests import Tests as ConfigTests
 
 
 class TestCimePerformance(base.BaseTestCase):
@@ -17,3 +33,157 @@ class TestCimePerformance(base.BaseTestCase):
         elapsed = time.time() - ts
 
         print("Perf test result: {:0.2f}".format(elapsed))
+
+    def test_cime_case_get_value_performance(self):
+        casedir = self._create_test(["--no-build", "TESTRUNPASS_P1.f19_g16.A"])
+
+        varids = ["RUNDIR", "STOP_N", "NTASKS_ATM", "ROOTPE_OCN", "BUILD_COMPLETE"]
+        num_repeat = 2000
+
+        with Case(casedir, read_only=True) as case:
+            ts = time.time()
+            for _ in range(num_repeat):
+                for varid in varids:
+                    case.get_value(varid)
+
+            elapsed = time.time() - ts
+
+        print(
+            "Perf test result: {:0.2f} microseconds per Case.get_value call".format(
+                elapsed * 1e6 / (num_repeat * len(varids))
+            )
+        )
+
+    def test_cime_shared_config_performance(self):
+        driver = get_cime_default_driver()
+        num_tests = 20
+
+        # What the XML phase of each test loaded before the configuration was
+        # shared, create_test disables the xml cache while running phases
+        with mock.patch.object(GenericXML, "DISABLE_CACHING", True):
+            ts = time.time()
+            for _ in range(num_tests):
+                files = Files(comp_interface=driver)
+                Component(files.get_value("CONFIG_CPL_FILE"), "CPL")
+                ConfigTests().get_test_node("ERS")
+
+            unshared = time.time() - ts
+
+            ts = time.time()
+            shared_config = SharedConfig()
+            for _ in range(num_tests):
+                shared_config.add_env_test_elements(mock.MagicMock(), driver)
+                shared_config.copy_test_node("ERS")
+
+            shared = time.time() - ts
+
+        print(
+            "Perf test result: {:0.2f} ms per test unshared, {:0.2f} ms per test shared".format(
+                unshared * 1e3 / num_tests, shared * 1e3 / num_tests
+            )
+        )
+
+    def test_cime_wait_for_tests_performance(self):
+        num_tests = 2000
+        num_pending = 100
+
+        with tempfile.TemporaryDirectory() as test_root:
+            test_dirs = []
+            for idx in range(num_tests):
+                test_dir = os.path.join(test_root, "Test_{:d}".format(idx))
+                os.makedirs(test_dir)
+                test_utils.make_fake_teststatus(
+                    test_dir,
+                    "Test_{:d}".format(idx),
+                    test_status.TEST_PASS_STATUS,
+                    test_status.RUN_PHASE,
+                )
+                test_dirs.append(test_dir)
+
+            def _set_pending(status):
+                for test_dir in test_dirs[:num_pending]:
+                    test_utils.make_fake_teststatus(
+                        test_dir,
+                        os.path.basename(test_dir),
+                        status,
+                        test_status.RUN_PHASE,
+                    )
+
+            all_stats = {}
+            for name, disable_inotify in (("polling", True), ("inotify", False)):
+                _set_pending(test_status.TEST_PEND_STATUS)
+                finisher = threading.Timer(
+                    2.0, _set_pending, args=(test_status.TEST_PASS_STATUS,)
+                )
+
+                stats = {}
+                with mock.patch.object(
+                    wait_for_tests, "DISABLE_INOTIFY", disable_inotify
+                ):
+                    ts = time.time()
+                    finisher.start()
+                    results = wait_for_tests._watch_tests(
+                        test_dirs,
+                        True,
+                        False,
+                        False,
+                        False,
+                        False,
+                        False,
+                        False,
+                        stats=stats,
+                    )
+                    elapsed = time.time() - ts
+
+                finisher.join()
+
+                assert all(x[2] == test_status.TEST_PASS_STATUS for x in results)
+                # Each file is parsed once, and again only when it changed
+                assert stats["parses"] <= num_tests + num_pending
+
+                all_stats[name] = stats
+                print(
+                    "Perf test result: wait_for_tests {} waited for {:d} tests in {:0.2f} seconds, {:d} checks and {:d} parses".format(
+                        name, num_tests, elapsed, stats["checks"], stats["parses"]
+                    )
+                )
+
+            assert not all_stats["polling"]["inotify"]
+            if all_stats["inotify"]["inotify"]:
+                # Only the directories inotify reported are checked, instead of
+                # every pending test at each poll
+                assert all_stats["inotify"]["checks"] < all_stats["polling"]["checks"]
+
+    def test_cime_cs_status_index_performance(self):
+        num_tests = 2000
+
+        with tempfile.TemporaryDirectory() as test_root:
+            test_paths = []
+            for idx in range(num_tests):
+                test_dir = os.path.join(test_root, "Test_{:d}.testid".format(idx))
+                os.makedirs(test_dir)
+                test_utils.make_fake_teststatus(
+                    test_dir,
+                    "Test_{:d}".format(idx),
+                    test_status.TEST_PASS_STATUS,
+                    test_status.RUN_PHASE,
+                )
+                test_paths.append(
+                    os.path.join(test_dir, test_status.TEST_STATUS_FILENAME)
+                )
+
+            for name, use_index in (
+                ("without index", False),
+                ("index build", True),
+                ("index refresh", True),
+            ):
+                with mock.patch("builtins.open", wraps=open) as opens:
+                    ts = time.time()
+                    cs_status(test_paths, use_index=use_index, out=io.StringIO())
+                    elapsed = time.time() - ts
+
+                print(
+                    "Perf test result: cs_status {} for {:d} tests took {:0.2f} seconds with {:d} opens".format(
+                        name, num_tests, elapsed, opens.call_count
+                    )
+                )
@@ -7,7 +7,9 @@ import tempfile
 
 from CIME.case import case_submit
 from CIME.case import Case
+from CIME.case.case import _LazyEnvFile
 from CIME import utils
+from CIME.tests import utils as test_utils
 from CIME.tests.utils import mock_case
 
 
@@ -280,6 +282,100 @@ class TestCase(unittest.TestCase):
 
         assert hist_n == None, hist_n
 
+    @mock_case()
+    def test_get_value_cached(self, case, test_env, **kwargs):
+        test_env.new_entry("HIST_N", "$STOP_N", subgroup="test1")
+        test_env.new_entry("STOP_N", "2", subgroup="test1")
+        test_env.new_entry("REST_N", "3", subgroup="test1")
+
+        assert case.get_value("HIST_N") == 2
+
+        with mock.patch.object(
+            test_env, "get_value", wraps=test_env.get_value
+        ) as get_value:
+            assert case.get_value("HIST_N") == 2
+
+            get_value.assert_not_called()
+
+            # unrelated variable, HIST_N stays cached
+            case.set_value("REST_N", 4, subgroup="test1")
+
+            assert case.get_value("HIST_N") == 2
+
+            get_value.assert_not_called()
+
+            # referenced variable
+            case.set_value("STOP_N", 5, subgroup="test1")
+
+            assert case.get_value("HIST_N") == 5
+
+            get_value.assert_called()
+
+    @mock_case()
+    def test_get_value_cache_modified_env(self, case, test_env, **kwargs):
+        test_env.new_entry("HIST_N", "$STOP_N", subgroup="test1")
+        test_env.new_entry("STOP_N", "2", subgroup="test1")
+
+        assert case.get_value("HIST_N") == 2
+
+        # modified without going through case.set_value
+        test_env.set_value("STOP_N", 3, subgroup="test1")
+
+        assert case.get_value("HIST_N") == 3
+
+    @mock_case()
+    def test_get_value_cache_other_tree_modified(self, case, test_env, **kwargs):
+        test_env.new_entry("HIST_N", "$STOP_N", subgroup="test1")
+        test_env.new_entry("STOP_N", "2", subgroup="test1")
+
+        assert case.get_value("HIST_N") == 2
+
+        # a file that is not part of the case
+        other_env = test_utils.TestEnv()
+        other_env.new_entry("STOP_N", "3", subgroup="test1")
+
+        with mock.patch.object(
+            test_env, "get_value", wraps=test_env.get_value
+        ) as get_value:
+            assert case.get_value("HIST_N") == 2
+
+            get_value.assert_not_called()
+
+    @mock_case()
+    def test_get_value_cache_copies_values(self, case, test_env, **kwargs):
+        with mock.patch.object(test_env, "get_value", return_value=["a", "b"]):
+            value = case.get_value("COMP_CLASSES")
+            value.append("c")
+
+            assert case.get_value("COMP_CLASSES") == ["a", "b"]
+
+    @mock_case()
+    def test_get_value_cache_env_reference(self, case, test_env, **kwargs):
+        test_env.new_entry(
+            "HIST_DIR", "$ENV{CIME_TEST_HIST_DIR}/hist", subgroup="test1", etype="char"
+        )
+
+        with mock.patch.dict(os.environ, {"CIME_TEST_HIST_DIR": "/a"}):
+            assert case.get_value("HIST_DIR") == "/a/hist"
+
+        with mock.patch.dict(os.environ, {"CIME_TEST_HIST_DIR": "/b"}):
+            assert case.get_value("HIST_DIR") == "/b/hist"
+
+    @mock_case()
+    def test_get_value_shell_reference_not_cached(self, case, test_env, **kwargs):
+        test_env.new_entry(
+            "HIST_DIR", "$SHELL{echo hist}", subgroup="test1", etype="char"
+        )
+
+        assert case.get_value("HIST_DIR") == "hist"
+
+        with mock.patch(
+            "CIME.XML.generic_xml.run_cmd_no_fail", return_value="other"
+        ) as run_cmd:
+            assert case.get_value("HIST_DIR") == "other"
+
+            run_cmd.assert_called_once_with("echo hist")
+
     @mock.patch("CIME.case.case.Case.read_xml")
     def test_fix_sys_argv_quotes(self, read_xml):
         input_data = ["./xmlquery", "--val", "PIO"]
@@ -660,5 +756,194 @@ class TestCase_RecordCmd(unittest.TestCase):
         handle.writelines.assert_called_with(expected)
 
 
+class TestCaseLazyEnvFiles(unittest.TestCase):
+    ENV_FILES = {
+        "EnvCase": "env_case.xml",
+        "EnvRun": "env_run.xml",
+        "EnvBuild": "env_build.xml",
+        "EnvMachPes": "env_mach_pes.xml",
+        "EnvBatch": "env_batch.xml",
+        "EnvWorkflow": "env_workflow.xml",
+        "EnvPostprocessing": "env_postprocessing.xml",
+        "EnvTest": "env_test.xml",
+        "EnvMachSpecific": "env_mach_specific.xml",
+        "EnvArchive": "env_archive.xml",
+    }
+
+    def setUp(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        self.caseroot = tempdir.name
+
+        self.env_classes = {}
+        for name, basename in self.ENV_FILES.items():
+            patcher = mock.patch("CIME.case.case.{}".format(name))
+            env_class = patcher.start()
+            self.addCleanup(patcher.stop)
+
+            env_file = env_class.return_value
+            env_file.filename = os.path.join(self.caseroot, basename)
+            env_file.get_id.return_value = basename
+            env_file.get_value.return_value = None
+            env_file.get_type_info.return_value = None
+            env_file.check_if_comp_var.side_effect = lambda vid: (vid, None, False)
+            env_file.needsrewrite = False
+            env_file.write.return_value = 0
+            self.env_classes[name] = env_class
+
+        self.env_classes["EnvCase"].return_value.get_values.return_value = ["ATM"]
+
+    def _create_case(self, existing_case=True):
+        case = Case.__new__(Case)
+        case._caseroot = self.caseroot
+        case._existing_case = existing_case
+        case._force_read_only = True
+        case._files = []
+        case.lookups = {}
+        case.bytes_written = 0
+        case.read_xml()
+
+        return case
+
+    def _loaded(self):
+        return [
+            name for name, env_class in self.env_classes.items() if env_class.called
+        ]
+
+    def test_read_xml(self):
+        case = self._create_case()
+
+        self.assertEqual(self._loaded(), ["EnvCase"])
+        # env_postprocessing.xml does not exist
+        self.assertEqual(len(case._files), 8)
+
+        self.assertEqual(
+            case.get_env("batch"), self.env_classes["EnvBatch"].return_value
+        )
+        self.assertEqual(self._loaded(), ["EnvCase", "EnvBatch"])
+
+        self.assertIsNone(case.get_env("test", allow_missing=True))
+
+    def test_get_value_lookup_order(self):
+        self.env_classes["EnvBuild"].return_value.get_value.side_effect = (
+            lambda item, *args, **kwargs: "build" if item == "VAR" else None
+        )
+        self.env_classes["EnvMachPes"].return_value.get_value.return_value = "pes"
+
+        case = self._create_case()
+
+        self.assertEqual(case.get_value("VAR"), "build")
+        self.assertEqual(self._loaded(), ["EnvCase", "EnvRun", "EnvBuild"])
+
+    def test_comp_interface(self):
+        env_build = self.env_classes["EnvBuild"].return_value
+        env_build.get_value.return_value = "nuopc"
+
+        case = self._create_case()
+
+        self.assertEqual(self._loaded(), ["EnvCase"])
+
+        case.get_env("mach_pes")
+
+        self.env_classes["EnvMachPes"].assert_called_with(
+            self.caseroot, components=["ATM"], read_only=True, comp_interface="nuopc"
+        )
+        env_build.get_value.assert_called_once_with("COMP_INTERFACE")
+
+    def test_flush(self):
+        self.env_classes["EnvCase"].return_value.get_value.side_effect = (
+            lambda item, *args, **kwargs: "/not/a/file"
+            if item == "POSTPROCESSING_SPEC_FILE"
+            else None
+        )
+        case = self._create_case()
+        case._files.append(
+            _LazyEnvFile(
+                os.path.join(self.caseroot, "env_postprocessing.xml"),
+                self.env_classes["EnvPostprocessing"],
+            )
+        )
+        case.get_env("run")
+
+        case.flush()
+
+        self.env_classes["EnvCase"].return_value.write.assert_called_with(
+            force_write=False
+        )
+        self.env_classes["EnvRun"].return_value.write.assert_called_with(
+            force_write=False
+        )
+        self.assertEqual(self._loaded(), ["EnvCase", "EnvRun"])
+        self.assertNotIn(
+            "env_postprocessing.xml",
+            [os.path.basename(x.filename) for x in case._files],
+        )
+
+        case.flush(flushall=True)
+
+        self.env_classes["EnvArchive"].return_value.write.assert_called_with(
+            force_write=True
+        )
+        self.env_classes["EnvPostprocessing"].assert_not_called()
+
+    def test_flush_stats(self):
+        case = self._create_case()
+        case.get_env("run").write.return_value = 100
+        case.get_env("batch").write.return_value = 20
+
+        case.flush()
+
+        self.assertEqual(case.last_flush.files_written, 2)
+        self.assertEqual(case.last_flush.bytes_written, 120)
+        self.assertGreaterEqual(case.last_flush.seconds, 0.0)
+
+        case.get_env("batch").write.return_value = 0
+
+        case.flush()
+
+        self.assertEqual(case.last_flush.files_written, 1)
+        self.assertEqual(case.bytes_written, 220)
+
+    def test_flush_new_case(self):
+        case = self._create_case(existing_case=False)
+
+        case.flush()
+
+        self.assertEqual(len(case._files), 8)
+        for env_file in case._files:
+            env_file.write.assert_called_with(force_write=False)
+
+    def test_read_xml_unflushed(self):
+        case = self._create_case()
+        case.get_env("run").needsrewrite = True
+
+        with self.assertRaisesRegex(utils.CIMEError, "unflushed changes"):
+            case.read_xml()
+
+    def test_env_files_loaded_in_place(self):
+        case = self._create_case()
+
+        self.assertIs(type(case._files), list)
+        self.assertIsInstance(case._files[1], _LazyEnvFile)
+        self.assertFalse(case._files[1].needsrewrite)
+
+        case.get_value("VAR")
+
+        self.assertIs(case._files[1], self.env_classes["EnvRun"].return_value)
+
+        case.load_all_env_files()
+
+        for env_files in (
+            case._files,
+            case._env_entryid_files,
+            case._env_generic_files,
+        ):
+            for env_file in env_files:
+                self.assertNotIsInstance(env_file, _LazyEnvFile)
+
+        with self.assertRaises(AttributeError):
+            case.not_an_attribute
+
+
 if __name__ == "__main__":
     unittest.main()
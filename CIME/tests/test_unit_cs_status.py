@@ -230,6 +230,36 @@ class TestCsStatus(CustomAssertionsTestStatus):
         count_regex2 = r"{} +non-passes: +1".format(re.escape(phase_of_interest2))
         self.assertRegex(self._output.getvalue(), count_regex2)
 
+    def test_use_index(self):
+        """cs_status output is the same with and without the status index"""
+        test_paths = []
+        for testnum, status in enumerate(
+            [test_status.TEST_PASS_STATUS, test_status.TEST_FAIL_STATUS]
+        ):
+            test_name = "my.test.name" + str(testnum)
+            test_dir_path = self.create_test_dir(test_name + ".testid")
+            self.create_test_status_core_passes(test_dir_path, test_name)
+            self.set_phase_to_status(
+                test_dir_path, test_name, phase=self._NON_CORE_PHASE, status=status
+            )
+            test_paths.append(os.path.join(test_dir_path, "TestStatus"))
+
+        for kwargs in [
+            {},
+            {"summary": True},
+            {"fails_only": True, "count_fails_phase_list": [self._NON_CORE_PHASE]},
+        ]:
+            expected = io.StringIO()
+            cs_status(test_paths, out=expected, **kwargs)
+
+            for _ in range(2):
+                output = io.StringIO()
+                cs_status(test_paths, use_index=True, out=output, **kwargs)
+
+                self.assertEqual(output.getvalue(), expected.getvalue())
+
+        self.assertTrue(os.path.exists(os.path.join(self._testroot, "cs.status.db")))
+
     def test_expected_fails(self):
         """With the expected_fails_file flag, expected failures should be flagged as such"""
         test_name1 = "my.test.name1"
@@ -18,6 +18,7 @@ import os
 import shutil
 import string
 import tempfile
+from unittest import mock
 from CIME.XML.grids import Grids, _ComponentGrids, _add_grid_info, _strip_grid_from_name
 from CIME.core.exceptions import CIMEError
 
@@ -368,6 +369,76 @@ $GRIDMAP_ENTRIES
         self.assert_grid_info_f09_g17_3glc(grid_info)
         self.assertEqual(grid_info["GLC2ATM_EXTRA"], "unset")
 
+    def _create_grids_xml_3glc(self):
+        self._create_grids_xml(
+            model_grid_entries=self._MODEL_GRID_F09_G17 + self._MODEL_GRID_F09_G17_3GLC,
+            domain_entries=self._DOMAIN_F09
+            + self._DOMAIN_G17
+            + self._DOMAIN_GRIS4
+            + self._DOMAIN_AIS8
+            + self._DOMAIN_LIS12,
+            gridmap_entries=self._GRIDMAP_F09_G17
+            + self._GRIDMAP_GRIS4_G17
+            + self._GRIDMAP_AIS8_G17
+            + self._GRIDMAP_LIS12_G17,
+        )
+
+    def test_get_grid_info_catalog(self):
+        """The grid catalog gives the same results as searching the xml"""
+        self._create_grids_xml_3glc()
+
+        grids = Grids(self._xml_filepath)
+        for name in ("f09_g17", "f09_g17_3glc"):
+            for driver in ("nuopc", "mct"):
+                grid_info = grids.get_grid_info(
+                    name=name, compset="NOT_IMPORTANT", driver=driver
+                )
+                with mock.patch.object(Grids, "DISABLE_CATALOG", True):
+                    expected = grids.get_grid_info(
+                        name=name, compset="NOT_IMPORTANT", driver=driver
+                    )
+
+                self.assertEqual(grid_info, expected)
+
+    def test_get_grid_info_memoized(self):
+        """Repeated queries for a grid are answered from the catalog"""
+        self._create_grids_xml_3glc()
+
+        grid_info = Grids(self._xml_filepath).get_grid_info(
+            name="f09_g17", compset="NOT_IMPORTANT", driver="nuopc"
+        )
+        grid_info["ATM_GRID"] = "changed"
+
+        grids = Grids(self._xml_filepath)
+        with mock.patch.object(Grids, "_get_grid_info") as _get_grid_info:
+            grid_info = grids.get_grid_info(
+                name="f09_g17", compset="NOT_IMPORTANT", driver="nuopc"
+            )
+
+        _get_grid_info.assert_not_called()
+        self.assert_grid_info_f09_g17(grid_info)
+
+    def test_get_grid_info_file_changed(self):
+        """The catalog is rebuilt when config_grids.xml changes"""
+        self._create_grids_xml_3glc()
+
+        Grids(self._xml_filepath).get_grid_info(
+            name="f09_g17", compset="NOT_IMPORTANT", driver="nuopc"
+        )
+
+        self._create_grids_xml(
+            model_grid_entries=self._MODEL_GRID_F09_G17_3GLC,
+            domain_entries="",
+            gridmap_entries="",
+        )
+        mtime = os.path.getmtime(self._xml_filepath) + 10
+        os.utime(self._xml_filepath, (mtime, mtime))
+
+        with self.assertRaisesRegex(CIMEError, "no alias f09_g17 defined"):
+            Grids(self._xml_filepath).get_grid_info(
+                name="f09_g17", compset="NOT_IMPORTANT", driver="nuopc"
+            )
+
 
 class TestComponentGrids(unittest.TestCase):
     """Tests the _ComponentGrids helper class defined in CIME.XML.grids"""
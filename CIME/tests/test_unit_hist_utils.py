@@ -1,9 +1,17 @@
 import io
+import os
+import sys
+import tempfile
+import threading
+import time
 import unittest
 from unittest import mock
 
 import pytest
 
+import CIME
+from CIME import hist_utils
+from CIME.core.exceptions import CIMEError
 from CIME.hist_utils import copy_histfiles, get_ts_synopsis
 from CIME.XML.archive import Archive
 
@@ -67,6 +75,450 @@ class TestHistUtils(unittest.TestCase):
 
         assert num_copied == 1
 
+    def _make_compare_case(self, casedir):
+        case = mock.MagicMock()
+
+        values = {
+            "CASE": "testing",
+            "TESTCASE": "ERS",
+            "CASEROOT": casedir,
+            "RUN_REFCASE": None,
+            "TEST": True,
+            "CCSM_CPRNC": "/bin/cprnc",
+        }
+        case.get_value.side_effect = values.get
+
+        hists = {
+            "atm": ["testing.atm.h0.nc", "testing.atm.h1.nc", "testing.atm.h2.nc"],
+            "cpl": ["testing.cpl.hi.nc", "testing.cpl.h.nc"],
+        }
+        archive = case.get_env.return_value
+        archive.exclude_testing.return_value = False
+        archive.get_test_parameter.return_value = None
+        archive.get_latest_hist_files.side_effect = (
+            lambda casename, model, from_dir, suffix="", ref_case=None: [
+                "{}.{}".format(x, suffix) for x in hists[model]
+            ]
+        )
+
+        case.get_compset_components.return_value = ["atm"]
+
+        return case
+
+    @mock.patch("CIME.hist_utils.safe_copy")
+    def test_compare_hists_concurrent(self, safe_copy):
+        with tempfile.TemporaryDirectory() as tempdir:
+            case = self._make_compare_case(tempdir)
+
+            lock = threading.Lock()
+            running = []
+            max_running = []
+
+            def _cprnc(model, file1, file2, case, rundir, **kwargs):
+                assert kwargs["cprnc_exe"] == "/bin/cprnc"
+
+                with lock:
+                    running.append(file1)
+                    max_running.append(len(running))
+
+                # The first comparisons finish last
+                time.sleep(0.05 * (5 - len(max_running)))
+
+                with lock:
+                    running.remove(file1)
+
+                if "h1" in file1:
+                    log_file = os.path.join(rundir, "testing.atm.h1.nc.cprnc.out")
+                    with open(log_file, "w") as fd:
+                        fd.write("DIFFERENT")
+                    return False, log_file, ""
+
+                return True, None, ""
+
+            with mock.patch.object(hist_utils, "cprnc", side_effect=_cprnc):
+                with self.assertLogs("CIME.hist_utils", level="INFO") as logs:
+                    success, comments, num_compared = hist_utils._compare_hists(
+                        case, tempdir, tempdir, "base", "rest", max_workers=4
+                    )
+
+        assert not success
+        assert num_compared == 5
+        assert max(max_running) > 1
+        assert comments.splitlines()[1:] == [
+            "  comparing model 'atm'",
+            "    testing.atm.h0.nc.base matched testing.atm.h0.nc.rest",
+            "    testing.atm.h1.nc.base did NOT match testing.atm.h1.nc.rest",
+            "    cat {}/testing.atm.h1.nc.cprnc.out".format(tempdir),
+            "    testing.atm.h2.nc.base matched testing.atm.h2.nc.rest",
+            "  comparing model 'cpl'",
+            "    testing.cpl.h.nc.base matched testing.cpl.h.nc.rest",
+            "    testing.cpl.hi.nc.base matched testing.cpl.hi.nc.rest",
+            "FAIL",
+        ]
+
+        # Each comparison is timed
+        assert (
+            len([x for x in logs.output if "cprnc compared" in x and "seconds" in x])
+            == 5
+        )
+
+    def test_compare_hists_cprnc_error(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            case = self._make_compare_case(tempdir)
+
+            def _cprnc(model, file1, file2, case, rundir, **kwargs):
+                if "h1" in file1:
+                    raise hist_utils.CIMEError("Failed to open file")
+
+                return True, None, ""
+
+            with mock.patch.object(hist_utils, "cprnc", side_effect=_cprnc):
+                success, comments, num_compared = hist_utils._compare_hists(
+                    case, tempdir, tempdir, "base", "rest", max_workers=2
+                )
+
+        assert not success
+        assert num_compared == 0
+        assert comments.splitlines()[1:] == [
+            "  comparing model 'atm'",
+            "    testing.atm.h0.nc.base matched testing.atm.h0.nc.rest",
+            "Failed to open file",
+        ]
+
+    def test_compare_hists_cprnc_error_cancels(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            case = self._make_compare_case(tempdir)
+
+            def _cprnc(model, file1, file2, case, rundir, **kwargs):
+                if "h0" in file1:
+                    raise hist_utils.CIMEError("Failed to open file")
+
+                return True, None, ""
+
+            with mock.patch.object(hist_utils, "cprnc", side_effect=_cprnc) as cprnc:
+                success, comments, num_compared = hist_utils._compare_hists(
+                    case, tempdir, tempdir, "base", "rest", max_workers=1
+                )
+
+        assert not success
+        assert comments.splitlines()[-1] == "Failed to open file"
+        # At most the comparison already picked up by the worker also ran
+        assert cprnc.call_count <= 2
+
+    def test_hash_manifest(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            baselines = []
+            for name in ["cpl.hi.nc", "atm.h0.nc", "missing.nc"]:
+                baselines.append(os.path.join(tempdir, name))
+                if name != "missing.nc":
+                    with open(baselines[-1], "w") as fd:
+                        fd.write(name)
+
+            with self.assertLogs("CIME.hist_utils", level="WARNING"):
+                hist_utils._write_hash_manifest(tempdir, baselines)
+
+            hashes = hist_utils._read_hash_manifest(tempdir)
+
+            assert hashes == {
+                "cpl.hi.nc": (9, hist_utils._get_file_hash(baselines[0])),
+                "atm.h0.nc": (9, hist_utils._get_file_hash(baselines[1])),
+            }
+
+            # A baseline changed after the manifest was written is not trusted
+            with open(baselines[0], "a") as fd:
+                fd.write("more")
+
+            assert list(hist_utils._read_hash_manifest(tempdir)) == ["atm.h0.nc"]
+
+            with open(os.path.join(tempdir, hist_utils.HASH_MANIFEST_NAME), "w") as fd:
+                fd.write("{")
+
+            with self.assertLogs("CIME.hist_utils", level="WARNING"):
+                assert hist_utils._read_hash_manifest(tempdir) == {}
+
+    def test_generate_baseline_manifest_error(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            rundir = os.path.join(tempdir, "run")
+            baseline_dir = os.path.join(tempdir, "baseline")
+            os.makedirs(rundir)
+            with open(os.path.join(rundir, "testing.atm.h0.nc"), "w") as fd:
+                fd.write("atm")
+
+            values = {
+                "RUNDIR": rundir,
+                "RUN_REFCASE": None,
+                "CASE": "testing",
+                "TESTCASE": "SMS",
+                "CASEBASEID": "SMS.f19_g16.A",
+                "COMP_INTERFACE": "mct",
+            }
+            case = mock.MagicMock()
+            case.get_value.side_effect = values.get
+            case.get_latest_cpl_log.return_value = None
+            archive = case.get_env.return_value
+            archive.get_latest_hist_files.return_value = ["testing.atm.h0.nc"]
+
+            with mock.patch.object(
+                hist_utils, "_iter_model_file_substrs", return_value=["atm"]
+            ), mock.patch.object(
+                hist_utils,
+                "_write_hash_manifest",
+                side_effect=OSError("No space left on device"),
+            ), mock.patch(
+                "CIME.hist_utils.Config"
+            ) as config, self.assertLogs(
+                "CIME.hist_utils", level="WARNING"
+            ) as logs:
+                config.instance.return_value.create_bless_log = False
+                success, comments = hist_utils._generate_baseline_impl(
+                    case, baseline_dir=baseline_dir
+                )
+
+            assert success
+            assert os.path.isfile(os.path.join(baseline_dir, "atm.h0.nc"))
+            assert any("hash manifest" in x for x in logs.output)
+
+    def test_compare_hists_hash_identical(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            case = self._make_compare_case(tempdir)
+
+            dir1 = os.path.join(tempdir, "run")
+            dir2 = os.path.join(tempdir, "baseline")
+            baselines = []
+            for model, names in [
+                ("atm", ["h0", "h1", "h2"]),
+                ("cpl", ["hi", "h"]),
+            ]:
+                for name in names:
+                    hist = "testing.{}.{}.nc".format(model, name)
+                    for dirname, suffix in [(dir1, "base"), (dir2, "rest")]:
+                        os.makedirs(dirname, exist_ok=True)
+                        with open(
+                            os.path.join(dirname, "{}.{}".format(hist, suffix)), "w"
+                        ) as fd:
+                            # The h1 files differ, the h2 files in size too
+                            if name == "h1" or (name == "h2" and dirname == dir2):
+                                fd.write(hist + suffix)
+                            else:
+                                fd.write(hist)
+
+                        if dirname == dir2:
+                            baselines.append(fd.name)
+
+            hist_utils._write_hash_manifest(dir2, baselines)
+
+            def _cprnc(model, file1, file2, case, rundir, **kwargs):
+                return True, None, ""
+
+            with mock.patch.object(hist_utils, "cprnc", side_effect=_cprnc) as cprnc:
+                success, comments, num_compared = hist_utils._compare_hists(
+                    case,
+                    dir1,
+                    dir2,
+                    "base",
+                    "rest",
+                    hashes2=hist_utils._read_hash_manifest(dir2),
+                )
+
+            # Hash-identical files still get an output file
+            with open(os.path.join(dir1, "testing.atm.h0.nc.base.cprnc.out")) as fd:
+                assert "IDENTICAL (sha256 match)" in fd.read()
+            assert not os.path.exists(
+                os.path.join(dir1, "testing.atm.h1.nc.base.cprnc.out")
+            )
+
+        assert success
+        assert num_compared == 5
+        assert sorted(os.path.basename(x[0][1]) for x in cprnc.call_args_list) == [
+            "testing.atm.h1.nc.base",
+            "testing.atm.h2.nc.base",
+        ]
+        assert comments.splitlines()[1:] == [
+            "  comparing model 'atm'",
+            "    testing.atm.h0.nc.base matched testing.atm.h0.nc.rest (hash-identical)",
+            "    testing.atm.h1.nc.base matched testing.atm.h1.nc.rest",
+            "    testing.atm.h2.nc.base matched testing.atm.h2.nc.rest",
+            "  comparing model 'cpl'",
+            "    testing.cpl.h.nc.base matched testing.cpl.h.nc.rest (hash-identical)",
+            "    testing.cpl.hi.nc.base matched testing.cpl.hi.nc.rest (hash-identical)",
+            "PASS",
+        ]
+
+    def test_compare_hists_python_tool(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            case = self._make_compare_case(tempdir)
+            case.get_env.return_value.get_test_parameter.return_value = "python"
+
+            with mock.patch.object(hist_utils, "cprnc") as cprnc, mock.patch.object(
+                hist_utils, "compare_netcdf", return_value=(True, None, "")
+            ) as compare_netcdf:
+                with self.assertLogs("CIME.hist_utils", level="INFO") as logs:
+                    success, _, num_compared = hist_utils._compare_hists(
+                        case, tempdir, tempdir, "base", "rest"
+                    )
+
+        assert success
+        assert num_compared == 5
+        cprnc.assert_not_called()
+        assert compare_netcdf.call_count == 5
+        assert "cprnc_exe" not in compare_netcdf.call_args[1]
+        assert any("python compared" in x for x in logs.output)
+
+    def test_compare_hists_python_tool_serial(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            case = self._make_compare_case(tempdir)
+            case.get_env.return_value.get_test_parameter.return_value = "python"
+
+            lock = threading.Lock()
+            running = []
+            max_running = []
+
+            def _compare_netcdf(model, file1, file2, case, rundir, **kwargs):
+                with lock:
+                    running.append(file1)
+                    max_running.append(len(running))
+
+                time.sleep(0.02)
+
+                with lock:
+                    running.remove(file1)
+
+                return True, None, ""
+
+            with mock.patch.object(
+                hist_utils, "compare_netcdf", side_effect=_compare_netcdf
+            ):
+                with self.assertLogs("CIME.hist_utils", level="INFO") as logs:
+                    success, _, num_compared = hist_utils._compare_hists(
+                        case, tempdir, tempdir, "base", "rest", max_workers=4
+                    )
+
+        assert success
+        assert num_compared == 5
+        assert max(max_running) == 1
+        assert any("5 python comparisons, 1 at a time" in x for x in logs.output)
+
+    def test_get_compare_tool(self):
+        case = mock.MagicMock()
+        case.get_value.return_value = True
+        envtest = case.get_env.return_value
+
+        envtest.get_test_parameter.return_value = "python"
+        assert hist_utils._get_compare_tool(case) == "python"
+        envtest.get_test_parameter.assert_called_with("HIST_COMPARE_TOOL")
+
+        envtest.get_test_parameter.return_value = None
+        assert hist_utils._get_compare_tool(case) == "cprnc"
+
+        with mock.patch("CIME.hist_utils.Config") as config:
+            config.instance.return_value.hist_compare_tool = "python"
+
+            assert hist_utils._get_compare_tool(case) == "python"
+
+        envtest.get_test_parameter.return_value = "nccmp"
+        with self.assertRaisesRegex(CIMEError, "Unknown hist compare tool"):
+            hist_utils._get_compare_tool(case)
+
+    def test_compare_netcdf_missing_modules(self):
+        with mock.patch.dict(
+            sys.modules, {"CIME.netcdf_compare": None}
+        ), mock.patch.dict(vars(CIME)):
+            vars(CIME).pop("netcdf_compare", None)
+
+            with self.assertRaisesRegex(CIMEError, "needs numpy and netCDF4"):
+                hist_utils.compare_netcdf(
+                    "cam", "case.cam.h0.nc", "base.cam.h0.nc", None, "/tmp"
+                )
+
+    def test_compare_netcdf(self):
+        result = mock.MagicMock(
+            identical=False, num_differing=0, num_not_compared=0, fieldlists_differ=True
+        )
+        result.summary.return_value = "summary\n"
+        netcdf_compare = mock.MagicMock()
+        netcdf_compare.compare_files.return_value = result
+
+        with tempfile.TemporaryDirectory() as tempdir, mock.patch.dict(
+            sys.modules, {"CIME.netcdf_compare": netcdf_compare}
+        ), mock.patch("CIME.netcdf_compare", netcdf_compare, create=True):
+            files_match, output_filename, comment = hist_utils.compare_netcdf(
+                "cam", "/a/case.cam.h0.nc", "/b/case.cam.h0.nc", None, tempdir
+            )
+
+            assert not files_match
+            assert comment == hist_utils.CPRNC_FIELDLISTS_DIFFER
+            assert output_filename == os.path.join(tempdir, "case.cam.h0.nc.cprnc.out")
+            with open(output_filename) as fd:
+                assert fd.read() == "summary\n"
+
+            assert hist_utils.compare_netcdf(
+                "cam",
+                "/a/case.cam.h0.nc",
+                "/b/case.cam.h0.nc",
+                None,
+                tempdir,
+                outfile_suffix=None,
+                ignore_fieldlist_diffs=True,
+            ) == (True, None, "")
+
+            # Only the fields that could be compared count for multiinstance
+            result.fieldlists_differ = False
+            result.num_not_compared = 2
+            assert hist_utils.compare_netcdf(
+                "cpl",
+                "/a/case.cpl.hi.nc",
+                "/b/case.cpl.hi.nc",
+                None,
+                tempdir,
+                multiinst_driver_compare=True,
+                outfile_suffix=None,
+            ) == (True, None, "")
+
+            result.num_differing = 1
+            assert hist_utils.compare_netcdf(
+                "cpl",
+                "/a/case.cpl.hi.nc",
+                "/b/case.cpl.hi.nc",
+                None,
+                tempdir,
+                multiinst_driver_compare=True,
+                outfile_suffix=None,
+            ) == (False, None, "")
+
+    def test_get_compare_workers(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            pairs = []
+            for idx in range(8):
+                pair = tuple(
+                    os.path.join(tempdir, "{}.{}.nc".format(x, idx)) for x in "ab"
+                )
+                for filename in pair:
+                    with open(filename, "w") as fd:
+                        fd.write("x" * 100)
+                pairs.append(pair)
+
+            assert hist_utils._get_compare_workers(pairs, max_workers=3) == 3
+            assert hist_utils._get_compare_workers(pairs[:2], max_workers=3) == 2
+
+            with mock.patch("CIME.hist_utils.Config") as config:
+                config.instance.return_value.max_hist_compare_workers = 5
+
+                assert hist_utils._get_compare_workers(pairs) == 5
+
+            with mock.patch.object(
+                hist_utils.os, "sched_getaffinity", return_value=set(range(16))
+            ):
+                with mock.patch.object(
+                    hist_utils, "_get_available_memory", return_value=None
+                ):
+                    assert hist_utils._get_compare_workers(pairs, max_workers=0) == 8
+
+                # Room for three pairs of 200 bytes
+                with mock.patch.object(
+                    hist_utils, "_get_available_memory", return_value=650
+                ):
+                    assert hist_utils._get_compare_workers(pairs, max_workers=0) == 3
+
 
 def test_get_ts_synopsis_pass_at_end():
     """Comments ending with PASS should return empty string."""
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+
+import os
+import tempfile
+import unittest
+
+has_netcdf = False
+try:
+    import numpy as np
+    import netCDF4
+
+    from CIME import netcdf_compare
+except ImportError:
+    unittest.SkipTest("Skipping netcdf_compare tests, numpy or netCDF4 not found")
+else:
+    has_netcdf = True
+
+
+def write_netcdf(filename, variables):
+    """
+    Write a netCDF file, variables is a dictionary of name -> (dims, data)
+    """
+    with netCDF4.Dataset(filename, "w") as nc:
+        for name, (dims, data) in variables.items():
+            data = np.asarray(data)
+            for dim, size in zip(dims, data.shape):
+                if dim not in nc.dimensions:
+                    nc.createDimension(dim, size)
+
+            var = nc.createVariable(name, data.dtype, dims)
+            if data.dtype.kind == "S":
+                # data is already an array of characters
+                var.set_auto_chartostring(False)
+            var[...] = data
+
+
+class TestNetcdfCompare(unittest.TestCase):
+    def setUp(self):
+        self._tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tempdir.cleanup)
+
+        self._file1 = os.path.join(self._tempdir.name, "case.cam.h0.nc")
+        self._file2 = os.path.join(self._tempdir.name, "base.cam.h0.nc")
+
+    @unittest.skipUnless(has_netcdf, "numpy or netCDF4 not found")
+    def test_identical(self):
+        variables = {
+            "T": (("time", "lat"), np.arange(12.0).reshape(3, 4)),
+            "P0": ((), np.float64(1.0e5)),
+            "nstep": (("time",), np.arange(3, dtype=np.int32)),
+        }
+        variables["T"][1][2] = np.nan
+        write_netcdf(self._file1, variables)
+        write_netcdf(self._file2, variables)
+
+        result = netcdf_compare.compare_files(self._file1, self._file2, chunk_size=4)
+
+        assert result.identical
+        assert [x.name for x in result.fields] == ["T", "P0", "nstep"]
+        assert result.fields[0].num_compared == 12
+        assert "the two files seem to be IDENTICAL" in result.summary()
+
+    @unittest.skipUnless(has_netcdf, "numpy or netCDF4 not found")
+    def test_differences(self):
+        data1 = np.arange(1.0, 13.0).reshape(3, 4)
+        data2 = data1.copy()
+        data2[0][1] = 4.0
+        data2[2][3] = 0.0
+        write_netcdf(self._file1, {"T": (("time", "lat"), data1)})
+        write_netcdf(self._file2, {"T": (("time", "lat"), data2)})
+
+        # Read one row at a time
+        result = netcdf_compare.compare_files(self._file1, self._file2, chunk_size=1)
+
+        assert not result.identical
+        assert result.num_differing == 1
+
+        field = result.fields[0]
+        assert field.num_compared == 12
+        assert field.num_diffs == 2
+        assert field.max_abs_diff == 12.0
+        assert field.max_rel_diff == 1.0
+        assert field.rms_diff == np.sqrt((2.0**2 + 12.0**2) / 12)
+        assert "the two files seem to be DIFFERENT" in result.summary()
+
+    @unittest.skipUnless(has_netcdf, "numpy or netCDF4 not found")
+    def test_fieldlists_differ(self):
+        data = np.arange(4.0)
+        write_netcdf(self._file1, {"T": (("lat",), data), "U": (("lat",), data)})
+        write_netcdf(self._file2, {"T": (("lat",), data), "V": (("lat",), data)})
+
+        result = netcdf_compare.compare_files(self._file1, self._file2)
+
+        assert not result.identical
+        assert result.fieldlists_differ
+        assert result.only_in_file1 == ["U"]
+        assert result.only_in_file2 == ["V"]
+        assert "the two files DIFFER only in their field lists" in result.summary()
+
+    @unittest.skipUnless(has_netcdf, "numpy or netCDF4 not found")
+    def test_char_variables_ignored(self):
+        data = np.arange(4.0)
+        for filename, date in [(self._file1, "10/17/26"), (self._file2, "10/18/26")]:
+            write_netcdf(
+                filename,
+                {
+                    "T": (("lat",), data),
+                    "date_written": (
+                        ("time", "chars"),
+                        np.array([list(date)], dtype="S1"),
+                    ),
+                },
+            )
+
+        result = netcdf_compare.compare_files(self._file1, self._file2)
+
+        assert result.identical
+        assert result.num_differing == 0
+        assert result.num_not_compared == 0
+        assert result.fields[1].is_char
+        assert "date_written not compared, character variable" in result.summary()
+        assert "the two files seem to be IDENTICAL" in result.summary()
+
+    @unittest.skipUnless(has_netcdf, "numpy or netCDF4 not found")
+    def test_dimensions_differ(self):
+        write_netcdf(
+            self._file1,
+            {"T": (("ninst",), np.zeros(2)), "P": (("lat",), np.arange(4.0))},
+        )
+        write_netcdf(
+            self._file2,
+            {"T": (("ninst",), np.zeros(1)), "P": (("lat",), np.arange(4.0))},
+        )
+
+        result = netcdf_compare.compare_files(self._file1, self._file2)
+
+        assert not result.identical
+        assert result.num_not_compared == 1
+        assert result.num_differing == 0
+        assert not result.fields[0].compared
+
+
+if __name__ == "__main__":
+    unittest.main()
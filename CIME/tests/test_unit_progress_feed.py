@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from CIME.progress_feed import ProgressFeed
+
+
+class TestProgressFeed(unittest.TestCase):
+    def setUp(self):
+        self._tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tempdir.cleanup)
+
+        self._path = os.path.join(self._tempdir.name, "progress.json")
+
+    def _read(self):
+        with open(self._path, "r") as fd:
+            return json.load(fd)
+
+    def test_update(self):
+        feed = ProgressFeed(self._path)
+
+        assert feed.update(lambda: {"completed": 1})
+
+        progress = self._read()
+        assert progress["completed"] == 1
+        assert "updated" in progress
+        assert os.listdir(self._tempdir.name) == ["progress.json"]
+
+    def test_update_throttled(self):
+        feed = ProgressFeed(self._path, min_interval=60)
+        get_progress = mock.MagicMock(return_value={"completed": 1})
+
+        assert feed.update(get_progress)
+        assert not feed.pending
+
+        get_progress.return_value = {"completed": 2}
+        assert not feed.update(get_progress)
+        assert feed.pending
+        assert get_progress.call_count == 1
+        assert self._read()["completed"] == 1
+
+        assert feed.update(get_progress, force=True)
+        assert not feed.pending
+        assert self._read()["completed"] == 2
+
+    def test_update_failure_is_not_fatal(self):
+        feed = ProgressFeed(os.path.join(self._tempdir.name, "missing", "p.json"))
+
+        with self.assertLogs("CIME.progress_feed", level="WARNING"):
+            assert feed.update(lambda: {"completed": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
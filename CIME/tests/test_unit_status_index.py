@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+from CIME import status_index
+from CIME import test_status
+from CIME.status_index import StatusIndex
+from CIME.tests import utils
+
+
+class TestStatusIndex(unittest.TestCase):
+    def setUp(self):
+        self._tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tempdir.cleanup)
+
+        self._test_root = self._tempdir.name
+
+    def _make_test(self, name, status, phase, test_id="testid"):
+        test_dir = os.path.join(self._test_root, "{}.{}".format(name, test_id))
+        os.makedirs(test_dir, exist_ok=True)
+        utils.make_fake_teststatus(test_dir, name, status, phase)
+
+        return os.path.join(test_dir, test_status.TEST_STATUS_FILENAME)
+
+    def test_refresh(self):
+        path1 = self._make_test("ERS.foo.A", "PASS", test_status.RUN_PHASE)
+        path2 = self._make_test(
+            "SMS.foo.A", "FAIL", test_status.MODEL_BUILD_PHASE, test_id="other"
+        )
+
+        with StatusIndex(self._test_root) as index:
+            assert index.refresh([path1, path2]) == 2
+            assert index.refresh([path1, path2]) == 0
+
+            with test_status.TestStatus(test_dir=os.path.dirname(path1)) as ts:
+                ts.set_status(test_status.MEMLEAK_PHASE, "FAIL")
+
+            assert index.refresh([path1, path2]) == 1
+
+            test_statuses = index.get_test_statuses([path2, path1])
+
+        assert list(test_statuses) == [path2, path1]
+        assert test_statuses[path1] == test_status.TestStatus(
+            test_dir=os.path.dirname(path1)
+        )
+        assert test_statuses[path2] == test_status.TestStatus(
+            test_dir=os.path.dirname(path2)
+        )
+        assert test_statuses[path1].get_name() == "ERS.foo.A"
+
+        # The index is kept in the test root
+        with StatusIndex(self._test_root) as index:
+            assert index.refresh([path1, path2]) == 0
+
+    def test_refresh_missing(self):
+        path = self._make_test("ERS.foo.A", "PASS", test_status.RUN_PHASE)
+
+        with StatusIndex(self._test_root) as index:
+            index.refresh([path])
+
+            os.remove(path)
+            os.remove(
+                os.path.join(
+                    os.path.dirname(path), test_status.TEST_STATUS_JOURNAL_FILENAME
+                )
+            )
+
+            assert index.refresh([path]) == 0
+            assert index.get_test_statuses([path]) == {}
+
+    def test_queries(self):
+        paths = [
+            self._make_test("ERS.foo.A", "PASS", test_status.RUN_PHASE),
+            self._make_test("SMS.foo.A", "FAIL", test_status.MODEL_BUILD_PHASE),
+            self._make_test("PET.foo.A", "FAIL", test_status.MODEL_BUILD_PHASE),
+            self._make_test("ERI.foo.A", "PEND", test_status.RUN_PHASE),
+        ]
+
+        with StatusIndex(self._test_root) as index:
+            index.refresh(paths)
+
+            assert index.find_tests(test_status.MODEL_BUILD_PHASE, "FAIL") == [
+                "PET.foo.A",
+                "SMS.foo.A",
+            ]
+            assert index.find_tests(
+                test_status.MODEL_BUILD_PHASE, "FAIL", test_paths=paths[:2]
+            ) == ["SMS.foo.A"]
+
+            phases = [test_status.MODEL_BUILD_PHASE, test_status.RUN_PHASE]
+            non_pass_counts = dict.fromkeys(phases, 0)
+            for path in paths:
+                test_status.TestStatus(
+                    test_dir=os.path.dirname(path)
+                ).increment_non_pass_counts(non_pass_counts)
+
+            assert index.count_non_passes(phases) == non_pass_counts
+            assert index.count_non_passes(phases, paths[1:2]) == {
+                test_status.MODEL_BUILD_PHASE: 1,
+                test_status.RUN_PHASE: 0,
+            }
+
+    def test_schema_version(self):
+        path = self._make_test("ERS.foo.A", "PASS", test_status.RUN_PHASE)
+
+        with StatusIndex(self._test_root) as index:
+            index.refresh([path])
+
+        with mock.patch.object(status_index, "_SCHEMA_VERSION", 2):
+            with StatusIndex(self._test_root) as index:
+                assert index.refresh([path]) == 1
+
+    def test_unwritable_index(self):
+        path = self._make_test("ERS.foo.A", "PASS", test_status.RUN_PHASE)
+
+        os.makedirs(status_index.get_status_index_path(self._test_root))
+
+        with self.assertLogs("CIME.status_index", level="WARNING"):
+            index = StatusIndex(self._test_root)
+
+        with index:
+            assert index.refresh([path]) == 1
+            assert list(index.get_test_statuses([path])) == [path]
+
+    def test_read_only_index(self):
+        path1 = self._make_test("ERS.foo.A", "PASS", test_status.RUN_PHASE)
+        path2 = self._make_test("SMS.foo.A", "PASS", test_status.RUN_PHASE)
+
+        status_index.refresh([path1, path2])
+        index_path = status_index.get_status_index_path(self._test_root)
+        before = os.stat(index_path)
+
+        with test_status.TestStatus(test_dir=os.path.dirname(path1)) as ts:
+            ts.set_status(test_status.MEMLEAK_PHASE, "FAIL")
+
+        # Someone else's test root
+        with mock.patch("CIME.status_index.os.access", return_value=False):
+            with StatusIndex(self._test_root) as index:
+                assert index.refresh([path1, path2]) == 1
+                assert index.get_test_statuses([path1])[path1] == ts
+
+            test_statuses = status_index.get_test_statuses([path1, path2])
+            assert list(test_statuses) == [path1, path2]
+            assert status_index.count_non_passes(
+                [path1, path2], [test_status.MEMLEAK_PHASE]
+            ) == {test_status.MEMLEAK_PHASE: 1}
+
+        assert os.stat(index_path).st_mtime_ns == before.st_mtime_ns
+
+    def test_index_write_fails(self):
+        path = self._make_test("ERS.foo.A", "PASS", test_status.RUN_PHASE)
+
+        update = StatusIndex._update
+        calls = []
+
+        def _update(index, missing, changed):
+            calls.append(index._conn)
+            if len(calls) == 1:
+                raise sqlite3.OperationalError("attempt to write a readonly database")
+            update(index, missing, changed)
+
+        with mock.patch.object(StatusIndex, "_update", autospec=True) as mock_update:
+            mock_update.side_effect = _update
+            with self.assertLogs("CIME.status_index", level="WARNING"):
+                test_statuses = status_index.get_test_statuses([path])
+
+        assert list(test_statuses) == [path]
+        assert calls[0] is not calls[1]
+
+    def test_get_test_statuses(self):
+        path = self._make_test("ERS.foo.A", "PASS", test_status.RUN_PHASE)
+
+        with tempfile.TemporaryDirectory() as other_root:
+            other_dir = os.path.join(other_root, "SMS.foo.A.testid")
+            os.makedirs(other_dir)
+            utils.make_fake_teststatus(
+                other_dir, "SMS.foo.A", "PASS", test_status.RUN_PHASE
+            )
+            other_path = os.path.join(other_dir, test_status.TEST_STATUS_FILENAME)
+
+            missing_path = os.path.join(
+                self._test_root, "PET.foo.A.testid", test_status.TEST_STATUS_FILENAME
+            )
+
+            test_statuses = status_index.get_test_statuses(
+                [other_path, missing_path, path]
+            )
+
+            assert list(test_statuses) == [other_path, path]
+            assert os.path.exists(status_index.get_status_index_path(other_root))
+            assert os.path.exists(status_index.get_status_index_path(self._test_root))
+
+
+if __name__ == "__main__":
+    unittest.main()
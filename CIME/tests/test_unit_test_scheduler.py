@@ -16,6 +16,7 @@ The _xml_phase sets GMAKE_J to MAX_TASKS_PER_NODE when batched builds are
 enabled so the entire compute node is used for the build job.
 """
 
+import os
 from unittest import mock
 
 from CIME import test_scheduler
@@ -69,6 +70,7 @@ def _make_xml_scheduler(batched_build, model_build_cost=1, proc_pool=16):
     ts._proc_pool = proc_pool
     ts._get_test_dir = mock.MagicMock(return_value=_TEST_DIR)
     ts._cime_driver = "mct"  # avoid nuopc-specific os.path.exists check
+    ts._shared_config = test_scheduler.SharedConfig()
     ts._test_id = "testid_0"
     ts._test_data = {}
     ts._baseline_gen_name = None
@@ -168,6 +170,113 @@ class TestXmlPhaseGmakeJ:
         assert not max_tasks_calls
 
 
+class TestSharedConfig:
+    """Tests for the configuration shared by the _xml_phase of all tests."""
+
+    def test_loaded_once_for_all_tests(self):
+        ts = _make_xml_scheduler(batched_build=False)
+
+        with mock.patch("CIME.test_scheduler.Case"), mock.patch(
+            "CIME.test_scheduler.EnvTest"
+        ), mock.patch("CIME.test_scheduler.Files") as files, mock.patch(
+            "CIME.test_scheduler.Component"
+        ) as component, mock.patch(
+            "CIME.test_scheduler.Tests"
+        ) as tests, mock.patch(
+            "CIME.test_scheduler.lock_file"
+        ), mock.patch(
+            "CIME.test_scheduler.is_perf_test", return_value=False
+        ), mock.patch(
+            "os.path.exists", return_value=True
+        ):
+            for _ in range(3):
+                ts._build_group_exeroots = {(_TEST_NAME,): None}
+                ts._xml_phase(_TEST_NAME)
+
+        files.assert_called_once_with(comp_interface="mct")
+        component.assert_called_once()
+        tests.assert_called_once_with()
+        assert tests.return_value.copy.call_count == 3
+
+    def test_threads_do_not_leak(self):
+        """Concurrent _xml_phases each get the entries of their own driver and
+        never use the shared objects at the same time."""
+        import threading
+        import time
+
+        in_use = []
+        overlaps = []
+
+        class _Files(object):
+            def __init__(self, comp_interface):
+                self.comp_interface = comp_interface
+                self.cpl_comp = None
+
+            def get_value(self, vid, attribute=None):
+                # Like Files.get_value, remember the attribute in the object
+                self.cpl_comp = attribute
+                return os.path.join(self.comp_interface, "config_component.xml")
+
+        class _Component(object):
+            def __init__(self, infile, comp):
+                self.comp_interface = os.path.dirname(infile)
+
+        class _EnvTest(object):
+            def __init__(self):
+                self.added = []
+
+            def add_elements_by_group(self, srcobj, attributes, infile):
+                if in_use:
+                    overlaps.append(srcobj)
+
+                in_use.append(srcobj)
+                time.sleep(0.001)
+                self.added.append(
+                    (type(srcobj).__name__, srcobj.comp_interface, infile)
+                )
+                in_use.remove(srcobj)
+
+        shared_config = test_scheduler.SharedConfig()
+        drivers = ["mct", "nuopc"] * 8
+        envtests = [_EnvTest() for _ in drivers]
+
+        with mock.patch("CIME.test_scheduler.Files", _Files), mock.patch(
+            "CIME.test_scheduler.Component", _Component
+        ), mock.patch("os.path.exists", return_value=True):
+            threads = [
+                threading.Thread(
+                    target=shared_config.add_env_test_elements, args=(envtest, driver)
+                )
+                for envtest, driver in zip(envtests, drivers)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        assert not overlaps
+        for envtest, driver in zip(envtests, drivers):
+            assert envtest.added == [
+                ("_Files", driver, "env_test.xml"),
+                ("_Component", driver, "env_test.xml"),
+            ]
+
+    def test_copy_test_node(self):
+        from CIME.XML.tests import Tests
+
+        shared_config = test_scheduler.SharedConfig()
+        config_tests = mock.MagicMock(spec=Tests)
+
+        with mock.patch("CIME.test_scheduler.Tests", return_value=config_tests):
+            node = shared_config.copy_test_node("ERS")
+
+        config_tests.get_test_node.assert_called_once_with("ERS")
+        config_tests.copy.assert_called_once_with(
+            config_tests.get_test_node.return_value
+        )
+        assert node is config_tests.copy.return_value
+
+
 # ---------------------------------------------------------------------------
 # _sharedlib_build_phase
 # ---------------------------------------------------------------------------
@@ -505,3 +614,880 @@ class TestNinjaGmakeFlags:
         # Assert
         assert ts._ninja is True
         assert ts._gmake is False
+
+
+# ---------------------------------------------------------------------------
+# _producer: event driven launching of phases
+# ---------------------------------------------------------------------------
+
+
+def _make_producer_scheduler(build_groups, parallel_jobs=4, proc_pool=4):
+    """Return a bare TestScheduler that runs the CREATE_NEWCASE, XML and SETUP
+    phases of the tests in build_groups through stub phase methods."""
+    from CIME.test_status import CREATE_NEWCASE_PHASE, XML_PHASE, SETUP_PHASE
+
+    ts = object.__new__(test_scheduler.TestScheduler)
+    ts._build_groups = build_groups
+    ts._tests = test_scheduler.OrderedDict(
+        (t, (TEST_START, TEST_PASS_STATUS)) for bg in build_groups for t in bg
+    )
+    ts._phases = [TEST_START, CREATE_NEWCASE_PHASE, XML_PHASE, SETUP_PHASE]
+    ts._config = mock.MagicMock()
+    ts._config.serialize_sharedlib_builds = False
+    ts._config.critical_path_scheduling = False
+    ts._baseline_root = None
+    ts._phase_times = {}
+    ts._phase_backend = "thread"
+    ts._process_pool = None
+    ts._distributed = False
+    ts._local_workers = 0
+    ts._work_queue = None
+    ts._output_root = None
+    ts._model_build_cost = 1
+    ts._build_group_exeroots = {bg: None for bg in build_groups}
+    ts._parallel_jobs = parallel_jobs
+    ts._proc_pool = proc_pool
+    ts._procs_avail = proc_pool
+    ts._mem_pool = None
+    ts._mem_avail = None
+    ts._procs_in_flight = {}
+    ts._mem_in_flight = {}
+    ts._peak_usage = (0, 0)
+    ts._phase_memory = {}
+    ts._past_phase_memory = {}
+    ts._test_data = {}
+    ts._journal = None
+    ts._progress_feed = None
+    ts._test_times = {}
+    ts._queue_depth = 0
+    ts._num_waiting = 0
+    ts._batched_build = False
+    ts._no_batch = True
+    ts._no_run = True
+    ts._completed_tests = 0
+    ts._get_test_dir = mock.MagicMock(return_value=_TEST_DIR)
+    ts._update_test_status_file = mock.MagicMock()
+
+    ts.events = []
+    events_lock = test_scheduler.threading.Lock()
+
+    def _phase_method(phase):
+        def _run(test):
+            with events_lock:
+                ts.events.append(("start", test, phase))
+                ts.events.append(("end", test, phase))
+            return True, ""
+
+        return _run
+
+    ts._create_newcase_phase = _phase_method(CREATE_NEWCASE_PHASE)
+    ts._xml_phase = _phase_method(XML_PHASE)
+    ts._setup_phase = _phase_method(SETUP_PHASE)
+    return ts
+
+
+class TestProducer:
+    """Tests for the completion queue driven _producer."""
+
+    def _run_producer(self, ts):
+        with mock.patch("CIME.test_scheduler.append_status"), mock.patch(
+            "CIME.test_scheduler.time.sleep", side_effect=AssertionError("polling")
+        ):
+            ts._producer()
+
+    def test_all_phases_run(self):
+        from CIME.test_status import SETUP_PHASE
+
+        tests = ["SMS.f19_g16.A.melvin_gnu", "ERS.f19_g16.A.melvin_gnu"]
+        ts = _make_producer_scheduler([(x,) for x in tests], parallel_jobs=1)
+
+        self._run_producer(ts)
+
+        for test in tests:
+            assert ts._tests[test] == (SETUP_PHASE, TEST_PASS_STATUS)
+
+        assert ts._procs_avail == ts._proc_pool
+        assert ts._completed_tests == 2
+        # With a single job the first test in the list is always served first
+        assert [x[1] for x in ts.events[:2]] == [tests[0]] * 2
+
+    def test_build_group_follower_waits_for_leader(self):
+        from CIME.test_status import XML_PHASE, SETUP_PHASE
+
+        leader = "SMS_P2.f19_g16.A.melvin_gnu"
+        follower = "SMS_P4.f19_g16.A.melvin_gnu"
+        ts = _make_producer_scheduler([(leader, follower)])
+
+        with mock.patch.object(
+            ts, "_get_blocking_test", wraps=ts._get_blocking_test
+        ) as get_blocking_test:
+            self._run_producer(ts)
+
+        assert ts._tests[leader] == (SETUP_PHASE, TEST_PASS_STATUS)
+        assert ts._tests[follower] == (SETUP_PHASE, TEST_PASS_STATUS)
+
+        leader_xml_end = ts.events.index(("end", leader, XML_PHASE))
+        follower_xml_start = ts.events.index(("start", follower, XML_PHASE))
+        assert leader_xml_end < follower_xml_start
+
+        # Only tests whose state changed are checked again, 3 phases for each
+        # test plus at most one wait of the follower on each leader phase
+        assert get_blocking_test.call_count <= 3 * 2 + 3
+
+    def test_failed_phase_stops_test(self):
+        from CIME.test_status import XML_PHASE, TEST_FAIL_STATUS
+
+        tests = ["SMS.f19_g16.A.melvin_gnu", "ERS.f19_g16.A.melvin_gnu"]
+        ts = _make_producer_scheduler([(x,) for x in tests])
+        ts._xml_phase = mock.MagicMock(
+            side_effect=lambda test: (test != tests[0], "xml failed")
+        )
+        ts._log_output = mock.MagicMock()
+
+        self._run_producer(ts)
+
+        assert ts._tests[tests[0]] == (XML_PHASE, TEST_FAIL_STATUS)
+        assert ts._tests[tests[1]][1] == TEST_PASS_STATUS
+        assert ts._completed_tests == 2
+
+    def test_blocked_tests_wait_for_resources(self):
+        from CIME.test_status import SETUP_PHASE
+
+        small = ["SMS.f19_g16.A.melvin_gnu", "ERS.f19_g16.A.melvin_gnu"]
+        big = "ERP.f19_g16.A.melvin_gnu"
+        ts = _make_producer_scheduler(
+            [(small[0],), (small[1],), (big,)], parallel_jobs=4, proc_pool=3
+        )
+        ts._get_procs_needed = lambda test, *args, **kwargs: 3 if test == big else 1
+
+        # The second small test holds its proc until the first one is done,
+        # meanwhile the first one gives back its proc after each phase
+        small_done = test_scheduler.threading.Event()
+        holding = test_scheduler.threading.Event()
+        create_newcase_phase = ts._create_newcase_phase
+        setup_phase = ts._setup_phase
+
+        def _create_newcase(test):
+            if test == small[1]:
+                holding.set()
+                assert small_done.wait(timeout=10)
+                holding.clear()
+            return create_newcase_phase(test)
+
+        def _setup(test):
+            result = setup_phase(test)
+            if test == small[0]:
+                small_done.set()
+            return result
+
+        ts._create_newcase_phase = _create_newcase
+        ts._setup_phase = _setup
+
+        launch = ts._producer_indv_test_launch
+        big_attempts = []
+
+        def _launch(test, *args):
+            if test == big:
+                big_attempts.append(holding.is_set())
+            return launch(test, *args)
+
+        ts._producer_indv_test_launch = _launch
+
+        self._run_producer(ts)
+
+        for test in small + [big]:
+            assert ts._tests[test] == (SETUP_PHASE, TEST_PASS_STATUS)
+
+        # The big test is blocked from the start, and not tried again for the
+        # single procs the first small test gives back
+        assert len(big_attempts) > 1
+        assert not any(big_attempts[1:])
+
+
+# ---------------------------------------------------------------------------
+# Critical path scheduling
+# ---------------------------------------------------------------------------
+
+
+class TestCriticalPath:
+    """Tests for ordering phases by longest remaining critical path."""
+
+    _SHORT = "SMS_P2.f19_g16.A.melvin_gnu"
+    _LONG = "ERS_P4.f19_g16.A.melvin_gnu"
+
+    def _past_phase_times(self, baseline_root, test):
+        from CIME.test_status import CREATE_NEWCASE_PHASE, XML_PHASE, SETUP_PHASE
+
+        if test == self._LONG:
+            return {CREATE_NEWCASE_PHASE: 5, XML_PHASE: 5, SETUP_PHASE: 500}
+
+        return {CREATE_NEWCASE_PHASE: 10, XML_PHASE: 10, SETUP_PHASE: 10}
+
+    def test_get_critical_paths(self):
+        from CIME.test_status import CREATE_NEWCASE_PHASE, XML_PHASE, SETUP_PHASE
+
+        ts = _make_producer_scheduler([(self._SHORT,), (self._LONG,)])
+
+        with mock.patch(
+            "CIME.test_scheduler.get_test_phase_times_based_on_past",
+            side_effect=self._past_phase_times,
+        ):
+            critical_paths = ts._get_critical_paths()
+
+        assert critical_paths[(self._SHORT, CREATE_NEWCASE_PHASE)] == 30
+        assert critical_paths[(self._SHORT, SETUP_PHASE)] == 10
+        assert critical_paths[(self._LONG, CREATE_NEWCASE_PHASE)] == 510
+        assert critical_paths[(self._LONG, XML_PHASE)] == 505
+
+    def test_get_critical_paths_build_group(self):
+        from CIME.test_status import CREATE_NEWCASE_PHASE, XML_PHASE
+
+        # The leader is short, but gates the long follower
+        ts = _make_producer_scheduler([(self._SHORT, self._LONG)])
+
+        with mock.patch(
+            "CIME.test_scheduler.get_test_phase_times_based_on_past",
+            side_effect=self._past_phase_times,
+        ):
+            critical_paths = ts._get_critical_paths()
+
+        assert critical_paths[(self._SHORT, XML_PHASE)] == 10 + 505
+        assert critical_paths[(self._SHORT, CREATE_NEWCASE_PHASE)] == 10 + 10 + 505
+
+    def test_get_critical_paths_defaults(self):
+        from CIME.test_status import CREATE_NEWCASE_PHASE, SETUP_PHASE
+
+        ts = _make_producer_scheduler([(self._SHORT,)])
+
+        with mock.patch(
+            "CIME.test_scheduler.get_test_phase_times_based_on_past",
+            return_value={},
+        ):
+            critical_paths = ts._get_critical_paths()
+
+        assert critical_paths[(self._SHORT, SETUP_PHASE)] == (
+            test_scheduler._DEFAULT_PHASE_TIMES[SETUP_PHASE]
+        )
+        assert critical_paths[(self._SHORT, CREATE_NEWCASE_PHASE)] == sum(
+            test_scheduler._DEFAULT_PHASE_TIMES[x] for x in ts._phases[1:]
+        )
+
+    def test_producer_launches_longest_path_first(self):
+        from CIME.test_status import CREATE_NEWCASE_PHASE, SETUP_PHASE
+
+        ts = _make_producer_scheduler([(self._SHORT,), (self._LONG,)], parallel_jobs=1)
+        ts._config.critical_path_scheduling = True
+
+        with mock.patch(
+            "CIME.test_scheduler.get_test_phase_times_based_on_past",
+            side_effect=self._past_phase_times,
+        ), mock.patch("CIME.test_scheduler.append_status"):
+            ts._producer()
+
+        assert ts.events[0] == ("start", self._LONG, CREATE_NEWCASE_PHASE)
+
+        for test in (self._SHORT, self._LONG):
+            assert ts._tests[test] == (SETUP_PHASE, TEST_PASS_STATUS)
+            assert sorted(ts._phase_times[test]) == sorted(ts._phases[1:])
+
+    def test_phase_times_round_trip(self):
+        import tempfile
+
+        from CIME.provenance import (
+            get_test_phase_times_based_on_past,
+            save_test_phase_times,
+        )
+
+        with tempfile.TemporaryDirectory() as baseline_root:
+            assert get_test_phase_times_based_on_past(baseline_root, _TEST_NAME) == {}
+
+            save_test_phase_times(baseline_root, _TEST_NAME, {"XML": 3.7, "SETUP": 20})
+            save_test_phase_times(baseline_root, _TEST_NAME, {"SETUP": 12})
+
+            assert get_test_phase_times_based_on_past(baseline_root, _TEST_NAME) == {
+                "XML": 3,
+                "SETUP": 12,
+            }
+
+
+# ---------------------------------------------------------------------------
+# Process pool backend
+# ---------------------------------------------------------------------------
+
+
+class TestProcessPoolBackend:
+    """Tests for running python-heavy phases in worker processes."""
+
+    def test_invalid_backend(self):
+        import pytest
+
+        from CIME.utils import CIMEError
+
+        with pytest.raises(CIMEError, match="Invalid phase backend 'fiber'"):
+            test_scheduler.TestScheduler([_TEST_NAME], phase_backend="fiber")
+
+    def test_xml_phase_runs_in_worker(self):
+        import os
+
+        from CIME.test_status import SETUP_PHASE
+
+        leader = "SMS_P2.f19_g16.A.melvin_gnu"
+        follower = "SMS_P4.f19_g16.A.melvin_gnu"
+        other = "ERS.f19_g16.A.melvin_gnu"
+        build_groups = [(leader, follower), (other,)]
+        ts = _make_producer_scheduler(build_groups)
+        ts._phase_backend = "process"
+
+        def _xml_phase(test):
+            is_first_test, _, build_group = ts._get_build_group(test)
+            if is_first_test:
+                ts._build_group_exeroots[build_group] = "/exeroot/{}".format(test)
+                ts._output_root = "/output/{:d}".format(os.getpid())
+            else:
+                # the leader's exeroot was handed over from another worker
+                assert ts._build_group_exeroots[build_group] == "/exeroot/{}".format(
+                    leader
+                )
+            return True, ""
+
+        ts._xml_phase = _xml_phase
+
+        with mock.patch("CIME.test_scheduler.append_status"):
+            ts._producer()
+
+        for test in (leader, follower, other):
+            assert ts._tests[test] == (SETUP_PHASE, TEST_PASS_STATUS)
+
+        assert ts._build_group_exeroots == {
+            build_groups[0]: "/exeroot/{}".format(leader),
+            build_groups[1]: "/exeroot/{}".format(other),
+        }
+        assert ts._output_root != "/output/{:d}".format(os.getpid())
+        assert ts._process_pool is None
+
+    def test_xml_phase_exception_in_worker(self):
+        from CIME.test_status import XML_PHASE, TEST_FAIL_STATUS
+
+        ts = _make_producer_scheduler([(_TEST_NAME,)])
+        ts._phase_backend = "process"
+
+        def _xml_phase(test):
+            raise ValueError("bad xml")
+
+        ts._xml_phase = _xml_phase
+        ts._log_output = mock.MagicMock()
+
+        with mock.patch("CIME.test_scheduler.append_status"):
+            ts._producer()
+
+        assert ts._tests[_TEST_NAME] == (XML_PHASE, TEST_FAIL_STATUS)
+
+
+# ---------------------------------------------------------------------------
+# Memory-aware resource pool
+# ---------------------------------------------------------------------------
+
+
+class TestMemoryPool:
+    """Tests for admitting phases on both procs and memory."""
+
+    _TESTS = ["SMS.f19_g16.A.melvin_gnu", "ERS.f19_g16.A.melvin_gnu"]
+
+    def _make_scheduler(self, mem_pool):
+        ts = _make_producer_scheduler([(x,) for x in self._TESTS])
+        ts._mem_pool = mem_pool
+        ts._mem_avail = mem_pool
+        return ts
+
+    def _run_producer(self, ts, past_phase_memory=None):
+        with mock.patch(
+            "CIME.test_scheduler.get_test_phase_memory_based_on_past",
+            return_value={} if past_phase_memory is None else past_phase_memory,
+        ), mock.patch("CIME.test_scheduler.append_status"):
+            ts._producer()
+
+    def test_get_mem_needed(self):
+        from CIME.test_status import SETUP_PHASE, MODEL_BUILD_PHASE, RUN_PHASE
+
+        ts = self._make_scheduler(100000)
+
+        with mock.patch(
+            "CIME.test_scheduler.get_test_phase_memory_based_on_past",
+            return_value={MODEL_BUILD_PHASE: 300},
+        ) as get_past:
+            # learned per proc memory
+            assert ts._get_mem_needed(_TEST_NAME, MODEL_BUILD_PHASE, 4) == 1200
+            # default per proc memory
+            assert ts._get_mem_needed(_TEST_NAME, SETUP_PHASE, 2) == (
+                2 * test_scheduler._DEFAULT_PHASE_MEMORY[SETUP_PHASE]
+            )
+
+            ts._no_batch = False
+            assert ts._get_mem_needed(_TEST_NAME, RUN_PHASE, 64) == (
+                test_scheduler._BATCH_PHASE_MEMORY
+            )
+
+        # past memory is only read once per test
+        get_past.assert_called_once_with(None, _TEST_NAME)
+
+        ts._mem_pool = None
+        assert ts._get_mem_needed(_TEST_NAME, MODEL_BUILD_PHASE, 4) == 0
+
+    def test_get_mem_needed_override(self):
+        from CIME.test_status import SETUP_PHASE, MODEL_BUILD_PHASE
+
+        ts = self._make_scheduler(100000)
+
+        ts._test_data = {_TEST_NAME: {"options": {"memory": 5000}}}
+        assert ts._get_mem_needed(_TEST_NAME, SETUP_PHASE, 1) == 5000
+
+        ts._test_data = {_TEST_NAME: {"options": {"memory": "MODEL_BUILD=7000"}}}
+        assert ts._get_mem_needed(_TEST_NAME, MODEL_BUILD_PHASE, 1) == 7000
+        assert ts._get_mem_needed(_TEST_NAME, SETUP_PHASE, 1) == (
+            test_scheduler._DEFAULT_PHASE_MEMORY[SETUP_PHASE]
+        )
+
+    def test_get_mem_needed_invalid_override(self):
+        import pytest
+
+        from CIME.test_status import SETUP_PHASE
+        from CIME.utils import CIMEError
+
+        ts = self._make_scheduler(100000)
+
+        for memory in ("5GB", "MODEL_BUILD=7GB", "MODEL_BUILD=7000=1"):
+            ts._test_data = {_TEST_NAME: {"options": {"memory": memory}}}
+            with pytest.raises(
+                CIMEError,
+                match="Invalid memory option '{}' for test {}".format(
+                    memory, _TEST_NAME
+                ),
+            ):
+                ts._get_mem_needed(_TEST_NAME, SETUP_PHASE, 1)
+
+    def test_memory_serializes_phases(self):
+        from CIME.test_status import SETUP_PHASE
+
+        # There are procs and jobs for both tests, but only memory for one
+        ts = self._make_scheduler(300)
+
+        self._run_producer(ts)
+
+        for test in self._TESTS:
+            assert ts._tests[test] == (SETUP_PHASE, TEST_PASS_STATUS)
+
+        assert ts._peak_usage == (1, 200)
+        assert ts._mem_avail == 300
+        assert ts._mem_in_flight == {}
+
+    def test_memory_allows_parallel_phases(self):
+        ts = self._make_scheduler(1000)
+
+        self._run_producer(ts)
+
+        assert ts._peak_usage == (2, 400)
+        assert ts._mem_avail == 1000
+
+    def test_phase_larger_than_pool_runs_alone(self):
+        from CIME.test_status import SETUP_PHASE
+
+        ts = self._make_scheduler(100)
+
+        with mock.patch.object(test_scheduler.logger, "warning") as warning:
+            self._run_producer(ts)
+
+        assert "than entire pool (100 MB)" in warning.call_args[0][0]
+
+        for test in self._TESTS:
+            assert ts._tests[test] == (SETUP_PHASE, TEST_PASS_STATUS)
+
+        assert ts._peak_usage == (1, 100)
+
+    def test_shell_cmd_measures_memory(self):
+        import sys
+
+        from CIME.test_status import SETUP_PHASE
+
+        ts = self._make_scheduler(1000)
+        ts._log_output = mock.MagicMock()
+
+        # Allocate and touch 100 MB
+        cmd = "{} -c 'x = bytearray(100 * 1024 * 1024)'".format(sys.executable)
+
+        success, _ = ts._shell_cmd_for_phase(_TEST_NAME, cmd, SETUP_PHASE)
+
+        assert success
+        assert 100 <= ts._phase_memory[_TEST_NAME][SETUP_PHASE] < 1000
+
+    def test_phase_memory_round_trip(self):
+        import tempfile
+
+        from CIME.provenance import (
+            get_test_phase_memory_based_on_past,
+            save_test_phase_memory,
+        )
+
+        with tempfile.TemporaryDirectory() as baseline_root:
+            assert get_test_phase_memory_based_on_past(baseline_root, _TEST_NAME) == {}
+
+            save_test_phase_memory(baseline_root, _TEST_NAME, {"SETUP": 150})
+            save_test_phase_memory(baseline_root, _TEST_NAME, {"SETUP": 120, "RUN": 9})
+
+            assert get_test_phase_memory_based_on_past(baseline_root, _TEST_NAME) == {
+                "SETUP": 120,
+                "RUN": 9,
+            }
+
+
+# ---------------------------------------------------------------------------
+# Resuming from the scheduler journal
+# ---------------------------------------------------------------------------
+
+
+class TestResume:
+    """Tests for resuming an interrupted run from its scheduler journal."""
+
+    _LEADER = "SMS_P2.f19_g16.A.melvin_gnu"
+    _FOLLOWER = "SMS_P4.f19_g16.A.melvin_gnu"
+    _OTHER = "ERS.f19_g16.A.melvin_gnu"
+
+    def _make_scheduler(self, test_root):
+        import os
+
+        ts = _make_producer_scheduler([(self._LEADER, self._FOLLOWER), (self._OTHER,)])
+        ts._test_root = test_root
+        ts._test_id = "fake_testid"
+        ts._get_test_dir = lambda test: os.path.join(test_root, test)
+        return ts
+
+    def _run_producer(self, ts):
+        from CIME.scheduler_journal import SchedulerJournal, get_journal_path
+        from CIME.test_status import XML_PHASE
+
+        ts._journal = SchedulerJournal(get_journal_path(ts._test_root, ts._test_id))
+        ts._journal.open(ts._tests, ts._build_groups, ts._phases, resume=ts._resume)
+
+        def _xml_phase(test):
+            is_first_test, _, build_group = ts._get_build_group(test)
+            if is_first_test:
+                ts._build_group_exeroots[build_group] = "/exeroot"
+            else:
+                assert ts._build_group_exeroots[build_group] == "/exeroot"
+
+            ts.events.append(("start", test, XML_PHASE))
+            return True, ""
+
+        ts._xml_phase = _xml_phase
+
+        with mock.patch("CIME.test_scheduler.append_status"):
+            ts._producer()
+
+        ts._journal.close()
+
+    def test_journal_resumes_interrupted_run(self):
+        import os
+        import tempfile
+
+        from CIME.scheduler_journal import SchedulerJournal, get_journal_path
+        from CIME.test_status import CREATE_NEWCASE_PHASE, XML_PHASE, SETUP_PHASE
+
+        with tempfile.TemporaryDirectory() as test_root:
+            ts = self._make_scheduler(test_root)
+            ts._resume = False
+            ts._parallel_jobs = 1
+            self._run_producer(ts)
+
+            # Simulate going down in the middle of the follower's SETUP and
+            # the other test's CREATE_NEWCASE
+            journal_path = get_journal_path(test_root, "fake_testid")
+            with open(journal_path, "r") as fd:
+                lines = fd.readlines()
+
+            def _keep(line):
+                return not (
+                    ('"test": "{}"'.format(self._FOLLOWER) in line and "SETUP" in line)
+                    or '"test": "{}"'.format(self._OTHER) in line
+                )
+
+            with open(journal_path, "w") as fd:
+                fd.writelines(x for x in lines if _keep(x))
+                fd.write(
+                    '{{"type": "start", "test": "{}", "phase": "SETUP"}}\n'.format(
+                        self._FOLLOWER
+                    )
+                )
+                fd.write(
+                    '{{"type": "start", "test": "{}", "phase": "CREATE_NEWCASE"}}\n'.format(
+                        self._OTHER
+                    )
+                )
+                fd.write('{"type": "end", "test": "tru')
+
+            partial_dir = os.path.join(test_root, self._OTHER)
+            os.makedirs(partial_dir)
+
+            state = SchedulerJournal(journal_path).load()
+            assert state["in_flight"] == {
+                self._FOLLOWER: SETUP_PHASE,
+                self._OTHER: CREATE_NEWCASE_PHASE,
+            }
+            assert state["exeroots"] == {self._LEADER: "/exeroot"}
+
+            resumed = self._make_scheduler(test_root)
+            resumed._resume = True
+            resumed._resume_from_journal()
+
+            assert not os.path.exists(partial_dir)
+            assert resumed._tests[self._LEADER] == (SETUP_PHASE, TEST_PASS_STATUS)
+            assert resumed._tests[self._FOLLOWER] == (XML_PHASE, TEST_PASS_STATUS)
+            assert resumed._tests[self._OTHER] == (TEST_START, TEST_PASS_STATUS)
+            assert resumed._completed_tests == 1
+            assert resumed._build_group_exeroots[(self._LEADER, self._FOLLOWER)] == (
+                "/exeroot"
+            )
+
+            self._run_producer(resumed)
+
+            # Only the interrupted work is redone
+            assert [x[1:] for x in resumed.events if x[0] == "start"] == [
+                (self._FOLLOWER, SETUP_PHASE),
+                (self._OTHER, CREATE_NEWCASE_PHASE),
+                (self._OTHER, XML_PHASE),
+                (self._OTHER, SETUP_PHASE),
+            ]
+
+            for test in resumed._tests:
+                assert resumed._tests[test] == (SETUP_PHASE, TEST_PASS_STATUS)
+
+    def test_resume_keeps_failed_phases(self):
+        import tempfile
+
+        from CIME.scheduler_journal import SchedulerJournal, get_journal_path
+        from CIME.test_status import (
+            CREATE_NEWCASE_PHASE,
+            XML_PHASE,
+            TEST_FAIL_STATUS,
+        )
+
+        with tempfile.TemporaryDirectory() as test_root:
+            ts = self._make_scheduler(test_root)
+
+            journal = SchedulerJournal(get_journal_path(test_root, "fake_testid"))
+            journal.open(ts._tests, ts._build_groups, ts._phases)
+            journal.record_start(self._OTHER, CREATE_NEWCASE_PHASE)
+            journal.record_end(self._OTHER, CREATE_NEWCASE_PHASE, TEST_PASS_STATUS)
+            journal.record_start(self._OTHER, XML_PHASE)
+            journal.record_end(self._OTHER, XML_PHASE, TEST_FAIL_STATUS)
+            journal.close()
+
+            ts._resume_from_journal()
+
+            assert ts._tests[self._OTHER] == (XML_PHASE, TEST_FAIL_STATUS)
+            assert ts._tests[self._LEADER] == (TEST_START, TEST_PASS_STATUS)
+            assert ts._completed_tests == 1
+
+    def test_resume_reconciles_with_test_status(self):
+        import os
+        import tempfile
+
+        from CIME.scheduler_journal import SchedulerJournal, get_journal_path
+        from CIME.test_status import (
+            TestStatus,
+            CREATE_NEWCASE_PHASE,
+            XML_PHASE,
+            SETUP_PHASE,
+            TEST_FAIL_STATUS,
+        )
+
+        with tempfile.TemporaryDirectory() as test_root:
+            ts = self._make_scheduler(test_root)
+
+            journal = SchedulerJournal(get_journal_path(test_root, "fake_testid"))
+            journal.open(ts._tests, ts._build_groups, ts._phases)
+            for phase in ts._phases[1:]:
+                journal.record_start(self._LEADER, phase)
+                journal.record_end(self._LEADER, phase, TEST_PASS_STATUS)
+            # Went down after create_newcase finished but before it was recorded
+            journal.record_start(self._OTHER, CREATE_NEWCASE_PHASE)
+            journal.close()
+
+            # The leader's SETUP was redone by hand and failed
+            os.makedirs(os.path.join(test_root, self._LEADER))
+            with TestStatus(
+                test_dir=os.path.join(test_root, self._LEADER), test_name=self._LEADER
+            ) as test_status:
+                test_status.set_status(CREATE_NEWCASE_PHASE, TEST_PASS_STATUS)
+                test_status.set_status(XML_PHASE, TEST_PASS_STATUS)
+                test_status.set_status(SETUP_PHASE, TEST_FAIL_STATUS)
+
+            other_dir = os.path.join(test_root, self._OTHER)
+            os.makedirs(other_dir)
+            with TestStatus(test_dir=other_dir, test_name=self._OTHER) as test_status:
+                test_status.set_status(CREATE_NEWCASE_PHASE, TEST_PASS_STATUS)
+
+            partial_dir = os.path.join(test_root, self._FOLLOWER)
+            os.makedirs(partial_dir)
+
+            ts._resume_from_journal()
+
+            assert ts._tests[self._LEADER] == (SETUP_PHASE, TEST_FAIL_STATUS)
+            assert os.path.isdir(other_dir)
+            assert ts._tests[self._OTHER] == (CREATE_NEWCASE_PHASE, TEST_PASS_STATUS)
+            assert not os.path.exists(partial_dir)
+            assert ts._tests[self._FOLLOWER] == (TEST_START, TEST_PASS_STATUS)
+            assert ts._completed_tests == 1
+
+    def test_resume_requires_matching_journal(self):
+        import tempfile
+
+        import pytest
+
+        from CIME.scheduler_journal import SchedulerJournal, get_journal_path
+        from CIME.utils import CIMEError
+
+        with tempfile.TemporaryDirectory() as test_root:
+            ts = self._make_scheduler(test_root)
+
+            with pytest.raises(CIMEError, match="no scheduler journal found"):
+                ts._resume_from_journal()
+
+            journal = SchedulerJournal(get_journal_path(test_root, "fake_testid"))
+            journal.open([self._OTHER], [(self._OTHER,)], ts._phases)
+            journal.close()
+
+            with pytest.raises(CIMEError, match="tests do not match"):
+                ts._resume_from_journal()
+
+
+# ---------------------------------------------------------------------------
+# Distributed shell phases
+# ---------------------------------------------------------------------------
+
+
+class TestDistributed:
+    """Tests for running shell phases on workers."""
+
+    def test_shell_cmd_runs_on_worker(self):
+        import os
+        import sys
+        import tempfile
+
+        from CIME.test_status import SETUP_PHASE, MODEL_BUILD_PHASE
+
+        with tempfile.TemporaryDirectory() as test_root:
+            ts = _make_producer_scheduler([(_TEST_NAME,)])
+            ts._test_root = test_root
+            ts._test_id = "fake_testid"
+            ts._distributed = True
+            ts._local_workers = 1
+            ts._log_output = mock.MagicMock()
+
+            def _phase_method(test):
+                assert ts._work_queue is not None
+
+                # The worker reports the memory used, see TestMemoryPool
+                ts._mem_pool = 1000
+                success, _ = ts._shell_cmd_for_phase(
+                    test,
+                    "{} -c 'x = bytearray(50 * 1024 * 1024)'".format(sys.executable),
+                    MODEL_BUILD_PHASE,
+                )
+                ts._mem_pool = None
+                assert success
+
+                # set after the workers started, like create_test does
+                os.environ["FROM_CREATE_TEST"] = "True"
+
+                return ts._shell_cmd_for_phase(
+                    test,
+                    'test $PYTHONPATH && test "$FROM_CREATE_TEST" = True && pwd',
+                    SETUP_PHASE,
+                    from_dir=test_root,
+                )
+
+            ts._setup_phase = _phase_method
+
+            with mock.patch("CIME.test_scheduler.append_status"), mock.patch(
+                "CIME.test_workers.WorkQueue.run_cmd",
+                autospec=True,
+                side_effect=test_scheduler.WorkQueue.run_cmd,
+            ) as run_cmd, mock.patch.dict(os.environ, {"CIME_MODEL": "cesm"}):
+                os.environ.pop("FROM_CREATE_TEST", None)
+                ts._producer()
+
+            assert ts._tests[_TEST_NAME] == (SETUP_PHASE, TEST_PASS_STATUS)
+            assert ts._work_queue is None
+            assert run_cmd.call_count == 2
+            env = run_cmd.call_args[0][3]
+            assert env["CIME_MODEL"] == "cesm"
+            assert env["FROM_CREATE_TEST"] == "True"
+            assert 50 <= ts._phase_memory[_TEST_NAME][MODEL_BUILD_PHASE] < 1000
+            assert os.listdir(os.path.join(test_root, "create_test.fake_testid.work"))
+
+
+# ---------------------------------------------------------------------------
+# Progress feed
+# ---------------------------------------------------------------------------
+
+
+class TestProgress:
+    """Tests for the machine readable progress of a run."""
+
+    def test_progress_feed(self):
+        import json
+        import os
+        import tempfile
+
+        from CIME.progress_feed import ProgressFeed
+        from CIME.test_status import XML_PHASE, SETUP_PHASE, TEST_PEND_STATUS
+
+        leader = "SMS_P2.f19_g16.A.melvin_gnu"
+        follower = "SMS_P4.f19_g16.A.melvin_gnu"
+        other = "ERS.f19_g16.A.melvin_gnu"
+        ts = _make_producer_scheduler([(leader, follower), (other,)], parallel_jobs=1)
+        ts._test_id = "fake_testid"
+
+        snapshots = []
+
+        def _xml_phase(test):
+            snapshots.append(ts._get_progress())
+            return True, ""
+
+        ts._xml_phase = _xml_phase
+
+        with tempfile.TemporaryDirectory() as test_root:
+            path = os.path.join(test_root, "progress.json")
+            ts._progress_feed = ProgressFeed(path, min_interval=0)
+
+            with mock.patch("CIME.test_scheduler.append_status"):
+                ts._producer()
+
+            ts._update_progress(force=True)
+
+            with open(path, "r") as fd:
+                progress = json.load(fd)
+
+        # While the leader's XML phase runs, its follower waits for it and the
+        # other test waits for a free job
+        running = snapshots[0]
+        assert running["running"] == 1
+        assert running["procs_in_use"] == 1
+        assert running["proc_utilization"] == 0.25
+        assert running["tests"][leader]["phase"] == XML_PHASE
+        assert running["tests"][leader]["status"] == TEST_PEND_STATUS
+        assert running["tests"][leader]["procs"] == 1
+        assert running["tests"][leader]["phase_end"] is None
+        assert running["tests"][leader]["end"] is None
+        assert running["waiting_on_build_group"] + running["queue_depth"] == 2
+
+        assert progress["test_id"] == "fake_testid"
+        assert progress["completed"] == progress["total"] == 3
+        assert progress["running"] == progress["procs_in_use"] == 0
+        assert progress["queue_depth"] == 0
+        for test in (leader, follower, other):
+            info = progress["tests"][test]
+            assert info["phase"] == SETUP_PHASE
+            assert info["status"] == TEST_PASS_STATUS
+            assert info["procs"] == 0
+            assert info["start"] <= info["phase_start"] <= info["phase_end"]
+            assert info["end"] == info["phase_end"]
@@ -1,7 +1,11 @@
 #!/usr/bin/env python3
 
+import errno
 import unittest
 import os
+import tempfile
+import threading
+from unittest import mock
 from CIME import test_status
 from CIME import expected_fails
 from CIME.tests.custom_assertions_test_status import CustomAssertionsTestStatus
@@ -158,5 +162,228 @@ class TestTestStatus(CustomAssertionsTestStatus):
                 self.assert_phase_absent(output, phase, self._TESTNAME)
 
 
+class TestTestStatusJournal(unittest.TestCase):
+
+    _TESTNAME = "fake_test"
+
+    def setUp(self):
+        self._tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tempdir.cleanup)
+
+        self._test_dir = self._tempdir.name
+        self._ts_path = os.path.join(self._test_dir, test_status.TEST_STATUS_FILENAME)
+        self._journal_path = os.path.join(
+            self._test_dir, test_status.TEST_STATUS_JOURNAL_FILENAME
+        )
+
+        # As the test scheduler does while it runs tests
+        batch_journal = mock.patch.object(test_status.TestStatus, "BATCH_JOURNAL", True)
+        batch_journal.start()
+        self.addCleanup(batch_journal.stop)
+
+    def _set_status(self, phase, status, comments=""):
+        with test_status.TestStatus(
+            test_dir=self._test_dir, test_name=self._TESTNAME
+        ) as ts:
+            ts.set_status(phase, status, comments=comments)
+
+        return ts
+
+    def _read(self, path):
+        with open(path, "r") as fd:
+            return fd.read()
+
+    def test_first_flush_writes_teststatus(self):
+        ts = self._set_status(test_status.CREATE_NEWCASE_PHASE, "PASS")
+
+        assert self._read(self._ts_path) == ts.phase_statuses_dump()
+        assert self._read(self._journal_path) == ""
+
+    def test_flush_appends(self):
+        self._set_status(test_status.CREATE_NEWCASE_PHASE, "PASS")
+        before = os.stat(self._ts_path)
+
+        self._set_status(test_status.XML_PHASE, "PASS")
+        ts = self._set_status(test_status.SETUP_PHASE, "FAIL", comments="oops")
+
+        after = os.stat(self._ts_path)
+        assert (before.st_ino, before.st_mtime_ns) == (after.st_ino, after.st_mtime_ns)
+
+        lines = self._read(self._journal_path).splitlines()
+        assert lines[1:] == [
+            "PASS fake_test XML",
+            "FAIL fake_test SETUP oops",
+        ]
+
+        other = test_status.TestStatus(test_dir=self._test_dir)
+
+        assert other == ts
+        assert other.get_name() == self._TESTNAME
+        assert other.get_status(test_status.SETUP_PHASE) == "FAIL"
+        assert other.get_comment(test_status.SETUP_PHASE) == "oops"
+
+    def test_flush_writes_teststatus_without_batch(self):
+        self._set_status(test_status.CREATE_NEWCASE_PHASE, "PASS")
+        self._set_status(test_status.XML_PHASE, "PASS")
+
+        with mock.patch.object(test_status.TestStatus, "BATCH_JOURNAL", False):
+            ts = self._set_status(test_status.SETUP_PHASE, "FAIL", comments="oops")
+
+            # The pending journal records are compacted as well
+            assert self._read(self._ts_path) == ts.phase_statuses_dump()
+            assert self._read(self._journal_path) == ""
+
+            ts = self._set_status(test_status.MEMLEAK_PHASE, "PASS")
+
+            assert self._read(self._ts_path) == ts.phase_statuses_dump()
+            assert self._read(self._journal_path) == ""
+
+    def test_journal_locks_per_path(self):
+        self._set_status(test_status.CREATE_NEWCASE_PHASE, "PASS")
+
+        other_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(other_dir.cleanup)
+
+        other = test_status.TestStatus(
+            test_dir=other_dir.name, test_name=self._TESTNAME
+        )
+        flushed = threading.Event()
+
+        def _flush_other():
+            with other:
+                other.set_status(test_status.CREATE_NEWCASE_PHASE, "PASS")
+            flushed.set()
+
+        # Holding the journal of one test does not block writers of another
+        with test_status.TestStatus(test_dir=self._test_dir)._lock_journal(True):
+            thread = threading.Thread(target=_flush_other)
+            thread.start()
+            assert flushed.wait(timeout=10)
+
+        thread.join()
+
+        assert test_status.TestStatus(test_dir=other_dir.name) == other
+
+    def test_compact(self):
+        self._set_status(test_status.CREATE_NEWCASE_PHASE, "PASS")
+        self._set_status(test_status.XML_PHASE, "PASS")
+
+        ts = test_status.TestStatus(test_dir=self._test_dir)
+        ts.compact()
+
+        assert self._read(self._ts_path) == ts.phase_statuses_dump()
+        assert self._read(self._journal_path) == ""
+        assert test_status.TestStatus(test_dir=self._test_dir) == ts
+
+    def test_compact_when_journal_is_long(self):
+        self._set_status(test_status.CREATE_NEWCASE_PHASE, "PASS")
+
+        with mock.patch.object(test_status, "JOURNAL_COMPACT_RECORDS", 2):
+            self._set_status(test_status.XML_PHASE, "PASS")
+
+            assert self._read(self._journal_path) != ""
+
+            ts = self._set_status(test_status.SETUP_PHASE, "PASS")
+
+        assert self._read(self._ts_path) == ts.phase_statuses_dump()
+        assert self._read(self._journal_path) == ""
+
+    def test_refresh(self):
+        self._set_status(test_status.CREATE_NEWCASE_PHASE, "PASS")
+
+        reader = test_status.TestStatus(test_dir=self._test_dir)
+
+        self._set_status(test_status.XML_PHASE, "PASS")
+
+        assert reader.get_status(test_status.XML_PHASE) == "PEND"
+
+        with mock.patch("builtins.open", wraps=open) as opens:
+            reader.refresh()
+
+        # Only the journal is read
+        assert [x[0][0] for x in opens.call_args_list] == [self._journal_path]
+        assert reader.get_status(test_status.XML_PHASE) == "PASS"
+        assert reader.get_status(test_status.SETUP_PHASE) == "PEND"
+
+        test_status.TestStatus(test_dir=self._test_dir).compact()
+        self._set_status(test_status.SETUP_PHASE, "PASS")
+
+        reader.refresh()
+
+        assert reader == test_status.TestStatus(test_dir=self._test_dir)
+
+    def test_writers_merge(self):
+        self._set_status(test_status.CREATE_NEWCASE_PHASE, "PASS")
+
+        writer1 = test_status.TestStatus(test_dir=self._test_dir)
+        writer2 = test_status.TestStatus(test_dir=self._test_dir)
+
+        with writer1:
+            writer1.set_status(test_status.XML_PHASE, "PASS")
+
+        with writer2:
+            writer2.set_status(test_status.MEMLEAK_PHASE, "FAIL")
+
+        ts = test_status.TestStatus(test_dir=self._test_dir)
+
+        assert ts == writer2
+        assert ts.get_status(test_status.XML_PHASE) == "PASS"
+        assert ts.get_status(test_status.MEMLEAK_PHASE) == "FAIL"
+        assert ts.get_latest_phase() == test_status.MEMLEAK_PHASE
+
+    def test_stale_journal(self):
+        self._set_status(test_status.CREATE_NEWCASE_PHASE, "PASS")
+        self._set_status(test_status.XML_PHASE, "FAIL")
+
+        # A tool that does not know about the journal rewrites TestStatus
+        with open(self._ts_path, "w") as fd:
+            fd.write("PASS fake_test CREATE_NEWCASE\nPASS fake_test XML\n")
+
+        ts = test_status.TestStatus(test_dir=self._test_dir)
+
+        assert ts.get_status(test_status.XML_PHASE) == "PASS"
+
+        with ts:
+            ts.set_status(test_status.SETUP_PHASE, "PASS")
+
+        assert self._read(self._journal_path) == ""
+        assert test_status.TestStatus(test_dir=self._test_dir) == ts
+
+    def test_no_locks(self):
+        self._set_status(test_status.CREATE_NEWCASE_PHASE, "PASS")
+
+        with mock.patch(
+            "CIME.test_status.fcntl.lockf",
+            side_effect=OSError(errno.ENOLCK, "No locks available"),
+        ), mock.patch.object(test_status, "_no_lock_warned", False), mock.patch(
+            "CIME.test_status.logging.warning"
+        ) as warning:
+            self._set_status(test_status.XML_PHASE, "PASS")
+            ts = self._set_status(test_status.SETUP_PHASE, "PASS")
+
+        warning.assert_called_once()
+        assert self._read(self._journal_path) != ""
+        assert test_status.TestStatus(test_dir=self._test_dir) == ts
+
+    def test_journal_not_writable(self):
+        self._set_status(test_status.CREATE_NEWCASE_PHASE, "PASS")
+        os.remove(self._journal_path)
+
+        real_open = open
+
+        def _open(path, mode="r", *args, **kwargs):
+            if path == self._journal_path and mode == "ab+":
+                raise PermissionError(errno.EACCES, "Permission denied", path)
+            return real_open(path, mode, *args, **kwargs)
+
+        with mock.patch("builtins.open", side_effect=_open):
+            ts = self._set_status(test_status.XML_PHASE, "FAIL", comments="oops")
+
+        # Compacted straight into TestStatus
+        assert self._read(self._ts_path) == ts.phase_statuses_dump()
+        assert not os.path.exists(self._journal_path)
+        assert test_status.TestStatus(test_dir=self._test_dir) == ts
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+import os
+import tempfile
+import threading
+import unittest
+
+from CIME.test_workers import WorkQueue, run_worker
+
+
+class TestWorkQueue(unittest.TestCase):
+    def setUp(self):
+        self._tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tempdir.cleanup)
+
+        self._work_dir = os.path.join(self._tempdir.name, "create_test.fake.work")
+
+    def _run_cmds(self, work_queue, cmds):
+        results = [None] * len(cmds)
+
+        def _run(idx, cmd, procs):
+            results[idx] = work_queue.run_cmd(
+                cmd, self._tempdir.name, {"CIME_TEST_WORKER_VAR": "set"}, procs
+            )
+
+        threads = [
+            threading.Thread(target=_run, args=(idx, cmd, procs))
+            for idx, (cmd, procs) in enumerate(cmds)
+        ]
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        return results
+
+    def test_local_workers(self):
+        work_queue = WorkQueue(self._work_dir, poll_interval=0.05)
+        work_queue.start_local_workers(2, 4)
+
+        try:
+            results = self._run_cmds(
+                work_queue,
+                [
+                    ("echo $CIME_TEST_WORKER_VAR", 1),
+                    ("pwd", 2),
+                    ("echo oops >&2; exit 3", 1),
+                ],
+            )
+        finally:
+            work_queue.shutdown()
+
+        assert results[0] == (0, "set", "")
+        assert results[1] == (0, os.path.realpath(self._tempdir.name), "")
+        assert results[2] == (3, "", "oops")
+
+        # workers cleaned up after themselves
+        assert os.listdir(os.path.join(self._work_dir, "workers")) == []
+        assert os.listdir(os.path.join(self._work_dir, "running")) == []
+
+    def test_worker_respects_procs(self):
+        work_queue = WorkQueue(self._work_dir, poll_interval=0.05)
+
+        worker = threading.Thread(
+            target=run_worker,
+            args=(self._work_dir, 2),
+            kwargs={"name": "fake", "poll_interval": 0.05},
+        )
+        worker.start()
+
+        log = os.path.join(self._tempdir.name, "log")
+        cmd = "echo start{1} >> {0}; sleep 0.3; echo end{1} >> {0}"
+
+        try:
+            results = self._run_cmds(
+                work_queue,
+                [(cmd.format(log, "A"), 1), (cmd.format(log, "B"), 4)]
+                + [(cmd.format(log, "C"), 1)],
+            )
+        finally:
+            work_queue.shutdown()
+            worker.join()
+
+        assert [x[0] for x in results] == [0, 0, 0]
+
+        with open(log, "r") as fd:
+            events = fd.read().split()
+
+        # The job needing more procs than the worker has runs by itself
+        start = events.index("startB")
+        assert events[start + 1] == "endB"
+        assert sorted(events) == sorted(
+            ["startA", "endA", "startB", "endB", "startC", "endC"]
+        )
+
+    def test_stale_results_are_removed(self):
+        WorkQueue(self._work_dir)
+
+        stale = os.path.join(self._work_dir, "done", "000000.json")
+        with open(stale, "w") as fd:
+            fd.write('{"rc": 1, "output": "", "errput": "stale", "worker": "old"}')
+
+        WorkQueue(self._work_dir)
+
+        assert not os.path.exists(stale)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+import xml.etree.ElementTree as xmlet
+from pathlib import Path
+from unittest import mock
+
+from CIME import test_status
+from CIME import wait_for_tests
+from CIME.tests import utils as test_utils
+
+
+class TestWaitForTestsImpl(unittest.TestCase):
+    def setUp(self):
+        self._tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tempdir.cleanup)
+
+    def _make_test(self, name, status, phase=test_status.RUN_PHASE):
+        test_dir = os.path.join(self._tempdir.name, name)
+        os.makedirs(test_dir, exist_ok=True)
+        test_utils.make_fake_teststatus(test_dir, name, status, phase)
+        return test_dir
+
+    def test_no_wait(self):
+        passed = self._make_test("Test_pass", test_status.TEST_PASS_STATUS)
+        failed = self._make_test("Test_fail", test_status.TEST_FAIL_STATUS)
+        pending = self._make_test("Test_pend", test_status.TEST_PEND_STATUS)
+        missing = os.path.join(
+            self._tempdir.name, "Test_missing", test_status.TEST_STATUS_FILENAME
+        )
+
+        results = wait_for_tests.wait_for_tests_impl(
+            [passed, failed, pending, missing], no_wait=True
+        )
+
+        assert results["Test_pass"] == (
+            passed,
+            test_status.TEST_PASS_STATUS,
+            test_status.RUN_PHASE,
+        )
+        assert results["Test_fail"] == (
+            failed,
+            test_status.TEST_FAIL_STATUS,
+            test_status.RUN_PHASE,
+        )
+        assert results["Test_pend"] == (
+            pending,
+            test_status.TEST_PEND_STATUS,
+            test_status.RUN_PHASE,
+        )
+        assert results["Test_missing"] == (
+            missing,
+            "File '{}' doesn't exist".format(missing),
+            test_status.CREATE_NEWCASE_PHASE,
+        )
+
+    def test_no_wait_use_index(self):
+        test_paths = [
+            self._make_test("Test_pass", test_status.TEST_PASS_STATUS),
+            self._make_test("Test_fail", test_status.TEST_FAIL_STATUS),
+            self._make_test("Test_pend", test_status.TEST_PEND_STATUS),
+            os.path.join(
+                self._tempdir.name, "Test_missing", test_status.TEST_STATUS_FILENAME
+            ),
+        ]
+
+        expected = wait_for_tests.wait_for_tests_impl(test_paths, no_wait=True)
+
+        assert (
+            wait_for_tests.wait_for_tests_impl(test_paths, no_wait=True, use_index=True)
+            == expected
+        )
+        assert os.path.exists(os.path.join(self._tempdir.name, "cs.status.db"))
+
+    def _wait_for_pending(self):
+        passed = self._make_test("Test_pass", test_status.TEST_PASS_STATUS)
+        pending = self._make_test("Test_pend", test_status.TEST_PEND_STATUS)
+
+        def _finish():
+            time.sleep(0.3)
+            test_utils.make_fake_teststatus(
+                pending,
+                "Test_pend",
+                test_status.TEST_FAIL_STATUS,
+                test_status.RUN_PHASE,
+            )
+
+        thread = threading.Thread(target=_finish)
+        thread.start()
+
+        with mock.patch(
+            "CIME.wait_for_tests.TestStatus", wraps=test_status.TestStatus
+        ) as parsed:
+            results = wait_for_tests.wait_for_tests_impl([passed, pending])
+
+        thread.join()
+
+        assert results["Test_pass"][1] == test_status.TEST_PASS_STATUS
+        assert results["Test_pend"][1] == test_status.TEST_FAIL_STATUS
+
+        # Unchanged files are not parsed again
+        assert parsed.call_count <= 4
+
+        with open(os.path.join(pending, ".internal_test_status.log"), "r") as fd:
+            assert "OVERALL: FAIL" in fd.read()
+
+    def test_wait_with_inotify(self):
+        with mock.patch.object(
+            wait_for_tests._Inotify, "create", wraps=wait_for_tests._Inotify.create
+        ) as create:
+            self._wait_for_pending()
+
+        create.assert_called_once()
+
+    def test_wait_by_polling(self):
+        with mock.patch.object(wait_for_tests, "DISABLE_INOTIFY", True):
+            self._wait_for_pending()
+
+    def test_wait_missing_test_dir(self):
+        # A test directory that does not exist yet can not be watched with
+        # inotify, polling is used
+        passed = self._make_test("Test_pass", test_status.TEST_PASS_STATUS)
+        later = os.path.join(
+            self._tempdir.name, "Test_later", test_status.TEST_STATUS_FILENAME
+        )
+
+        def _create():
+            time.sleep(0.3)
+            self._make_test("Test_later", test_status.TEST_PASS_STATUS)
+
+        thread = threading.Thread(target=_create)
+        thread.start()
+
+        results = wait_for_tests.wait_for_tests_impl([passed, later])
+
+        thread.join()
+
+        assert results["Test_later"][1] == test_status.TEST_PASS_STATUS
+
+    def test_signal_stops_waiting(self):
+        pending = self._make_test("Test_pend", test_status.TEST_PEND_STATUS)
+
+        with mock.patch.object(wait_for_tests, "SIGNAL_RECEIVED", True):
+            results = wait_for_tests.wait_for_tests_impl([pending])
+
+        assert results["Test_pend"][1] == test_status.TEST_PEND_STATUS
+
+
+class TestCDashXml(unittest.TestCase):
+    def setUp(self):
+        self._tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tempdir.cleanup)
+
+    def _make_test(self, name, status, log=""):
+        test_dir = os.path.join(self._tempdir.name, name)
+        os.makedirs(test_dir, exist_ok=True)
+        test_utils.make_fake_teststatus(test_dir, name, status, test_status.RUN_PHASE)
+        with open(os.path.join(test_dir, "TestStatus.log"), "w") as fd:
+            fd.write(log)
+
+        return test_dir
+
+    def test_get_test_output(self):
+        test_dir = self._make_test(
+            "Test_pass", test_status.TEST_PASS_STATUS, log="start" + "x" * 100 + "end"
+        )
+
+        assert wait_for_tests.get_test_output(test_dir) == "start" + "x" * 100 + "end"
+
+        output = wait_for_tests.get_test_output(test_dir, max_size=20)
+
+        assert output == "startxxxxx\n... 88 bytes truncated ...\nxxxxxxxend"
+
+    def test_get_nml_diff(self):
+        log = "NLCOMP\n" + "diff line\n" * 10 + "------------\nother\n"
+        test_dir = self._make_test("Test_nlfail", test_status.TEST_PASS_STATUS, log=log)
+
+        assert wait_for_tests.get_nml_diff(test_dir) == "diff line\n" * 10
+        assert (
+            wait_for_tests.get_nml_diff(test_dir, max_size=25)
+            == "diff line\n" * 2 + "... namelist diff truncated ...\n"
+        )
+
+    def test_create_cdash_test_xml(self):
+        test_paths = [
+            self._make_test("Test_b", test_status.TEST_FAIL_STATUS, log="b failed\n"),
+            self._make_test("Test_a", test_status.TEST_PASS_STATUS, log="a passed\n"),
+            self._make_test("Test_c", test_status.TEST_PEND_STATUS),
+        ]
+
+        # Finished tests are written while waiting, in the order they finish
+        spool = wait_for_tests.CDashTestSpool()
+        self.addCleanup(spool.close)
+        finished = []
+
+        def _on_finished(result):
+            finished.append(result[0])
+            spool.add(result[0], result[1], result[2])
+
+        results = wait_for_tests.wait_for_tests_impl(
+            test_paths, no_wait=True, on_finished=_on_finished
+        )
+
+        assert finished == ["Test_b", "Test_a"]
+
+        data_path = Path(self._tempdir.name)
+        wait_for_tests.create_cdash_test_xml(
+            results, "build", "group", "20240101-0000", 0, "host", data_path, spool
+        )
+
+        testing = xmlet.parse(str(data_path / "Test.xml")).getroot().find("Testing")
+
+        assert [x.text for x in testing.find("TestList")] == [
+            "Test_a",
+            "Test_b",
+            "Test_c",
+        ]
+
+        tests = {x.find("Name").text: x for x in testing.findall("Test")}
+
+        assert sorted(tests) == ["Test_a", "Test_b", "Test_c"]
+        assert tests["Test_a"].attrib["Status"] == "passed"
+        assert tests["Test_b"].attrib["Status"] == "failed"
+        assert tests["Test_c"].attrib["Status"] == "notrun"
+        assert tests["Test_b"].find("Results/Measurement/Value").text == "b failed\n"
+        assert [x.tag for x in testing][-1] == "ElapsedMinutes"
+
+        # Without a spool the Test elements are sorted by test name
+        wait_for_tests.create_cdash_test_xml(
+            results, "build", "group", "20240101-0000", 0, "host", data_path
+        )
+
+        testing = xmlet.parse(str(data_path / "Test.xml")).getroot().find("Testing")
+
+        assert [x.find("Name").text for x in testing.findall("Test")] == [
+            "Test_a",
+            "Test_b",
+            "Test_c",
+        ]
+
+    def test_create_cdash_test_xml_duplicate_test(self):
+        other_dir = os.path.join(self._tempdir.name, "other", "Test_a")
+        os.makedirs(other_dir)
+        test_utils.make_fake_teststatus(
+            other_dir, "Test_a", test_status.TEST_PASS_STATUS, test_status.RUN_PHASE
+        )
+        test_paths = [
+            self._make_test("Test_a", test_status.TEST_PASS_STATUS),
+            other_dir,
+        ]
+
+        spool = wait_for_tests.CDashTestSpool()
+        self.addCleanup(spool.close)
+
+        def _on_finished(result):
+            spool.add(result[0], result[1], result[2])
+
+        results = wait_for_tests.wait_for_tests_impl(
+            test_paths, no_wait=True, on_finished=_on_finished
+        )
+
+        data_path = Path(self._tempdir.name)
+        wait_for_tests.create_cdash_test_xml(
+            results, "build", "group", "20240101-0000", 0, "host", data_path, spool
+        )
+
+        testing = xmlet.parse(str(data_path / "Test.xml")).getroot().find("Testing")
+        tests = testing.findall("Test")
+
+        # The test is reported once, for the path in the results
+        assert len(tests) == 1
+        assert tests[0].find("Path").text == results["Test_a"][0]
+
+        # Even if the spool got the other path last
+        other_path = [x for x in test_paths if x != results["Test_a"][0]][0]
+        spool.add("Test_a", other_path, test_status.TEST_PASS_STATUS)
+
+        wait_for_tests.create_cdash_test_xml(
+            results, "build", "group", "20240101-0000", 0, "host", data_path, spool
+        )
+
+        testing = xmlet.parse(str(data_path / "Test.xml")).getroot().find("Testing")
+        tests = testing.findall("Test")
+
+        assert len(tests) == 1
+        assert tests[0].find("Path").text == results["Test_a"][0]
+
+
+if __name__ == "__main__":
+    unittest.main()
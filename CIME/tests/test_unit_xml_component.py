@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from CIME.utils import CIMEError
+from CIME.XML.component import Component
+from CIME.XML.compsets import Compsets
+
+TEST_COMPONENT = """<?xml version="1.0"?>
+<entry_id version="3.0">
+  <description modifier_mode="*">
+    <desc atm="DATM[%NYF][%CRU]">Data atmosphere:</desc>
+    <desc atm="CAM[%WCCM]">CAM:</desc>
+    <desc atm="CAM%WCCM">CAM with WACCM:</desc>
+    <desc option="NYF"> normal year forcing</desc>
+    <desc option="CRU"> CRU forcing</desc>
+    <desc ocn="DOCN[%DOM]">Data ocean:</desc>
+  </description>
+</entry_id>
+"""
+
+TEST_COMPSETS = """<?xml version="1.0"?>
+<compsets version="2.0">
+  <help>test compsets</help>
+  <compset>
+    <alias>A</alias>
+    <lname>2000_DATM%NYF_SLND_DICE%SSMI_DOCN%DOM</lname>
+  </compset>
+  <compset>
+    <alias>F2000</alias>
+    <lname>2000_CAM_CLM_CICE_DOCN%DOM</lname>
+    <science_support grid="f09_f09"/>
+    <science_support grid="f19_f19"/>
+  </compset>
+  <compset>
+    <alias>A2</alias>
+    <lname>2000_DATM%NYF_SLND_DICE%SSMI_DOCN%DOM</lname>
+  </compset>
+</compsets>
+"""
+
+
+class TestXMLComponent(unittest.TestCase):
+    def setUp(self):
+        self._tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tempdir.cleanup)
+
+        self._component_file = os.path.join(self._tempdir.name, "config_component.xml")
+        with open(self._component_file, "w") as fd:
+            fd.write(TEST_COMPONENT)
+
+        self._compsets_file = os.path.join(self._tempdir.name, "config_compsets.xml")
+        with open(self._compsets_file, "w") as fd:
+            fd.write(TEST_COMPSETS)
+
+    def _get_component(self, comp_class="ATM"):
+        with mock.patch("CIME.XML.component.Files") as files:
+            files.return_value.get_schema.return_value = None
+
+            return Component(self._component_file, comp_class)
+
+    def _get_compsets(self):
+        files = mock.MagicMock()
+        files.get_schema.return_value = None
+
+        return Compsets(self._compsets_file, files=files)
+
+    def test_get_description(self):
+        comp = self._get_component()
+
+        assert (
+            comp.get_description("2000_DATM%NYF_SLND_DICE_DOCN%DOM")
+            == "Data atmosphere: normal year forcing"
+        )
+        assert comp.get_description("2000_CAM_SLND_DICE_DOCN%DOM") == "CAM:"
+        # last matching desc wins
+        assert (
+            comp.get_description("2000_CAM%WCCM_SLND_DICE_DOCN%DOM")
+            == "CAM with WACCM:"
+        )
+        assert (
+            comp.get_description("scn:2000_atm:DATM%CRU_ocn:DOCN")
+            == "Data atmosphere: CRU forcing"
+        )
+
+        ocn = self._get_component("OCN")
+
+        assert ocn.get_description("2000_DATM%NYF_DOCN%DOM") == "Data ocean:"
+
+    def test_get_description_no_match(self):
+        comp = self._get_component()
+
+        with self.assertRaisesRegex(
+            CIMEError, "No description found for comp_class atm"
+        ):
+            comp.get_description("2000_SATM_SLND_DICE_DOCN%DOM")
+
+        with self.assertRaisesRegex(
+            CIMEError, "No description found for comp_class atm"
+        ):
+            comp.get_description("2000_DATM%FRED_SLND_DICE_DOCN%DOM")
+
+    def test_get_description_memoized(self):
+        comp = self._get_component()
+
+        compsetname = "2000_DATM%NYF_SLND_DICE_DOCN%DOM"
+
+        desc = comp.get_description(compsetname)
+
+        other = self._get_component()
+
+        with mock.patch.object(
+            Component, "_get_description_match"
+        ) as get_description_match:
+            assert other.get_description(compsetname) == desc
+
+        get_description_match.assert_not_called()
+
+    def test_get_compset_match(self):
+        compsets = self._get_compsets()
+
+        assert compsets.get_compset_match("a") == (
+            "2000_DATM%NYF_SLND_DICE%SSMI_DOCN%DOM",
+            "A",
+            [],
+        )
+        assert compsets.get_compset_match("2000_cam_clm_cice_docn%dom") == (
+            "2000_CAM_CLM_CICE_DOCN%DOM",
+            "F2000",
+            ["f09_f09", "f19_f19"],
+        )
+        assert compsets.get_compset_match("A2") == (
+            "2000_DATM%NYF_SLND_DICE%SSMI_DOCN%DOM",
+            "A2",
+            [],
+        )
+        assert compsets.get_compset_match("B1850") == (None, None, [False])
+
+    def test_get_compset_match_copy(self):
+        compsets = self._get_compsets()
+
+        _, _, science_support = compsets.get_compset_match("F2000")
+
+        science_support.append("ne30_ne30")
+
+        _, _, science_support = self._get_compsets().get_compset_match("F2000")
+
+        assert science_support == ["f09_f09", "f19_f19"]
+
+    def test_print_values(self):
+        compsets = self._get_compsets()
+
+        with self.assertLogs("CIME.XML.compsets", level="INFO") as logs:
+            compsets.print_values(arg_help=False)
+
+        lines = [x.split(":", 2)[2] for x in logs.output]
+
+        assert lines[3:] == [
+            "   A                    : 2000_DATM%NYF_SLND_DICE%SSMI_DOCN%DOM",
+            "   F2000                : 2000_CAM_CLM_CICE_DOCN%DOM",
+            "   A2                   : 2000_DATM%NYF_SLND_DICE%SSMI_DOCN%DOM",
+        ]
+
+
+if __name__ == "__main__":
+    unittest.main()
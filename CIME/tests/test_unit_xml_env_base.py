@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from CIME.XML.entry_id import EntryID
+from CIME.XML.env_base import EnvBase
+from CIME.XML.env_mach_pes import EnvMachPes
+
+XML_ENV_RUN = """<?xml version="1.0"?>
+<file id="env_run.xml" version="2.0">
+  <header>
+      These variables may be changed anytime during a run.
+  </header>
+  <group id="run_begin_stop_restart">
+    <entry id="RUN_TYPE" value="startup">
+      <type>char</type>
+      <valid_values>startup,hybrid,branch</valid_values>
+      <desc>Run initialization type</desc>
+    </entry>
+    <entry id="STOP_N" value="5">
+      <type>integer</type>
+      <desc>Number of intervals to run</desc>
+    </entry>
+  </group>
+  <group id="run_desc">
+    <entry id="RUNDIR" value="$CASEROOT/run">
+      <type>char</type>
+      <desc>The directory where the executable will be run</desc>
+    </entry>
+  </group>
+</file>
+"""
+
+XML_ENV_MACH_PES = """<?xml version="1.0"?>
+<file id="env_mach_pes.xml" version="2.0">
+  <header>
+      These variables CANNOT be modified once case_setup has been invoked.
+  </header>
+  <group id="mach_pes">
+    <entry id="NTASKS">
+      <type>integer</type>
+      <values>
+        <value compclass="ATM">16</value>
+        <value compclass="OCN">8</value>
+      </values>
+      <desc>number of tasks for each component</desc>
+    </entry>
+  </group>
+  <group id="mach_pes_last">
+    <entry id="MAX_MPITASKS_PER_NODE" value="8">
+      <type>integer</type>
+      <desc>maximum number of MPI tasks per node</desc>
+    </entry>
+    <entry id="MAX_CPUTASKS_PER_GPU_NODE" value="0">
+      <type>integer</type>
+      <desc>maximum number of MPI tasks per GPU node</desc>
+    </entry>
+    <entry id="NGPUS_PER_NODE" value="0">
+      <type>integer</type>
+      <desc>number of GPUs per node</desc>
+    </entry>
+  </group>
+</file>
+"""
+
+XML_CONFIG_POSTPROCESSING = """<?xml version="1.0"?>
+<entry_id version="3.0">
+  <entry id="CUPID_NTASKS">
+    <type>integer</type>
+    <default_value>4</default_value>
+    <group>mach_pes_last</group>
+    <file>env_mach_pes.xml</file>
+    <desc>number of tasks used by the postprocessing</desc>
+  </entry>
+</entry_id>
+"""
+
+
+class TestXMLEnvBase(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir, ignore_errors=True)
+
+    def _write(self, name, content):
+        path = os.path.join(self.tempdir, name)
+        with open(path, "w") as fd:
+            fd.write(content)
+        return path
+
+    def test_lookup_uses_index(self):
+        env = EnvBase(self.tempdir, self._write("env_run.xml", XML_ENV_RUN))
+
+        self.assertTrue(env.locked)
+
+        scan_children = EntryID.scan_children
+
+        def _no_tree_scan(self, nodename, attributes=None, root=None):
+            assert root is not None, "whole tree scanned for {}".format(attributes)
+            return scan_children(self, nodename, attributes=attributes, root=root)
+
+        with mock.patch.object(EntryID, "scan_children", _no_tree_scan):
+            self.assertEqual(env.get_value("STOP_N"), 5)
+            self.assertEqual(env.get_value("RUN_TYPE"), "startup")
+            self.assertEqual(
+                env.get_value("STOP_N", subgroup="run_begin_stop_restart"), 5
+            )
+            self.assertIsNone(env.get_value("STOP_N", subgroup="run_desc"))
+            self.assertIsNone(env.get_value("NOT_A_VAR"))
+
+            nodes = env.get_entry_nodes("RUNDIR")
+            self.assertEqual(len(nodes), 1)
+            self.assertEqual(env.get_entry_nodes("RUNDIR", subgroup="run_desc"), nodes)
+            self.assertEqual(env.get_entry_nodes("RUNDIR", subgroup="bogus"), [])
+
+    def test_lookup_matches_tree_scan(self):
+        env = EnvBase(self.tempdir, self._write("env_run.xml", XML_ENV_RUN))
+
+        for vid in ("RUN_TYPE", "STOP_N", "RUNDIR", "NOT_A_VAR"):
+            self.assertEqual(
+                env.scan_children("entry", {"id": vid}),
+                EntryID.scan_children(env, "entry", {"id": vid}),
+            )
+
+        group = env.get_child("group", {"id": "run_desc"})
+        self.assertEqual(
+            env.get_children("entry", {"id": "RUNDIR"}, root=group),
+            EntryID.get_children(env, "entry", {"id": "RUNDIR"}, root=group),
+        )
+        # entries are not direct children of the file root
+        self.assertEqual(env.get_children("entry", {"id": "RUNDIR"}), [])
+
+    def test_set_value(self):
+        env = EnvBase(
+            self.tempdir, self._write("env_run.xml", XML_ENV_RUN), read_only=False
+        )
+
+        env.set_value("STOP_N", 10)
+        self.assertEqual(env.get_value("STOP_N"), 10)
+        self.assertEqual(env.get_value("STOP_N", subgroup="run_begin_stop_restart"), 10)
+        self.assertTrue(env.locked)
+
+    def test_change_file(self):
+        env = EnvBase(
+            self.tempdir, self._write("env_run.xml", XML_ENV_RUN), read_only=False
+        )
+
+        newfile = os.path.join(self.tempdir, "new", "env_run.xml")
+        env.change_file(newfile, copy=True)
+
+        self.assertTrue(env.locked)
+        self.assertEqual(env.filename, newfile)
+        self.assertEqual(env.get_value("STOP_N"), 5)
+
+    def test_compclass_lookup(self):
+        env = EnvMachPes(
+            self.tempdir,
+            self._write("env_mach_pes.xml", XML_ENV_MACH_PES),
+            components=["ATM", "OCN"],
+        )
+
+        self.assertEqual(env.get_value("NTASKS_ATM"), 16)
+        self.assertEqual(env.get_value("NTASKS_OCN"), 8)
+        self.assertEqual(env.get_value("NTASKS", attribute={"compclass": "OCN"}), 8)
+
+        env.set_value("NTASKS_OCN", 32)
+        self.assertEqual(env.get_value("NTASKS_OCN"), 32)
+        self.assertEqual(env.get_value("NTASKS_ATM"), 16)
+
+    def test_add_elements_by_group(self):
+        env = EnvMachPes(
+            self.tempdir,
+            self._write("env_mach_pes.xml", XML_ENV_MACH_PES),
+            components=["ATM", "OCN"],
+        )
+        srcobj = EntryID(
+            self._write("config_postprocessing.xml", XML_CONFIG_POSTPROCESSING)
+        )
+
+        self.assertIsNone(env.get_value("CUPID_NTASKS"))
+
+        env.add_elements_by_group(srcobj=srcobj)
+
+        self.assertTrue(env.locked)
+        self.assertEqual(env.get_value("CUPID_NTASKS"), 4)
+        self.assertEqual(env.get_value("CUPID_NTASKS", subgroup="mach_pes_last"), 4)
+        # no duplicate group is created for an existing group
+        self.assertEqual(len(env.get_children("group", {"id": "mach_pes_last"})), 1)
+        self.assertEqual(
+            len(EntryID.get_children(env, "group", {"id": "mach_pes_last"})), 1
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
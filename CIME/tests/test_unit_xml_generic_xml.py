@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from CIME.XML.generic_xml import GenericXML, lxml_etree
+from CIME.utils import CIMEError
+
+XML_MAIN = """<?xml version="1.0"?>
+<config_test version="2.0" xmlns:xi="http://www.w3.org/2001/XInclude">
+  <entry id="A">a</entry>
+  <xi:include href="{}"/>
+</config_test>
+"""
+
+XML_INCLUDE = """<?xml version="1.0"?>
+<config_test version="2.0">
+  <entry id="B">{}</entry>
+</config_test>
+"""
+
+
+class TestPersistentCache(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.cachedir = os.path.join(self.tempdir, "cache")
+
+        self.include_file = os.path.join(self.tempdir, "include.xml")
+        self.main_file = os.path.join(self.tempdir, "main.xml")
+        self._write(self.include_file, XML_INCLUDE.format("b"))
+        self._write(self.main_file, XML_MAIN.format(self.include_file))
+
+        patchers = [
+            mock.patch.object(GenericXML, "DISABLE_CACHING", False),
+            mock.patch.dict(GenericXML._FILEMAP, clear=True),
+            mock.patch.object(GenericXML, "PERSISTENT_CACHE_DIR", self.cachedir),
+            mock.patch.object(GenericXML, "DISABLE_PERSISTENT_CACHING", False),
+            # The test files are config files of this source tree
+            mock.patch("CIME.XML.generic_xml.get_src_root", return_value=self.tempdir),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir, ignore_errors=True)
+
+    def _write(self, path, content):
+        with open(path, "w") as fd:
+            fd.write(content)
+
+    def _read(self, path, **kwargs):
+        # Bypass the in-process cache
+        GenericXML.invalidate(path)
+
+        return GenericXML(path, **kwargs)
+
+    def _values(self, obj):
+        return [
+            (obj.get(node, "id"), obj.text(node)) for node in obj.scan_children("entry")
+        ]
+
+    def test_cache_hit(self):
+        obj = self._read(self.main_file)
+
+        self.assertEqual(self._values(obj), [("A", "a"), ("B", "b")])
+        self.assertEqual(len(os.listdir(self.cachedir)), 1)
+
+        with mock.patch.object(GenericXML, "read_fd") as read_fd:
+            obj = self._read(self.main_file)
+
+        read_fd.assert_not_called()
+        self.assertEqual(self._values(obj), [("A", "a"), ("B", "b")])
+
+    def test_cache_invalidated_by_include(self):
+        self._read(self.main_file)
+
+        self._write(self.include_file, XML_INCLUDE.format("changed"))
+
+        obj = self._read(self.main_file)
+
+        self.assertEqual(self._values(obj), [("A", "a"), ("B", "changed")])
+
+    def test_cache_invalidated_by_file(self):
+        self._read(self.main_file)
+
+        self._write(self.main_file, XML_MAIN.format(self.include_file) + "\n")
+        os.utime(self.main_file, ns=(0, 0))
+
+        with mock.patch.object(
+            GenericXML, "read_fd", side_effect=GenericXML.read_fd, autospec=True
+        ) as read_fd:
+            self._read(self.main_file)
+
+        read_fd.assert_called()
+
+    def test_corrupt_cache_entry(self):
+        self._read(self.main_file)
+
+        (entry,) = os.listdir(self.cachedir)
+        self._write(os.path.join(self.cachedir, entry), "garbage")
+
+        obj = self._read(self.main_file)
+
+        self.assertEqual(self._values(obj), [("A", "a"), ("B", "b")])
+
+    def test_disabled(self):
+        with mock.patch.object(GenericXML, "DISABLE_PERSISTENT_CACHING", True):
+            self._read(self.main_file)
+
+        self.assertFalse(os.path.exists(self.cachedir))
+
+    def test_read_write_files_not_cached(self):
+        self._read(self.include_file, read_only=False)
+
+        self.assertFalse(os.path.exists(self.cachedir))
+
+    def test_disable_caching(self):
+        with mock.patch.object(GenericXML, "DISABLE_CACHING", True):
+            GenericXML(self.main_file)
+
+        self.assertFalse(os.path.exists(self.cachedir))
+
+    def test_env_files_not_cached(self):
+        env_file = os.path.join(self.tempdir, "env_test.xml")
+        self._write(env_file, XML_INCLUDE.format("b"))
+
+        self._read(env_file)
+
+        self.assertFalse(os.path.exists(self.cachedir))
+
+    def test_files_outside_source_not_cached(self):
+        with tempfile.TemporaryDirectory() as other:
+            other_file = os.path.join(other, "other.xml")
+            self._write(other_file, XML_INCLUDE.format("b"))
+
+            self._read(other_file)
+
+        self.assertFalse(os.path.exists(self.cachedir))
+
+
+XML_SCAN = """<?xml version="1.0"?>
+<config_test version="2.0">
+  <machine MACH="a" COMPILER="gnu">
+    <value MACH="a">1</value>
+    <value MACH="a" COMPILER="intel">2</value>
+    <value MACH="b" COMPILER="gnu">3</value>
+  </machine>
+  <machine MACH="b">
+    <value MACH="a" COMPILER="gnu">4</value>
+    <value COMPILER="gnu">5</value>
+  </machine>
+</config_test>
+"""
+
+
+class TestScanChildren(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tempdir, "scan.xml")
+        with open(self.filename, "w") as fd:
+            fd.write(XML_SCAN)
+
+        patcher = mock.patch.object(GenericXML, "DISABLE_CACHING", True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir, ignore_errors=True)
+
+    def _texts(self, obj, nodes):
+        return [obj.text(node) for node in nodes]
+
+    def _check_scans(self, obj):
+        self.assertEqual(
+            self._texts(obj, obj.scan_children("value", {"MACH": "a"})),
+            ["1", "2", "4"],
+        )
+        self.assertEqual(
+            self._texts(
+                obj, obj.scan_children("value", {"MACH": "a", "COMPILER": "gnu"})
+            ),
+            ["4"],
+        )
+        self.assertEqual(
+            self._texts(
+                obj, obj.scan_children("value", {"MACH": None, "COMPILER": "gnu"})
+            ),
+            ["3", "4"],
+        )
+        self.assertEqual(
+            self._texts(obj, obj.scan_children("value", {"COMPILER": None})),
+            ["2", "3", "4", "5"],
+        )
+        self.assertEqual(obj.scan_children("value", {"MACH": "c"}), [])
+        self.assertEqual(obj.scan_children("bogus", {"MACH": "a"}), [])
+
+        machine = obj.scan_child("machine", {"MACH": "b"})
+        self.assertEqual(
+            self._texts(obj, obj.scan_children("value", {"MACH": "a"}, root=machine)),
+            ["4"],
+        )
+        # root itself is never part of the result
+        self.assertEqual(obj.scan_children("machine", {"MACH": "b"}, root=machine), [])
+
+    def test_scan_children(self):
+        obj = GenericXML(self.filename)
+
+        self._check_scans(obj)
+
+    def test_scan_children_no_index(self):
+        obj = GenericXML(self.filename)
+
+        with mock.patch.object(GenericXML, "DISABLE_SCAN_INDEX", True):
+            self._check_scans(obj)
+
+    def test_scan_children_index_invalidated(self):
+        obj = GenericXML(self.filename, read_only=False)
+
+        self.assertEqual(len(obj.scan_children("value", {"MACH": "b"})), 1)
+
+        machine = obj.scan_child("machine", {"MACH": "b"})
+        obj.make_child("value", attributes={"MACH": "b"}, root=machine, text="6")
+        node = obj.scan_child("value", {"MACH": "a", "COMPILER": "intel"})
+        obj.set(node, "MACH", "b")
+
+        self.assertEqual(
+            self._texts(obj, obj.scan_children("value", {"MACH": "b"})),
+            ["2", "3", "6"],
+        )
+
+    def test_scan_children_index_per_tree(self):
+        obj = GenericXML(self.filename, read_only=False)
+        other = GenericXML(self.filename, read_only=False)
+
+        obj.scan_children("value", {"MACH": "b"})
+        other.scan_children("value", {"MACH": "b"})
+        index = GenericXML._SCAN_INDEX[obj.root.xml_element]
+
+        # Changing another tree keeps the index of this one
+        machine = other.scan_child("machine", {"MACH": "b"})
+        other.make_child("value", attributes={"MACH": "b"}, root=machine, text="6")
+
+        self.assertIs(GenericXML._SCAN_INDEX[obj.root.xml_element], index)
+        self.assertEqual(
+            self._texts(obj, obj.scan_children("value", {"MACH": "b"})), ["3"]
+        )
+        self.assertEqual(
+            self._texts(other, other.scan_children("value", {"MACH": "b"})),
+            ["3", "6"],
+        )
+
+
+XSD_TEST = """<?xml version="1.0"?>
+<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema">
+  <xs:include schemaLocation="types.xsd"/>
+  <xs:element name="config_test">
+    <xs:complexType>
+      <xs:sequence>
+        <xs:element name="entry" type="entry_type" maxOccurs="unbounded"/>
+      </xs:sequence>
+      <xs:attribute name="version" type="xs:decimal"/>
+    </xs:complexType>
+  </xs:element>
+</xs:schema>
+"""
+
+XSD_TYPES = """<?xml version="1.0"?>
+<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema">
+  <xs:simpleType name="entry_type">
+    <xs:restriction base="xs:string">
+      <xs:pattern value="{}"/>
+    </xs:restriction>
+  </xs:simpleType>
+</xs:schema>
+"""
+
+XML_VALID = """<?xml version="1.0"?>
+<config_test version="2.0">
+  <entry>{}</entry>
+</config_test>
+"""
+
+
+class TestValidateXmlFile(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.schema = os.path.join(self.tempdir, "test.xsd")
+        self.types = os.path.join(self.tempdir, "types.xsd")
+        self.filename = os.path.join(self.tempdir, "test.xml")
+        self._write(self.schema, XSD_TEST)
+        self._write(self.types, XSD_TYPES.format("[a-z]+"))
+        self._write(self.filename, XML_VALID.format("abc"))
+
+        self.obj = GenericXML()
+
+        patchers = [
+            mock.patch.object(GenericXML, "_VALIDATED_FILES", set()),
+            mock.patch.object(GenericXML, "_VALIDATED_SIGNATURES", {}),
+            mock.patch.object(GenericXML, "VALIDATION_TIMES", {}),
+            mock.patch.object(GenericXML, "PERSISTENT_CACHE_DIR", None),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir, ignore_errors=True)
+
+    def _write(self, path, content):
+        with open(path, "w") as fd:
+            fd.write(content)
+        # a rewrite within the file system timestamp resolution
+        self._mtime_ns = getattr(self, "_mtime_ns", time.time_ns()) + 1000
+        os.utime(path, ns=(self._mtime_ns, self._mtime_ns))
+
+    def _method(self):
+        return GenericXML.VALIDATION_TIMES[self.filename].method
+
+    def test_validate(self):
+        self.obj.validate_xml_file(self.filename, self.schema)
+
+        self.assertIn(self._method(), ("lxml", "xmllint"))
+        self.assertGreaterEqual(GenericXML.VALIDATION_TIMES[self.filename].seconds, 0.0)
+
+        self._write(self.filename, XML_VALID.format("ABC"))
+
+        with self.assertRaises(CIMEError):
+            self.obj.validate_xml_file(self.filename, self.schema)
+
+    def test_validated_file_cached(self):
+        self.obj.validate_xml_file(self.filename, self.schema)
+
+        with mock.patch.object(
+            GenericXML, "_validate_with_xmllint"
+        ) as xmllint, mock.patch.object(GenericXML, "_validate_with_lxml") as lxml:
+            self.obj.validate_xml_file(self.filename, self.schema)
+
+        xmllint.assert_not_called()
+        lxml.assert_not_called()
+        self.assertEqual(self._method(), "cached")
+
+    def test_unchanged_file_not_hashed(self):
+        self.obj.validate_xml_file(self.filename, self.schema)
+
+        with mock.patch.object(
+            GenericXML, "_get_content_hash", wraps=GenericXML._get_content_hash
+        ) as get_content_hash:
+            self.obj.validate_xml_file(self.filename, self.schema)
+
+            get_content_hash.assert_not_called()
+
+            # a validated file which was rewritten with the same content
+            GenericXML._VALIDATED_SIGNATURES.clear()
+
+            self.obj.validate_xml_file(self.filename, self.schema)
+
+            get_content_hash.assert_called()
+
+        self.assertEqual(self._method(), "cached")
+
+    def test_cache_invalidated_by_schema_include(self):
+        self.obj.validate_xml_file(self.filename, self.schema)
+
+        self._write(self.types, XSD_TYPES.format("[0-9]+"))
+
+        with self.assertRaises(CIMEError):
+            self.obj.validate_xml_file(self.filename, self.schema)
+
+    def test_cache_disabled(self):
+        with mock.patch.object(GenericXML, "DISABLE_VALIDATION_CACHE", True):
+            self.obj.validate_xml_file(self.filename, self.schema)
+            self.obj.validate_xml_file(self.filename, self.schema)
+
+        self.assertNotEqual(self._method(), "cached")
+        self.assertEqual(GenericXML._VALIDATED_FILES, set())
+
+    def test_persistent_validated_files(self):
+        cachedir = os.path.join(self.tempdir, "cache")
+        with mock.patch.object(GenericXML, "PERSISTENT_CACHE_DIR", cachedir):
+            self.obj.validate_xml_file(self.filename, self.schema)
+
+            # as seen by a new process
+            GenericXML._VALIDATED_FILES.clear()
+            GenericXML._VALIDATED_SIGNATURES.clear()
+
+            self.obj.validate_xml_file(self.filename, self.schema)
+
+        self.assertEqual(self._method(), "cached")
+
+    @unittest.skipIf(lxml_etree is None, "lxml is not installed")
+    def test_schema_compiled_once(self):
+        with mock.patch.object(GenericXML, "_COMPILED_SCHEMAS", {}):
+            self.obj.validate_xml_file(self.filename, self.schema)
+            other = os.path.join(self.tempdir, "other.xml")
+            self._write(other, XML_VALID.format("xyz"))
+            self.obj.validate_xml_file(other, self.schema)
+
+            self.assertEqual(len(GenericXML._COMPILED_SCHEMAS), 1)
+
+
+class TestWrite(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tempdir, "test.xml")
+        with open(self.filename, "w") as fd:
+            fd.write(XML_INCLUDE.format("b"))
+        os.chmod(self.filename, 0o640)
+
+        patcher = mock.patch.object(GenericXML, "DISABLE_CACHING", True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir, ignore_errors=True)
+
+    def test_write_unchanged(self):
+        obj = GenericXML(self.filename, read_only=False)
+
+        with mock.patch.object(GenericXML, "_write_atomic") as write_atomic:
+            self.assertEqual(obj.write(), 0)
+
+        write_atomic.assert_not_called()
+
+    def test_write(self):
+        obj = GenericXML(self.filename, read_only=False)
+        obj.set_text(obj.get_child("entry"), "changed")
+
+        total = GenericXML.BYTES_WRITTEN
+        nbytes = obj.write()
+
+        self.assertFalse(obj.needsrewrite)
+        self.assertEqual(nbytes, os.path.getsize(self.filename))
+        self.assertEqual(GenericXML.BYTES_WRITTEN, total + nbytes)
+        self.assertEqual(os.stat(self.filename).st_mode & 0o777, 0o640)
+        self.assertEqual(os.listdir(self.tempdir), ["test.xml"])
+
+        obj = GenericXML(self.filename)
+        self.assertEqual(obj.text(obj.get_child("entry")), "changed")
+
+    def test_write_failure_keeps_file(self):
+        obj = GenericXML(self.filename, read_only=False)
+        obj.set_text(obj.get_child("entry"), "changed")
+
+        with mock.patch("os.replace", side_effect=OSError("no space")):
+            with self.assertRaises(OSError):
+                obj.write()
+
+        self.assertEqual(os.listdir(self.tempdir), ["test.xml"])
+        obj = GenericXML(self.filename)
+        self.assertEqual(obj.text(obj.get_child("entry")), "b")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from CIME.utils import CIMEError
+from CIME.XML.pes import Pes
+
+TEST_PES = """<?xml version="1.0"?>
+<config_pes>
+  <grid name="any">
+    <mach name="any">
+      <pes pesize="any" compset="any">
+        <comment>default layout</comment>
+        <ntasks>
+          <ntasks_atm>8</ntasks_atm>
+          <ntasks_ocn>8</ntasks_ocn>
+        </ntasks>
+        <nthrds>
+          <nthrds_atm>1</nthrds_atm>
+          <nthrds_ocn>1</nthrds_ocn>
+        </nthrds>
+        <rootpe>
+          <rootpe_atm>0</rootpe_atm>
+          <rootpe_ocn>0</rootpe_ocn>
+        </rootpe>
+      </pes>
+    </mach>
+    <mach name="cheyenne|derecho">
+      <pes pesize="any" compset="_CAM">
+        <comment>cam layout</comment>
+        <ntasks>
+          <ntasks_atm>128</ntasks_atm>
+          <ntasks_ocn>64</ntasks_ocn>
+        </ntasks>
+        <rootpe>
+          <rootpe_atm>0</rootpe_atm>
+          <rootpe_ocn>128</rootpe_ocn>
+        </rootpe>
+      </pes>
+    </mach>
+  </grid>
+  <grid name="a%ne30np4">
+    <mach name="any">
+      <pes pesize="L" compset="any">
+        <ntasks>
+          <ntasks_atm>256</ntasks_atm>
+        </ntasks>
+      </pes>
+      <pes pesize="L" compset="DATM">
+        <ntasks>
+          <ntasks_atm>32</ntasks_atm>
+        </ntasks>
+      </pes>
+    </mach>
+  </grid>
+  <grid name="ne30">
+    <mach name="any">
+      <pes pesize="L" compset="any">
+        <ntasks>
+          <ntasks_atm>512</ntasks_atm>
+        </ntasks>
+      </pes>
+    </mach>
+  </grid>
+  <overrides>
+    <grid name="any">
+      <mach name="derecho">
+        <pes pesize="any" compset="any">
+          <nthrds>
+            <nthrds_atm>2</nthrds_atm>
+          </nthrds>
+        </pes>
+      </mach>
+    </grid>
+  </overrides>
+</config_pes>
+"""
+
+
+class TestXMLPes(unittest.TestCase):
+    def setUp(self):
+        self._tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tempdir.cleanup)
+
+        self._pes_file = os.path.join(self._tempdir.name, "config_pes.xml")
+        with open(self._pes_file, "w") as fd:
+            fd.write(TEST_PES)
+
+    def _get_pes(self):
+        files = mock.MagicMock()
+        files.get_schema.return_value = None
+
+        return Pes(self._pes_file, files=files)
+
+    def test_find_pes_layout(self):
+        pes = self._get_pes()
+
+        layout = pes.find_pes_layout("a%f19", "2000_DATM_SLND", "docker")
+
+        assert layout[0] == {"NTASKS_ATM": 8, "NTASKS_OCN": 8}
+        assert layout[1] == {"NTHRDS_ATM": 1, "NTHRDS_OCN": 1}
+        assert layout[2] == {"ROOTPE_ATM": 0, "ROOTPE_OCN": 0}
+        assert layout[7] == "default layout"
+
+        layout = pes.find_pes_layout("a%f19", "2000_CAM_SLND", "derecho")
+
+        assert layout[0] == {"NTASKS_ATM": 128, "NTASKS_OCN": 64}
+        # override applies on top of the selected layout
+        assert layout[1] == {"NTHRDS_ATM": 2}
+        assert layout[2] == {"ROOTPE_ATM": 0, "ROOTPE_OCN": 128}
+        assert layout[7] == "cam layout"
+
+    def test_find_pes_layout_mpi_serial(self):
+        pes = self._get_pes()
+
+        layout = pes.find_pes_layout(
+            "a%f19", "2000_CAM_SLND", "derecho", mpilib="mpi-serial"
+        )
+
+        assert layout[0] == {"NTASKS_ATM": 1, "NTASKS_OCN": 1}
+        assert layout[2] == {"ROOTPE_ATM": 0, "ROOTPE_OCN": 0}
+
+        layout = pes.find_pes_layout("a%f19", "2000_CAM_SLND", "derecho")
+
+        assert layout[0] == {"NTASKS_ATM": 128, "NTASKS_OCN": 64}
+
+    def test_find_pes_layout_multiple_matches(self):
+        pes = self._get_pes()
+
+        with self.assertRaisesRegex(
+            CIMEError, "More than one PE layout matches given PE specs"
+        ):
+            pes.find_pes_layout("a%ne30np4", "2000_CAM_SLND", "docker", "L")
+
+    def test_find_pes_layout_memoized(self):
+        pes = self._get_pes()
+
+        layout = pes.find_pes_layout("a%f19", "2000_CAM_SLND", "derecho")
+
+        # callers are free to modify the returned layout
+        layout[0]["NTASKS_ATM"] = 4
+
+        with mock.patch.object(Pes, "_find_matches") as find_matches:
+            other = self._get_pes().find_pes_layout("a%f19", "2000_CAM_SLND", "derecho")
+
+        find_matches.assert_not_called()
+
+        assert other[0] == {"NTASKS_ATM": 128, "NTASKS_OCN": 64}
+
+    def test_find_pes_layout_specific_compset(self):
+        pes = self._get_pes()
+
+        layout = pes.find_pes_layout("a%ne30np4", "2000_DATM_SLND", "docker", "L")
+
+        # the more specific compset match wins
+        assert layout[0] == {"NTASKS_ATM": 32}
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,6 @@
 # pylint: disable=import-error
-import queue, os, time, threading, socket, signal, shutil, glob, tempfile
+import os, time, socket, signal, shutil, glob, tempfile, base64
+import ctypes, ctypes.util, select, struct
 from pathlib import Path
 
 # pylint: disable=import-error
@@ -11,6 +12,7 @@ from CIME.core.exceptions import CIMEError
 from CIME.utils import expect, Timeout, run_cmd, run_cmd_no_fail, safe_copy
 from CIME.XML.machines import Machines
 from CIME.test_status import *
+from CIME import status_index
 from CIME.provenance import save_test_success
 from CIME.case.case import Case
 
@@ -18,7 +20,13 @@ SIGNAL_RECEIVED = False
 E3SM_MAIN_CDASH = "E3SM"
 CDASH_DEFAULT_BUILD_GROUP = "ACME_Latest"
 SLEEP_INTERVAL_SEC = 0.1
+# With inotify, how often all TestStatus files are checked anyway, since
+# inotify does not see changes made by other nodes of a shared file system
+FULL_SCAN_INTERVAL_SEC = 2.0
+DISABLE_INOTIFY = False
 ENV_VAR_KEEP_CDASH = "CIME_TEST_CDASH_WFT"
+# Logs larger than this are truncated in the middle when embedded in CDash XML
+CDASH_MAX_LOG_SIZE = 256 * 1024
 
 
 ###############################################################################
@@ -57,35 +65,57 @@ def get_test_phase(test_path, phase):
 
 
 ###############################################################################
-def get_nml_diff(test_path):
+def get_nml_diff(test_path, max_size=CDASH_MAX_LOG_SIZE):
     ###############################################################################
     test_log = os.path.join(test_path, "TestStatus.log")
 
-    diffs = ""
+    diffs = []
+    size = 0
     with open(test_log, "r") as fd:
         started = False
-        for line in fd.readlines():
+        for line in fd:
             if "NLCOMP" in line:
                 started = True
             elif started:
                 if "------------" in line:
                     break
+                elif size + len(line) > max_size:
+                    diffs.append("... namelist diff truncated ...\n")
+                    break
                 else:
-                    diffs += line
+                    diffs.append(line)
+                    size += len(line)
 
-    return diffs
+    return "".join(diffs)
 
 
 ###############################################################################
-def get_test_output(test_path):
+def get_test_output(test_path, max_size=CDASH_MAX_LOG_SIZE):
     ###############################################################################
+    """
+    Return the TestStatus.log of test_path. Only the start and the end of logs
+    larger than max_size bytes are returned.
+    """
     output_file = os.path.join(test_path, "TestStatus.log")
-    if os.path.exists(output_file):
-        return open(output_file, "r").read()
-    else:
+    if not os.path.exists(output_file):
         logging.warning("File '{}' not found".format(output_file))
         return ""
 
+    with open(output_file, "rb") as fd:
+        size = os.fstat(fd.fileno()).st_size
+        if size <= max_size:
+            output = fd.read(max_size)
+        else:
+            half_size = max_size // 2
+            output = fd.read(half_size)
+            output += "\n... {:d} bytes truncated ...\n".format(
+                size - 2 * half_size
+            ).encode()
+            fd.seek(size - half_size)
+            output += fd.read(half_size)
+
+    return output.decode(errors="replace")
+
 
 ###############################################################################
 def create_cdash_xml_boiler(
@@ -209,85 +239,161 @@ def create_cdash_build_xml(
 
 
 ###############################################################################
-def create_cdash_test_xml(
-    results,
-    cdash_build_name,
-    cdash_build_group,
-    utc_time,
-    current_time,
-    hostname,
-    data_rel_path,
-):
+def _create_cdash_test_elem(test_name, test_path, test_status):
     ###############################################################################
-    site_elem, testing_elem = create_cdash_xml_boiler(
-        "Testing",
-        cdash_build_name,
-        cdash_build_group,
-        utc_time,
-        current_time,
-        hostname,
+    test_passed = test_status in [TEST_PASS_STATUS, NAMELIST_FAIL_STATUS]
+    test_norm_path = (
+        test_path if os.path.isdir(test_path) else os.path.dirname(test_path)
     )
 
-    test_list_elem = xmlet.SubElement(testing_elem, "TestList")
-    for test_name in sorted(results):
-        xmlet.SubElement(test_list_elem, "Test").text = test_name
+    full_test_elem = xmlet.Element("Test")
+    if test_passed:
+        full_test_elem.attrib["Status"] = "passed"
+    elif test_status == TEST_PEND_STATUS:
+        full_test_elem.attrib["Status"] = "notrun"
+    else:
+        full_test_elem.attrib["Status"] = "failed"
 
-    for test_name in sorted(results):
-        test_path, test_status, _ = results[test_name]
-        test_passed = test_status in [TEST_PASS_STATUS, NAMELIST_FAIL_STATUS]
-        test_norm_path = (
-            test_path if os.path.isdir(test_path) else os.path.dirname(test_path)
-        )
+    xmlet.SubElement(full_test_elem, "Name").text = test_name
 
-        full_test_elem = xmlet.SubElement(testing_elem, "Test")
-        if test_passed:
-            full_test_elem.attrib["Status"] = "passed"
-        elif test_status == TEST_PEND_STATUS:
-            full_test_elem.attrib["Status"] = "notrun"
-        else:
-            full_test_elem.attrib["Status"] = "failed"
+    xmlet.SubElement(full_test_elem, "Path").text = test_norm_path
+
+    xmlet.SubElement(full_test_elem, "FullName").text = test_name
+
+    xmlet.SubElement(full_test_elem, "FullCommandLine")
+    # text ?
+
+    results_elem = xmlet.SubElement(full_test_elem, "Results")
+
+    named_measurements = (
+        ("text/string", "Exit Code", test_status),
+        ("text/string", "Exit Value", "0" if test_passed else "1"),
+        ("numeric_double", "Execution Time", str(get_test_time(test_norm_path))),
+        (
+            "text/string",
+            "Completion Status",
+            "Not Completed" if test_status == TEST_PEND_STATUS else "Completed",
+        ),
+        ("text/string", "Command line", "create_test"),
+    )
+
+    for type_attr, name_attr, value in named_measurements:
+        named_measurement_elem = xmlet.SubElement(results_elem, "NamedMeasurement")
+        named_measurement_elem.attrib["type"] = type_attr
+        named_measurement_elem.attrib["name"] = name_attr
 
-        xmlet.SubElement(full_test_elem, "Name").text = test_name
+        xmlet.SubElement(named_measurement_elem, "Value").text = value
 
-        xmlet.SubElement(full_test_elem, "Path").text = test_norm_path
+    measurement_elem = xmlet.SubElement(results_elem, "Measurement")
+
+    value_elem = xmlet.SubElement(measurement_elem, "Value")
+    value_elem.text = "".join(
+        [item for item in get_test_output(test_norm_path) if ord(item) < 128]
+    )
 
-        xmlet.SubElement(full_test_elem, "FullName").text = test_name
+    return full_test_elem
 
-        xmlet.SubElement(full_test_elem, "FullCommandLine")
-        # text ?
 
-        results_elem = xmlet.SubElement(full_test_elem, "Results")
+###############################################################################
+class CDashTestSpool(object):
+    ###############################################################################
+    """
+    The Test elements of Test.xml, serialized to a temporary file as test
+    results arrive, so only the log of one test is in memory at a time and
+    Test.xml is ready as soon as the last test finishes.
+    """
+
+    def __init__(self, tmproot=None):
+        self._fd = tempfile.TemporaryFile(dir=tmproot)
+        # test_name -> ((test_path, test_status), offset, size) of its element
+        self._tests = {}
+
+    def has_result(self, test_name, test_path, test_status):
+        """
+        True if the element of test_name was spooled for this result
+        """
+        return test_name in self._tests and self._tests[test_name][0] == (
+            test_path,
+            test_status,
+        )
 
-        named_measurements = (
-            ("text/string", "Exit Code", test_status),
-            ("text/string", "Exit Value", "0" if test_passed else "1"),
-            ("numeric_double", "Execution Time", str(get_test_time(test_norm_path))),
-            (
-                "text/string",
-                "Completion Status",
-                "Not Completed" if test_status == TEST_PEND_STATUS else "Completed",
-            ),
-            ("text/string", "Command line", "create_test"),
+    def add(self, test_name, test_path, test_status):
+        """
+        Spool the Test element of test_name. A test found in more than one
+        path is reported once, with the last result added.
+        """
+        data = xmlet.tostring(
+            _create_cdash_test_elem(test_name, test_path, test_status)
         )
+        offset = self._fd.seek(0, os.SEEK_END)
+        self._fd.write(data)
+        self._tests[test_name] = ((test_path, test_status), offset, len(data))
 
-        for type_attr, name_attr, value in named_measurements:
-            named_measurement_elem = xmlet.SubElement(results_elem, "NamedMeasurement")
-            named_measurement_elem.attrib["type"] = type_attr
-            named_measurement_elem.attrib["name"] = name_attr
+    def copy_to(self, fd):
+        self._fd.flush()
+        for _, offset, size in sorted(self._tests.values(), key=lambda x: x[1]):
+            self._fd.seek(offset)
+            fd.write(self._fd.read(size))
 
-            xmlet.SubElement(named_measurement_elem, "Value").text = value
+        self._fd.seek(0, os.SEEK_END)
 
-        measurement_elem = xmlet.SubElement(results_elem, "Measurement")
+    def close(self):
+        self._fd.close()
 
-        value_elem = xmlet.SubElement(measurement_elem, "Value")
-        value_elem.text = "".join(
-            [item for item in get_test_output(test_norm_path) if ord(item) < 128]
+
+###############################################################################
+def create_cdash_test_xml(
+    results,
+    cdash_build_name,
+    cdash_build_group,
+    utc_time,
+    current_time,
+    hostname,
+    data_rel_path,
+    spool=None,
+):
+    ###############################################################################
+    """
+    Write Test.xml for results, using the Test elements already in spool
+    """
+    own_spool = spool is None
+    if own_spool:
+        spool = CDashTestSpool(tmproot=str(data_rel_path))
+
+    try:
+        # results has the final say for a test found in more than one path
+        for test_name in sorted(results):
+            test_path, test_status, _ = results[test_name]
+            if not spool.has_result(test_name, test_path, test_status):
+                spool.add(test_name, test_path, test_status)
+
+        site_elem, testing_elem = create_cdash_xml_boiler(
+            "Testing",
+            cdash_build_name,
+            cdash_build_group,
+            utc_time,
+            current_time,
+            hostname,
         )
 
-    xmlet.SubElement(testing_elem, "ElapsedMinutes").text = "0"  # Skip for now
+        test_list_elem = xmlet.SubElement(testing_elem, "TestList")
+        for test_name in sorted(results):
+            xmlet.SubElement(test_list_elem, "Test").text = test_name
 
-    etree = xmlet.ElementTree(site_elem)
-    etree.write(data_rel_path / "Test.xml")
+        # Stands for the Test elements until the document is written
+        xmlet.SubElement(testing_elem, "CIMETestSpool")
+
+        xmlet.SubElement(testing_elem, "ElapsedMinutes").text = "0"  # Skip for now
+
+        head, tail = xmlet.tostring(site_elem).split(b"<CIMETestSpool />")
+        with (data_rel_path / "Test.xml").open(mode="wb") as fd:
+            fd.write(head)
+            spool.copy_to(fd)
+            fd.write(tail)
+
+    finally:
+        if own_spool:
+            spool.close()
 
 
 ###############################################################################
@@ -299,6 +405,7 @@ def create_cdash_xml_fakes(
     current_time,
     hostname,
     data_rel_path,
+    spool=None,
 ):
     ###############################################################################
 
@@ -330,6 +437,7 @@ def create_cdash_xml_fakes(
         current_time,
         hostname,
         data_rel_path,
+        spool=spool,
     )
 
 
@@ -407,16 +515,13 @@ def create_cdash_upload_xml(
             arg_stdout=tarball,
             from_dir=str(tmp_path),
         )
-        base64 = run_cmd_no_fail("base64 {}".format(tarball), from_dir=str(tmp_path))
-
         xml_text = r"""<?xml version="1.0" encoding="UTF-8"?>
 <?xml-stylesheet type="text/xsl" href="Dart/Source/Server/XSL/Build.xsl <file:///Dart/Source/Server/XSL/Build.xsl> "?>
 <Site BuildName="{}" BuildStamp="{}-{}" Name="{}" Generator="ctest3.0.0">
 <Upload>
 <File filename="{}">
 <Content encoding="base64">
-{}
-</Content>
+{}</Content>
 </File>
 </Upload>
 </Site>
@@ -426,11 +531,17 @@ def create_cdash_upload_xml(
             cdash_build_group,
             hostname,
             str((tmp_path / tarball).absolute()),
-            base64,
+            "{}",
         )
 
-        with (data_rel_path / "Upload.xml").open(mode="w") as fd:
-            fd.write(xml_text)
+        # Encode the tarball straight into the file, it can be large
+        head, tail = xml_text.rsplit("{}", 1)
+        with (data_rel_path / "Upload.xml").open(mode="wb") as fd:
+            fd.write(head.encode())
+            with (tmp_path / tarball).open(mode="rb") as tarball_fd:
+                base64.encode(tarball_fd, fd)
+
+            fd.write(tail.encode())
 
 
 ###############################################################################
@@ -441,6 +552,7 @@ def create_cdash_xml(
     cdash_build_group,
     force_log_upload=False,
     cdash_tmproot=None,
+    spool=None,
 ):
     ###############################################################################
 
@@ -517,6 +629,7 @@ def create_cdash_xml(
                     current_time,
                     hostname,
                     testtime_dir,
+                    spool=spool,
                 )
 
                 create_cdash_upload_xml(
@@ -601,10 +714,173 @@ CurlOptions: CURLOPT_SSL_VERIFYPEER_OFF;CURLOPT_SSL_VERIFYHOST_OFF
 
 
 ###############################################################################
-def wait_for_test(
-    test_path,
-    results,
-    wait,
+class _Inotify(object):
+    ###############################################################################
+    """
+    Minimal ctypes binding of Linux inotify, reports which of a set of
+    directories had a file created, modified or moved into it.
+    """
+
+    _IN_MODIFY = 0x00000002
+    _IN_CLOSE_WRITE = 0x00000008
+    _IN_MOVED_TO = 0x00000080
+    _IN_CREATE = 0x00000100
+    _MASK = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+    _EVENT = struct.Struct("iIII")
+
+    @classmethod
+    def create(cls, dirs):
+        """
+        Return an _Inotify watching dirs or None if inotify is not available or
+        a directory can not be watched.
+        """
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except (OSError, AttributeError):
+            return None
+
+        if fd < 0:
+            return None
+
+        inotify = cls(fd)
+        for dirname in dirs:
+            wd = libc.inotify_add_watch(fd, dirname.encode(), cls._MASK)
+            if wd < 0:
+                # Directory does not exist yet or out of watches
+                inotify.close()
+                return None
+
+            inotify._dirs[wd] = dirname
+
+        return inotify
+
+    def __init__(self, fd):
+        self._fd = fd
+        self._dirs = {}  # watch descriptor -> directory
+
+    def wait(self, timeout):
+        """
+        Wait up to timeout seconds for changes, return the set of directories
+        that changed.
+        """
+        changed = set()
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        while readable:
+            try:
+                data = os.read(self._fd, 65536)
+            except BlockingIOError:
+                break
+
+            offset = 0
+            while offset < len(data):
+                wd, _, _, name_len = self._EVENT.unpack_from(data, offset)
+                offset += self._EVENT.size + name_len
+                if wd in self._dirs:
+                    changed.add(self._dirs[wd])
+
+        return changed
+
+    def close(self):
+        os.close(self._fd)
+
+
+###############################################################################
+def _get_status_filepath(test_path):
+    ###############################################################################
+    if os.path.isdir(test_path):
+        return os.path.join(test_path, TEST_STATUS_FILENAME)
+    else:
+        return test_path
+
+
+###############################################################################
+class _WatchedTest(object):
+    ###############################################################################
+    def __init__(self, test_path):
+        self.status_filepath = _get_status_filepath(test_path)
+        self.test_path = test_path
+        self.test_dir = os.path.dirname(self.status_filepath)
+        self.journal_filepath = os.path.join(
+            self.test_dir, TEST_STATUS_JOURNAL_FILENAME
+        )
+        self.signature = None
+        self.ts = None
+        self.prior_dump = None
+        self.result = None
+
+        # We don't want to make it a requirement that wait_for_tests has write
+        # access to all case directories
+        self.log_path = os.path.join(self.test_dir, ".internal_test_status.log")
+        try:
+            fd = open(self.log_path, "w")
+            fd.close()
+        except (IOError, OSError):
+            self.log_path = None
+
+    def is_pending(self):
+        return self.signature is None or self.result[2] == TEST_PEND_STATUS
+
+
+###############################################################################
+def _check_test(watched, **kwargs):
+    ###############################################################################
+    """
+    Update the result of watched, TestStatus is only parsed if the file changed
+    since the last check. Returns True if it was parsed.
+    """
+    try:
+        stat = os.stat(watched.status_filepath)
+    except OSError:
+        watched.signature = None
+        test_name = os.path.abspath(watched.status_filepath).split("/")[-2]
+        watched.result = (
+            test_name,
+            watched.test_path,
+            "File '{}' doesn't exist".format(watched.status_filepath),
+            CREATE_NEWCASE_PHASE,
+        )
+        return False
+
+    signature = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+    try:
+        # Most status changes only append to the journal
+        stat = os.stat(watched.journal_filepath)
+        signature += (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+    except OSError:
+        pass
+
+    if signature == watched.signature:
+        return False
+
+    watched.signature = signature
+    if watched.ts is None:
+        watched.ts = TestStatus(test_dir=watched.test_dir)
+    else:
+        # Only reads what was appended to the journal since the last check
+        watched.ts.refresh()
+
+    ts = watched.ts
+    test_status, test_phase = ts.get_overall_test_status(**kwargs)
+
+    dump = ts.phase_statuses_dump()
+    if (
+        watched.log_path is not None
+        and watched.prior_dump is not None
+        and watched.prior_dump != dump
+    ):
+        with open(watched.log_path, "a") as log_fd:
+            log_fd.write(dump)
+            log_fd.write("OVERALL: {}\n\n".format(test_status))
+
+    watched.prior_dump = dump
+    watched.result = (ts.get_name(), watched.test_path, test_status, test_phase)
+    return True
+
+
+###############################################################################
+def _index_tests(
+    test_paths,
     check_throughput,
     check_memory,
     ignore_namelists,
@@ -613,70 +889,133 @@ def wait_for_test(
     no_run,
 ):
     ###############################################################################
-    if os.path.isdir(test_path):
-        test_status_filepath = os.path.join(test_path, TEST_STATUS_FILENAME)
-    else:
-        test_status_filepath = test_path
-
-    logging.debug("Watching file: '{}'".format(test_status_filepath))
-    test_log_path = os.path.join(
-        os.path.dirname(test_status_filepath), ".internal_test_status.log"
-    )
-
-    # We don't want to make it a requirement that wait_for_tests has write access
-    # to all case directories
-    try:
-        fd = open(test_log_path, "w")
-        fd.close()
-    except (IOError, OSError):
-        test_log_path = "/dev/null"
-
-    prior_ts = None
-    with open(test_log_path, "w") as log_fd:
-        while True:
-            if os.path.exists(test_status_filepath):
-                ts = TestStatus(test_dir=os.path.dirname(test_status_filepath))
-                test_name = ts.get_name()
-                test_status, test_phase = ts.get_overall_test_status(
-                    wait_for_run=not no_run,  # Important
-                    no_run=no_run,
-                    check_throughput=check_throughput,
-                    check_memory=check_memory,
-                    ignore_namelists=ignore_namelists,
-                    ignore_diffs=ignore_diffs,
-                    ignore_memleak=ignore_memleak,
+    """
+    Get the status of test_paths from the status indexes of their test roots,
+    which only re-parse the TestStatus files that changed since the last report.
+
+    Returns the list of (test_name, test_path, test_status, test_phase)
+    """
+    status_filepaths = [_get_status_filepath(x) for x in test_paths]
+    test_statuses = status_index.get_test_statuses(status_filepaths)
+
+    results = []
+    for test_path, status_filepath in zip(test_paths, status_filepaths):
+        ts = test_statuses.get(os.path.abspath(status_filepath))
+        if ts is None:
+            test_name = os.path.abspath(status_filepath).split("/")[-2]
+            results.append(
+                (
+                    test_name,
+                    test_path,
+                    "File '{}' doesn't exist".format(status_filepath),
+                    CREATE_NEWCASE_PHASE,
                 )
+            )
+        else:
+            test_status, test_phase = ts.get_overall_test_status(
+                wait_for_run=not no_run,  # Important
+                no_run=no_run,
+                check_throughput=check_throughput,
+                check_memory=check_memory,
+                ignore_namelists=ignore_namelists,
+                ignore_diffs=ignore_diffs,
+                ignore_memleak=ignore_memleak,
+            )
+            results.append((ts.get_name(), test_path, test_status, test_phase))
 
-                if prior_ts is not None and prior_ts != ts:
-                    log_fd.write(ts.phase_statuses_dump())
-                    log_fd.write("OVERALL: {}\n\n".format(test_status))
+    return results
 
-                prior_ts = ts
 
-                if test_status == TEST_PEND_STATUS and (wait and not SIGNAL_RECEIVED):
-                    time.sleep(SLEEP_INTERVAL_SEC)
-                    logging.debug("Waiting for test to finish")
-                else:
-                    results.put((test_name, test_path, test_status, test_phase))
-                    break
+###############################################################################
+def _watch_tests(
+    test_paths,
+    wait,
+    check_throughput,
+    check_memory,
+    ignore_namelists,
+    ignore_diffs,
+    ignore_memleak,
+    no_run,
+    on_finished=None,
+    stats=None,
+):
+    ###############################################################################
+    """
+    Watch the TestStatus files of test_paths from a single thread until the
+    tests are no longer pending, or right away if not wait. Uses inotify where
+    available, otherwise polls the files by mtime and size.
+
+    on_finished is called with the result of each test when it stops pending.
+
+    stats, if given, is a dictionary that is filled with the number of
+    TestStatus files checked and parsed, and whether inotify was used.
+
+    Returns the list of (test_name, test_path, test_status, test_phase)
+    """
+    watched_tests = [_WatchedTest(test_path) for test_path in test_paths]
+    kwargs = {
+        "wait_for_run": not no_run,  # Important
+        "no_run": no_run,
+        "check_throughput": check_throughput,
+        "check_memory": check_memory,
+        "ignore_namelists": ignore_namelists,
+        "ignore_diffs": ignore_diffs,
+        "ignore_memleak": ignore_memleak,
+    }
+
+    inotify = None
+    if wait and not DISABLE_INOTIFY:
+        inotify = _Inotify.create(set(x.test_dir for x in watched_tests))
+
+    logging.debug(
+        "Watching {:d} files {}".format(
+            len(watched_tests), "with inotify" if inotify else "by polling"
+        )
+    )
 
+    pending = watched_tests
+    changed_dirs = None  # None means check all pending tests
+    last_full_scan = time.time()
+    num_checks = 0
+    num_parses = 0
+    try:
+        while True:
+            for watched in pending:
+                if changed_dirs is None or watched.test_dir in changed_dirs:
+                    num_checks += 1
+                    if _check_test(watched, **kwargs):
+                        num_parses += 1
+
+            if on_finished is not None:
+                for watched in pending:
+                    if not watched.is_pending():
+                        on_finished(watched.result)
+
+            pending = [x for x in pending if x.is_pending()]
+            if not pending or not wait or SIGNAL_RECEIVED:
+                break
+
+            logging.debug("Waiting for {:d} tests to finish".format(len(pending)))
+            if inotify is None:
+                time.sleep(SLEEP_INTERVAL_SEC)
             else:
-                if wait and not SIGNAL_RECEIVED:
-                    logging.debug(
-                        "File '{}' does not yet exist".format(test_status_filepath)
-                    )
-                    time.sleep(SLEEP_INTERVAL_SEC)
-                else:
-                    test_name = os.path.abspath(test_status_filepath).split("/")[-2]
-                    results.put(
-                        (
-                            test_name,
-                            test_path,
-                            "File '{}' doesn't exist".format(test_status_filepath),
-                            CREATE_NEWCASE_PHASE,
-                        )
-                    )
-                    break
+                changed_dirs = inotify.wait(SLEEP_INTERVAL_SEC)
+                if time.time() - last_full_scan >= FULL_SCAN_INTERVAL_SEC:
+                    changed_dirs = None
+                    last_full_scan = time.time()
+    finally:
+        if inotify is not None:
+            inotify.close()
+
+    logging.debug(
+        "Checked {:d} TestStatus files, parsed {:d}".format(num_checks, num_parses)
+    )
+    if stats is not None:
+        stats.update(
+            {"checks": num_checks, "parses": num_parses, "inotify": inotify is not None}
+        )
+
+    return [x.result for x in watched_tests]
 
 
 ###############################################################################
@@ -689,37 +1028,40 @@ def wait_for_tests_impl(
     ignore_diffs=False,
     ignore_memleak=False,
     no_run=False,
+    use_index=False,
+    on_finished=None,
 ):
     ###############################################################################
-    results = queue.Queue()
-
-    wft_threads = []
-    for test_path in test_paths:
-        t = threading.Thread(
-            target=wait_for_test,
-            args=(
-                test_path,
-                results,
-                not no_wait,
-                check_throughput,
-                check_memory,
-                ignore_namelists,
-                ignore_diffs,
-                ignore_memleak,
-                no_run,
-            ),
+    if use_index and no_wait:
+        results = _index_tests(
+            test_paths,
+            check_throughput,
+            check_memory,
+            ignore_namelists,
+            ignore_diffs,
+            ignore_memleak,
+            no_run,
+        )
+    else:
+        results = _watch_tests(
+            test_paths,
+            not no_wait,
+            check_throughput,
+            check_memory,
+            ignore_namelists,
+            ignore_diffs,
+            ignore_memleak,
+            no_run,
+            on_finished=on_finished,
         )
-        t.daemon = True
-        t.start()
-        wft_threads.append(t)
 
-    for wft_thread in wft_threads:
-        wft_thread.join()
+        if use_index:
+            # Leave the final statuses for the next report
+            status_index.refresh([_get_status_filepath(x) for x in test_paths])
 
     test_results = {}
     completed_test_paths = []
-    while not results.empty():
-        test_name, test_path, test_status, test_phase = results.get()
+    for test_name, test_path, test_status, test_phase in results:
         if test_name in test_results:
             prior_path, prior_status, _ = test_results[test_name]
             if test_status == prior_status:
@@ -769,12 +1111,23 @@ def wait_for_tests(
     no_run=False,
     update_success=False,
     expect_test_complete=True,
+    use_index=False,
 ):
     ###############################################################################
     # Set up signal handling, we want to print results before the program
     # is terminated
     set_up_signal_handlers()
 
+    # Write the CDash Test elements of tests as they finish
+    spool = None
+    on_finished = None
+    if cdash_build_name:
+        spool = CDashTestSpool(tmproot=cdash_tmproot)
+
+        def on_finished(result):
+            test_name, test_path, test_status, _ = result
+            spool.add(test_name, test_path, test_status)
+
     with Timeout(timeout, action=signal_handler):
         test_results = wait_for_tests_impl(
             test_paths,
@@ -785,6 +1138,8 @@ def wait_for_tests(
             ignore_diffs,
             ignore_memleak,
             no_run,
+            use_index,
+            on_finished,
         )
 
     all_pass = True
@@ -863,13 +1218,17 @@ def wait_for_tests(
                 )
 
     if cdash_build_name:
-        create_cdash_xml(
-            test_results,
-            cdash_build_name,
-            cdash_project,
-            cdash_build_group,
-            force_log_upload,
-            cdash_tmproot,
-        )
+        try:
+            create_cdash_xml(
+                test_results,
+                cdash_build_name,
+                cdash_project,
+                cdash_build_group,
+                force_log_upload,
+                cdash_tmproot,
+                spool,
+            )
+        finally:
+            spool.close()
 
     return all_pass